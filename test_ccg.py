@@ -8,8 +8,6 @@ from utils.box_client import get_ccg_enterprise_client, get_ccg_user_client
 logging.basicConfig(level=logging.INFO)
 logging.getLogger("boxsdk").setLevel(logging.CRITICAL)
 
-conf = AppConfig()
-
 
 def main():
     """
@@ -17,6 +15,7 @@ def main():
     with CCG authentication
     """
 
+    conf = AppConfig()
     client_enterprise = get_ccg_enterprise_client(conf)
 
     service_user = client_enterprise.user().get()
@@ -8,8 +8,6 @@ from utils.box_client import get_client
 logging.basicConfig(level=logging.INFO)
 logging.getLogger("boxsdk").setLevel(logging.CRITICAL)
 
-conf = AppConfig()
-
 
 def main():
     """
@@ -17,6 +15,7 @@ def main():
     with oAuth2 authentication
     """
 
+    conf = AppConfig()
     client = get_client(conf)
 
     user = client.user().get()
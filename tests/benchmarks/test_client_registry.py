@@ -0,0 +1,61 @@
+"""
+Per job setup latency with and without the shared client registry,
+measured against the local Box API stand-in.
+"""
+import pytest
+
+from utils import box_client as box_client_module
+from utils.box_client import AUTH_CCG_ENTERPRISE, get_ccg_enterprise_client, get_shared_client
+
+JOBS = 20
+ROUNDS = 5
+LATENCY = 0.01
+
+
+def count_builds(monkeypatch) -> list:
+    """Counts the CCG enterprise clients the shared registry builds"""
+    builds = []
+    factory = box_client_module._CLIENT_FACTORIES[AUTH_CCG_ENTERPRISE]  # pylint: disable=protected-access
+
+    def counting_factory(*args):
+        builds.append(args)
+        return factory(*args)
+
+    monkeypatch.setitem(
+        box_client_module._CLIENT_FACTORIES, AUTH_CCG_ENTERPRISE, counting_factory  # pylint: disable=protected-access
+    )
+    return builds
+
+
+def run_jobs(get_job_client, rounds: list):
+    """Runs the jobs, each with the client it is given"""
+    rounds.append(None)
+    for _ in range(JOBS):
+        get_job_client().user().get()
+
+
+@pytest.mark.benchmark(group="client-setup")
+@pytest.mark.fake_box(latency=LATENCY)
+def test_fresh_client_per_job(benchmark, fake_box, config, monkeypatch):
+    builds = count_builds(monkeypatch)
+    rounds = []
+    benchmark.pedantic(
+        run_jobs, args=(lambda: get_ccg_enterprise_client(config), rounds), rounds=ROUNDS, iterations=1
+    )
+
+    assert not builds
+    assert fake_box.token_requests == JOBS * len(rounds)
+
+
+@pytest.mark.benchmark(group="client-setup")
+@pytest.mark.fake_box(latency=LATENCY)
+def test_shared_client_per_job(benchmark, fake_box, config, monkeypatch):
+    builds = count_builds(monkeypatch)
+    rounds = []
+    benchmark.pedantic(
+        run_jobs, args=(lambda: get_shared_client(config, AUTH_CCG_ENTERPRISE), rounds), rounds=ROUNDS, iterations=1
+    )
+
+    assert rounds
+    assert len(builds) == 1
+    assert fake_box.token_requests == 1
@@ -0,0 +1,51 @@
+"""
+Listing a wide folder with the SDK defaults versus the bulk listing defaults,
+measured against the local Box API stand-in.
+"""
+import pytest
+
+from utils.box_metrics import collect_metrics
+from utils.folder_listing import DEFAULT_PAGE_SIZE, get_items
+
+ITEMS = 2500
+ROUNDS = 5
+LISTING = "GET /folders/:id/items"
+
+# page size the SDK uses when none is given
+SDK_PAGE_SIZE = 100
+
+
+@pytest.fixture(name="wide_folder")
+def fixture_wide_folder(fake_box, box_client):
+    for index in range(ITEMS):
+        fake_box.add_file(f"file_{index:05}.txt", "0")
+    box_client.auth.refresh(None)
+    return box_client.folder("0")
+
+
+def list_names(list_items) -> tuple:
+    """Lists the folder, returning the item names and the listing metrics"""
+    with collect_metrics() as metrics:
+        names = [item.name for item in list_items()]
+    return names, metrics.snapshot()[LISTING]
+
+
+@pytest.mark.benchmark(group="folder-listing")
+@pytest.mark.fake_box(latency=0.005)
+def test_sdk_default_listing(benchmark, wide_folder):
+    names, listing = benchmark.pedantic(list_names, args=(wide_folder.get_items,), rounds=ROUNDS, iterations=1)
+
+    assert len(names) == ITEMS
+    assert listing["calls"] == -(-ITEMS // SDK_PAGE_SIZE)
+
+
+@pytest.mark.benchmark(group="folder-listing")
+@pytest.mark.fake_box(latency=0.005)
+def test_bulk_listing(benchmark, wide_folder):
+    names, listing = benchmark.pedantic(list_names, args=(lambda: get_items(wide_folder),), rounds=ROUNDS, iterations=1)
+    _, default = list_names(wide_folder.get_items)
+
+    assert names == [item.name for item in wide_folder.get_items()]
+    assert listing["calls"] == -(-ITEMS // DEFAULT_PAGE_SIZE)
+    assert listing["calls"] * 8 <= default["calls"]
+    assert listing["bytes_in"] * 2 <= default["bytes_in"]
@@ -0,0 +1,33 @@
+"""
+Recursive listing of a folder tree, one folder at a time versus the parallel walker,
+measured against the local Box API stand-in.
+"""
+import pytest
+
+from tests.sample_trees import serial_walk
+from utils.folder_walker import walk_folder
+
+ROUNDS = 5
+LATENCY = 0.01
+
+
+@pytest.fixture(name="tree")
+def fixture_tree(root, box_client):
+    box_client.auth.refresh(None)
+    return root
+
+
+@pytest.mark.benchmark(group="folder-walk")
+@pytest.mark.fake_box(latency=LATENCY)
+def test_serial_walk(benchmark, tree):
+    paths = benchmark.pedantic(lambda: list(serial_walk(tree)), rounds=ROUNDS, iterations=1)
+
+    assert set(paths) == {entry.path for entry in walk_folder(tree)}
+
+
+@pytest.mark.benchmark(group="folder-walk")
+@pytest.mark.fake_box(latency=LATENCY)
+def test_parallel_walk(benchmark, tree):
+    paths = benchmark.pedantic(lambda: [entry.path for entry in walk_folder(tree)], rounds=ROUNDS, iterations=1)
+
+    assert set(paths) == set(serial_walk(tree))
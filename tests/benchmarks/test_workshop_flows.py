@@ -0,0 +1,250 @@
+"""
+Workshop flows benchmarked against the local Box API stand-in.
+Each flow replays the sequence of its workshop's __main__ on a freshly seeded account,
+and reports p50/p99 latency, throughput and requests per flow in the benchmark extra info.
+Run with `pytest tests/benchmarks --benchmark-only`, and compare runs with `--benchmark-autosave`.
+"""
+import os
+from typing import Callable, Dict
+
+import pytest
+from boxsdk import BoxAPIException, Client
+
+from tests.fake_box import FakeBoxServer
+from utils.folder_cache import cached_get_items, copy_item, delete_item, get_folder_cache, rename_item
+from utils.path_resolver import get_path_resolver
+from workshops.file_representations import file_representations_sln
+from workshops.files import files_sln
+from workshops.folders import folders_sln
+from workshops.search import search_sln
+
+ROUNDS = 20
+LATENCY = 0.002
+
+SAMPLES = os.path.join(os.path.dirname(__file__), "..", "..", "workshops")
+SAMPLE_FILE = os.path.join(SAMPLES, "files", "content_samples", "sample_file.txt")
+SEARCH_SAMPLES = os.path.join(SAMPLES, "search", "content_samples")
+
+SEARCHES = [
+    {"query": "apple"},
+    {"query": "apple banana"},
+    {"query": '"apple banana"'},
+    {"query": "apple NOT banana"},
+    {"query": "apple AND pineapple"},
+    {"query": "pineapple OR banana"},
+    {"query": "ananas"},
+    {"query": "ananas", "content_types": ["name"]},
+    {"query": "ananas", "content_types": ["name", "description"]},
+    {"query": "apple", "result_type": "folder"},
+]
+
+
+def percentile(data, fraction: float) -> float:
+    """Nearest rank percentile of sorted data"""
+    return data[min(int(len(data) * fraction), len(data) - 1)]
+
+
+def run_flow(benchmark, fake_box: FakeBoxServer, flow: Callable, seed: Callable[[], Dict]):
+    """Benchmarks a flow, re-seeding the account before every round"""
+
+    def setup():
+        fake_box.reset()
+        get_folder_cache().clear()
+        get_path_resolver().clear()
+        return (), seed()
+
+    fake_box.reset_counters()
+    benchmark.pedantic(flow, setup=setup, rounds=ROUNDS, iterations=1)
+
+    if benchmark.stats is not None:
+        data = benchmark.stats.stats.sorted_data
+        benchmark.extra_info.update(
+            {
+                "p50_ms": round(percentile(data, 0.50) * 1000, 3),
+                "p99_ms": round(percentile(data, 0.99) * 1000, 3),
+                "flows_per_second": round(len(data) / sum(data), 2),
+                "requests_per_flow": fake_box.api_requests / len(data),
+                "rate_limited": fake_box.rate_limited,
+            }
+        )
+
+
+# folders
+
+
+def seed_folders(fake_box: FakeBoxServer) -> Dict:
+    workshops = fake_box.add_folder("workshops")
+    fake_box.add_folder("folders", workshops)
+    return {}
+
+
+def folders_flow(box_client: Client):
+    """folders_sln __main__"""
+    wksp_folder = folders_sln.get_workshop_folder(box_client)
+
+    my_documents = folders_sln.create_box_folder(box_client, "my_documents", wksp_folder)
+    folders_sln.create_box_folder(box_client, "work", my_documents)
+
+    downloads = folders_sln.create_box_folder(box_client, "downloads", wksp_folder)
+    personal = folders_sln.create_box_folder(box_client, "personal", downloads)
+    copy_item(personal, my_documents)
+
+    downloads = downloads.update_info(data={"description": "This is where my donwloads go"})
+
+    tmp = folders_sln.create_box_folder(box_client, "tmp", downloads)
+    folders_sln.create_box_folder(box_client, "tmp2", tmp)
+    folders_sln.print_folder_items_recursive(box_client, downloads)
+
+    try:
+        delete_item(tmp, recursive=False)
+    except BoxAPIException as err:
+        assert err.code == "folder_not_empty"
+        delete_item(tmp)
+    folders_sln.print_folder_items_recursive(box_client, downloads)
+
+    games = rename_item(personal, "games")
+    folders_sln.print_folder_items_recursive(box_client, downloads)
+    assert [item.name for item in cached_get_items(downloads)] == ["games"]
+    delete_item(games)
+    folders_sln.print_folder_items_recursive(box_client, downloads)
+    assert not cached_get_items(downloads)
+
+
+@pytest.mark.fake_box(latency=LATENCY)
+def test_folders_flow(benchmark, fake_box, box_client):
+    run_flow(benchmark, fake_box, lambda: folders_flow(box_client), lambda: seed_folders(fake_box))
+
+
+@pytest.mark.fake_box(latency=LATENCY, rate_limit_every=10)
+def test_folders_flow_rate_limited(benchmark, fake_box, box_client):
+    run_flow(benchmark, fake_box, lambda: folders_flow(box_client), lambda: seed_folders(fake_box))
+    assert fake_box.rate_limited > 0
+
+
+# files
+
+
+def seed_files(fake_box: FakeBoxServer) -> Dict:
+    files_root = fake_box.add_folder("files")
+    fake_box.add_file("sample_file.txt", files_root, b"This is a sample file")
+    return {"files_root_id": files_root}
+
+
+def files_flow(box_client: Client, workdir: str, files_root_id: str):
+    """files_sln uploads, downloads and __main__"""
+    files_root = box_client.folder(folder_id=files_root_id).get()
+
+    # the sample file exists, so this updates its contents
+    sample_file = files_sln.upload_file(box_client, files_root, SAMPLE_FILE)
+    files_sln.download_file(sample_file, os.path.join(workdir, "sample_file_downloaded.txt"))
+    user_root = box_client.folder(folder_id="0").get()
+    files_sln.download_zip(
+        box_client, os.path.join(workdir, "sample_zip_downloaded.zip"), list(user_root.get_items())
+    )
+
+    file = files_sln.get_file_by_id(sample_file.id)
+    files_sln.file_to_json(file)
+    files_sln.file_update_description(file, "This is a sample file")
+    file = files_sln.get_file_by_id(sample_file.id)
+    files_sln.file_to_json(file)
+
+    file_copied = file.copy(parent_folder=files_root, name="sample_file_copy.txt")
+    files_sln.folder_list_contents(files_root)
+
+    file_moved = file_copied.move(parent_folder=user_root)
+    files_sln.folder_list_contents(user_root)
+
+    file_moved.delete()
+    files_sln.folder_list_contents(user_root)
+
+
+@pytest.mark.fake_box(latency=LATENCY)
+def test_files_flow(benchmark, fake_box, box_client, monkeypatch, tmp_path):
+    monkeypatch.setattr(files_sln, "client", box_client, raising=False)
+    run_flow(
+        benchmark,
+        fake_box,
+        lambda files_root_id: files_flow(box_client, str(tmp_path), files_root_id),
+        lambda: seed_files(fake_box),
+    )
+
+
+# search
+
+
+def seed_search(fake_box: FakeBoxServer) -> Dict:
+    for folder_name in sorted(os.listdir(SEARCH_SAMPLES)):
+        folder_id = fake_box.add_folder(folder_name)
+        for file_name in sorted(os.listdir(os.path.join(SEARCH_SAMPLES, folder_name))):
+            with open(os.path.join(SEARCH_SAMPLES, folder_name, file_name), "rb") as file:
+                fake_box.add_file(file_name, folder_id, file.read())
+    return {}
+
+
+def search_flow(box_client: Client):
+    """search_sln __main__"""
+    for search in SEARCHES:
+        search_sln.print_search_results(search_sln.simple_search(**search))
+
+    for item in search_sln.simple_search("banana"):
+        assert item.parent.name
+
+    folders = {item.name: item for item in search_sln.simple_search('"apple banana"', result_type="folder")}
+    ancestors = [folders["apple banana"], box_client.folder(folders["apple banana"].id)]
+    search_sln.print_search_results(
+        search_sln.simple_search("banana", ancestor_folders=ancestors, result_type="file")
+    )
+
+
+@pytest.mark.fake_box(latency=LATENCY)
+def test_search_flow(benchmark, fake_box, box_client, monkeypatch):
+    monkeypatch.setattr(search_sln, "client", box_client, raising=False)
+    run_flow(benchmark, fake_box, lambda: search_flow(box_client), lambda: seed_search(fake_box))
+
+
+# representations
+
+
+def seed_representations(fake_box: FakeBoxServer) -> Dict:
+    demo_folder = fake_box.add_folder("representations")
+    ids = {"demo_folder_id": demo_folder}
+    for key, name in (("docx_id", "Single Page.docx"), ("pptx_id", "Document (Powerpoint).pptx")):
+        ids[key] = fake_box.add_file(name, demo_folder, b"representation sample")
+    return ids
+
+
+def representations_flow(box_client: Client, demo_folder_id: str, docx_id: str, pptx_id: str):
+    """file_representations_sln main"""
+    sln = file_representations_sln
+    access_token = box_client.auth.access_token
+
+    file_docx = box_client.file(docx_id).get()
+    sln.file_representations_print(file_docx.name, sln.file_representations(file_docx))
+    docx_jpg = sln.file_representations(file_docx, "[jpg?dimensions=320x320]")
+    sln.representation_download(access_token, docx_jpg[0], file_docx.name)
+    assert sln.file_thubmnail(file_docx, "94x94", "jpg")
+
+    file_ppt = box_client.file(pptx_id).get()
+    ppt_pdf = sln.file_representations(file_ppt, "[pdf]")
+    sln.representation_download(access_token, ppt_pdf[0], file_ppt.name)
+
+    folder = box_client.folder(demo_folder_id).get()
+    sln.folder_list_representation_status(folder, "extracted_text")
+
+    ppt_text = sln.file_representations(file_ppt, "[extracted_text]")
+    if ppt_text[0]["status"]["state"] == "none":
+        sln.do_request(ppt_text[0]["info"]["url"], access_token)
+    ppt_text = sln.file_representations(file_ppt, "[extracted_text]")
+    assert ppt_text[0]["status"]["state"] == "success"
+    sln.representation_download(access_token, ppt_text[0], file_ppt.name)
+
+
+@pytest.mark.fake_box(latency=LATENCY)
+def test_representations_flow(benchmark, fake_box, box_client, monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    run_flow(
+        benchmark,
+        fake_box,
+        lambda **ids: representations_flow(box_client, **ids),
+        lambda: seed_representations(fake_box),
+    )
@@ -0,0 +1,63 @@
+"""Shared fixtures, running the SDK against the local Box API stand-in"""
+import pytest
+from boxsdk import Client
+
+from tests.fake_box import FakeBoxServer
+from tests.sample_trees import build_tree
+from utils.box_client import get_ccg_enterprise_client, invalidate_shared_clients
+from utils.config import AppConfig, reload_config
+from utils.folder_cache import get_folder_cache
+from utils.path_resolver import get_path_resolver
+from utils.sha1_index import Sha1Index
+from utils.upload_journal import UploadJournal
+
+
+def pytest_configure(config):
+    config.addinivalue_line(
+        "markers",
+        "fake_box(latency=0.0, rate_limit_every=0, retry_after=0, upload_part_size=8388608, parent_etags=True): "
+        "configures the Box API stand-in",
+    )
+
+
+@pytest.fixture(name="fake_box")
+def fixture_fake_box(request, monkeypatch, tmp_path) -> FakeBoxServer:
+    """Box API stand-in the SDK points to, configured by the fake_box marker"""
+    marker = request.node.get_closest_marker("fake_box")
+    kwargs = marker.kwargs if marker else {}
+    # ids restart with every server, so nothing cached for a previous one applies
+    get_folder_cache().clear()
+    get_path_resolver().clear()
+    monkeypatch.setattr("utils.upload_journal._journal", UploadJournal(str(tmp_path / "upload_journal")))
+    sha1_index = Sha1Index(str(tmp_path / "sha1_index.db"))
+    monkeypatch.setattr("utils.sha1_index._index", sha1_index)
+    with FakeBoxServer(**kwargs) as server:
+        server.point_sdk(monkeypatch)
+        yield server
+    sha1_index.close()
+
+
+@pytest.fixture(name="config")
+def fixture_config(monkeypatch) -> AppConfig:
+    """Configuration with dummy CCG credentials"""
+    monkeypatch.setenv("CLIENT_ID", "client_id")
+    monkeypatch.setenv("CLIENT_SECRET", "client_secret")
+    monkeypatch.setenv("ENTERPRISE_ID", "12345")
+    invalidate_shared_clients()
+    yield reload_config()
+    monkeypatch.undo()
+    invalidate_shared_clients()
+    reload_config()
+
+
+@pytest.fixture(name="box_client")
+def fixture_box_client(fake_box, config) -> Client:
+    """CCG enterprise client talking to the stand-in"""
+    return get_ccg_enterprise_client(config)
+
+
+@pytest.fixture(name="root")
+def fixture_root(fake_box, box_client):
+    """Root folder of a sample tree built by build_tree"""
+    build_tree(fake_box)
+    return box_client.folder("0")
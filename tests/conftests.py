@@ -1 +0,0 @@
-import pytest
\ No newline at end of file
@@ -0,0 +1,1081 @@
+"""
+Local stand-in for the Box API
+---
+A threaded HTTP server keeping an in-memory Box account and answering the
+endpoints the workshops use: folders, files, uploads, upload sessions, downloads, search,
+representations, shared links, comments, zip downloads and the events stream.
+Every request can be delayed and every nth API request answered with a 429,
+so the flows can be exercised and measured without Box credentials or network access.
+"""
+import base64
+import email.parser
+import email.policy
+import hashlib
+import io
+import itertools
+import json
+import re
+import threading
+import time
+import urllib.parse
+import zipfile
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Tuple
+
+from boxsdk.config import API
+
+USER = {
+    "type": "user",
+    "id": "1",
+    "name": "Workshop User",
+    "login": "workshop@example.com",
+}
+
+# representations returned when no X-Rep-Hints header is sent
+REPRESENTATIONS = ["jpg?dimensions=32x32", "png?dimensions=1024x1024", "pdf", "extracted_text"]
+
+# representations generated on demand, by requesting their info url
+ON_DEMAND_REPRESENTATIONS = ("extracted_text",)
+
+Response = Tuple[int, object, Dict[str, str]]
+
+
+class FakeBoxHandler(BaseHTTPRequestHandler):
+    """Routes the SDK requests to the FakeBoxServer"""
+
+    protocol_version = "HTTP/1.1"
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        pass
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        self.server.box.handle(self, "GET")
+
+    def do_POST(self):  # pylint: disable=invalid-name
+        self.server.box.handle(self, "POST")
+
+    def do_PUT(self):  # pylint: disable=invalid-name
+        self.server.box.handle(self, "PUT")
+
+    def do_DELETE(self):  # pylint: disable=invalid-name
+        self.server.box.handle(self, "DELETE")
+
+    def do_OPTIONS(self):  # pylint: disable=invalid-name
+        self.server.box.handle(self, "OPTIONS")
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def _error(status: int, code: str, message: str = "", context_info: dict = None) -> Response:
+    payload = {"type": "error", "status": status, "code": code, "message": message or code}
+    if context_info is not None:
+        payload["context_info"] = context_info
+    return status, payload, {}
+
+
+def _words(text: str) -> List[str]:
+    return re.findall(r"\w+", text.lower())
+
+
+class FakeBoxServer:
+    """
+    Box API stand-in running on a background thread.
+    `latency` seconds are added to every request, and every
+    `rate_limit_every`th API request is answered with a 429
+    asking to retry after `retry_after` seconds.
+    Upload sessions use parts of `upload_part_size` bytes, and the next
+    `corrupt_parts` parts are damaged in transit, failing their digest check.
+    Changes to a folder's children bump the folder's etag and sequence_id,
+    unless `parent_etags` is False, which only moves its content_modified_at.
+    Refresh tokens are single use, like Box's, and valid authorization codes start with "code".
+    """
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        rate_limit_every: int = 0,
+        retry_after: int = 0,
+        upload_part_size: int = 8 * 1024 * 1024,
+        parent_etags: bool = True,
+    ) -> None:
+        self.latency = latency
+        self.rate_limit_every = rate_limit_every
+        self.retry_after = retry_after
+        self.upload_part_size = upload_part_size
+        self.parent_etags = parent_etags
+        self.corrupt_parts = 0
+        self.token_requests = 0
+        self.refresh_grants = 0
+        self.api_requests = 0
+        self.rate_limited = 0
+        self.refresh_tokens = set()
+        self.items: Dict[str, dict] = {}
+        self.comments: Dict[str, dict] = {}
+        self.zips: Dict[str, List[str]] = {}
+        self.generated = set()
+        self.events: List[dict] = []
+        self.upload_sessions: Dict[str, dict] = {}
+        self._lock = threading.RLock()
+        self._new_events = threading.Condition(self._lock)
+        self._ids = itertools.count(1000)
+        self.reset()
+        self._http = ThreadingHTTPServer(("127.0.0.1", 0), FakeBoxHandler)
+        self._http.daemon_threads = True
+        self._http.box = self
+        self._thread = threading.Thread(target=self._http.serve_forever, daemon=True)
+        self._routes: List[Tuple[str, "re.Pattern", Callable[..., Response]]] = [
+            ("POST", r"/oauth2/token", self.token),
+            ("GET", r"/2\.0/users/me", self.users_me),
+            ("GET", r"/2\.0/folders/(\w+)", self.get_item),
+            ("PUT", r"/2\.0/folders/(\w+)", self.update_item),
+            ("DELETE", r"/2\.0/folders/(\w+)", self.delete_item),
+            ("GET", r"/2\.0/folders/(\w+)/items", self.folder_items),
+            ("POST", r"/2\.0/folders/(\w+)/copy", self.copy_item),
+            ("POST", r"/2\.0/folders", self.create_folder),
+            ("GET", r"/2\.0/files/(\w+)", self.get_item),
+            ("PUT", r"/2\.0/files/(\w+)", self.update_item),
+            ("DELETE", r"/2\.0/files/(\w+)", self.delete_item),
+            ("POST", r"/2\.0/files/(\w+)/copy", self.copy_item),
+            ("GET", r"/2\.0/files/(\w+)/content", self.download),
+            ("OPTIONS", r"/2\.0/files/content", self.preflight),
+            ("OPTIONS", r"/2\.0/files/(\w+)/content", self.preflight_version),
+            ("POST", r"/api/2\.0/files/content", self.upload),
+            ("POST", r"/api/2\.0/files/(\w+)/content", self.upload_version),
+            ("POST", r"/api/2\.0/files/upload_sessions", self.create_upload_session),
+            ("POST", r"/api/2\.0/files/(\w+)/upload_sessions", self.create_upload_session),
+            ("GET", r"/api/2\.0/files/upload_sessions/(\w+)", self.get_upload_session),
+            ("PUT", r"/api/2\.0/files/upload_sessions/(\w+)", self.upload_part),
+            ("GET", r"/api/2\.0/files/upload_sessions/(\w+)/parts", self.upload_session_parts),
+            ("POST", r"/api/2\.0/files/upload_sessions/(\w+)/commit", self.commit_upload_session),
+            ("DELETE", r"/api/2\.0/files/upload_sessions/(\w+)", self.abort_upload_session),
+            ("GET", r"/2\.0/files/(\w+)/comments", self.file_comments),
+            ("POST", r"/2\.0/comments", self.add_comment),
+            ("DELETE", r"/2\.0/comments/(\w+)", self.delete_comment),
+            ("GET", r"/2\.0/search", self.search),
+            ("GET", r"/2\.0/shared_items", self.shared_item),
+            ("GET", r"/2\.0/internal_files/(\w+)/representations/(\w+)", self.representation_info),
+            (
+                "GET",
+                r"/2\.0/internal_files/(\w+)/representations/(\w+)/content/(.*)",
+                self.representation_content,
+            ),
+            ("POST", r"/2\.0/zip_downloads", self.create_zip),
+            ("GET", r"/2\.0/zip_downloads/(\w+)/content", self.zip_content),
+            ("GET", r"/2\.0/zip_downloads/(\w+)/status", self.zip_status),
+            ("GET", r"/2\.0/events", self.get_events),
+            ("OPTIONS", r"/2\.0/events", self.events_options),
+            ("GET", r"/realtime", self.realtime),
+        ]
+        self._routes = [
+            (method, re.compile(pattern), handler) for method, pattern, handler in self._routes
+        ]
+
+    @property
+    def url(self) -> str:
+        host, port = self._http.server_address
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeBoxServer":
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._http.shutdown()
+        self._http.server_close()
+
+    def __enter__(self) -> "FakeBoxServer":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def point_sdk(self, monkeypatch):
+        """Points the SDK API configuration to this server"""
+        monkeypatch.setattr(API, "BASE_API_URL", f"{self.url}/2.0")
+        monkeypatch.setattr(API, "UPLOAD_URL", f"{self.url}/api/2.0")
+        monkeypatch.setattr(API, "OAUTH2_API_URL", f"{self.url}/oauth2")
+
+    def reset(self):
+        """Empties the account, keeping only the root folder"""
+        with self._lock:
+            self.items = {}
+            self.comments = {}
+            self.zips = {}
+            self.generated = set()
+            self.events = []
+            self.upload_sessions = {}
+            self.corrupt_parts = 0
+            self._add_item("folder", "All Files", None, item_id="0")
+
+    def reset_counters(self):
+        """Zeroes the request counters"""
+        with self._lock:
+            self.token_requests = 0
+            self.refresh_grants = 0
+            self.api_requests = 0
+            self.rate_limited = 0
+
+    # seeding, without going through http
+
+    def add_folder(self, name: str, parent_id: str = "0") -> str:
+        """Creates a folder and returns its id"""
+        with self._lock:
+            return self._add_item("folder", name, parent_id)["id"]
+
+    def add_file(
+        self, name: str, parent_id: str = "0", content: bytes = b"", description: str = ""
+    ) -> str:
+        """Creates a file and returns its id"""
+        with self._lock:
+            return self._add_item(
+                "file", name, parent_id, content=content, description=description
+            )["id"]
+
+    # dispatch
+
+    def handle(self, request: BaseHTTPRequestHandler, method: str):
+        """Dispatches a request"""
+        length = int(request.headers.get("Content-Length") or 0)
+        body = request.rfile.read(length) if length else b""
+        parsed = urllib.parse.urlparse(request.path)
+        query = {key: values[-1] for key, values in urllib.parse.parse_qs(parsed.query).items()}
+
+        if self.latency:
+            time.sleep(self.latency)
+
+        if not parsed.path.startswith("/oauth2/"):
+            with self._lock:
+                self.api_requests += 1
+                limited = bool(self.rate_limit_every) and (
+                    self.api_requests % self.rate_limit_every == 0
+                )
+                if limited:
+                    self.rate_limited += 1
+            if limited:
+                status, payload, _ = _error(429, "rate_limit_exceeded", "Request rate limit exceeded")
+                self.respond(request, status, payload, {"Retry-After": str(self.retry_after)})
+                return
+
+        for route_method, pattern, handler in self._routes:
+            match = pattern.fullmatch(parsed.path)
+            if route_method == method and match:
+                try:
+                    status, payload, headers = handler(
+                        *match.groups(), query=query, body=body, headers=request.headers
+                    )
+                except KeyError:
+                    status, payload, headers = _error(404, "not_found", "Not Found")
+                break
+        else:
+            status, payload, headers = _error(404, "not_found", f"{method} {parsed.path}")
+
+        self.respond(request, status, payload, headers)
+
+    @staticmethod
+    def respond(
+        request: BaseHTTPRequestHandler, status: int, payload, headers: Dict[str, str] = None
+    ):
+        """Sends a JSON, or raw bytes, response"""
+        headers = dict(headers or {})
+        if payload is None:
+            content = b""
+        elif isinstance(payload, bytes):
+            content = payload
+            headers.setdefault("Content-Type", "application/octet-stream")
+        else:
+            content = json.dumps(payload).encode("utf-8")
+            headers.setdefault("Content-Type", "application/json")
+        request.send_response(status)
+        for name, value in headers.items():
+            request.send_header(name, value)
+        request.send_header("Content-Length", str(len(content)))
+        request.end_headers()
+        request.wfile.write(content)
+
+    # item model
+
+    def _add_item(
+        self, item_type: str, name: str, parent_id: Optional[str], item_id: str = None, **fields
+    ) -> dict:
+        item = {
+            "type": item_type,
+            "id": item_id or str(next(self._ids)),
+            "name": name,
+            "parent_id": parent_id,
+            "version": 0,
+            "description": "",
+            "created_at": _now(),
+            "modified_at": _now(),
+            "content_modified_at": _now(),
+            "shared_link": None,
+        }
+        item.update(fields)
+        if item_type == "file":
+            item.setdefault("content", b"")
+            item["sha1"] = hashlib.sha1(item["content"]).hexdigest()
+        self.items[item["id"]] = item
+        if parent_id is not None:
+            self._touch_parent(self.items[parent_id])
+        return item
+
+    @staticmethod
+    def _touch(item: dict):
+        item["version"] += 1
+        item["modified_at"] = _now()
+
+    def _touch_parent(self, folder: dict):
+        """A child of the folder changed"""
+        if self.parent_etags:
+            self._touch(folder)
+        folder["content_modified_at"] = _now()
+
+    def _children(self, folder_id: str) -> List[dict]:
+        return [item for item in self.items.values() if item["parent_id"] == folder_id]
+
+    def _child_named(self, folder_id: str, name: str) -> Optional[dict]:
+        for item in self.items.values():
+            if item["parent_id"] == folder_id and item["name"] == name:
+                return item
+        return None
+
+    def _is_descendant(self, item: dict, ancestor_id: str) -> bool:
+        parent_id = item["parent_id"]
+        while parent_id is not None:
+            if parent_id == ancestor_id:
+                return True
+            parent_id = self.items[parent_id]["parent_id"]
+        return False
+
+    def _mini(self, item: dict) -> dict:
+        mini = {
+            "type": item["type"],
+            "id": item["id"],
+            "etag": str(item["version"]),
+            "sequence_id": str(item["version"]),
+            "name": item["name"],
+        }
+        if item["type"] == "file":
+            mini["sha1"] = item["sha1"]
+            mini["file_version"] = {"type": "file_version", "id": f"{item['id']}{item['version']}"}
+        return mini
+
+    def _full(self, item: dict) -> dict:
+        path = []
+        parent_id = item["parent_id"]
+        while parent_id is not None:
+            path.insert(0, self._mini(self.items[parent_id]))
+            parent_id = self.items[parent_id]["parent_id"]
+
+        full = self._mini(item)
+        full.update(
+            {
+                "description": item["description"],
+                "created_at": item["created_at"],
+                "modified_at": item["modified_at"],
+                "content_modified_at": item["content_modified_at"],
+                "parent": path[-1] if path else None,
+                "path_collection": {"total_count": len(path), "entries": path},
+                "shared_link": item["shared_link"],
+                "item_status": "active",
+                "created_by": USER,
+                "modified_by": USER,
+                "owned_by": USER,
+            }
+        )
+        if item["type"] == "file":
+            full["size"] = len(item["content"])
+            full["extension"] = item["name"].rsplit(".", 1)[-1] if "." in item["name"] else ""
+        else:
+            full["size"] = sum(
+                len(other["content"])
+                for other in self.items.values()
+                if other["type"] == "file" and self._is_descendant(other, item["id"])
+            )
+        return full
+
+    def _event(self, event_type: str, item: dict, **source_fields):
+        """Appends an event about item to the user events stream"""
+        source = self._full(item)
+        source.update(source_fields)
+        self.events.append(
+            {
+                "type": "event",
+                "event_id": f"event_{len(self.events)}_{item['id']}",
+                "event_type": event_type,
+                "created_at": _now(),
+                "created_by": USER,
+                "source": source,
+            }
+        )
+        self._new_events.notify_all()
+
+    def _project(self, item: dict, query: dict, mini: bool = False) -> dict:
+        """Applies the fields query parameter, like Box does"""
+        if "fields" not in query:
+            return self._mini(item) if mini else self._full(item)
+        full = self._full(item)
+        projected = {key: full[key] for key in ("type", "id", "etag")}
+        for field in query["fields"].split(","):
+            if field in full:
+                projected[field] = full[field]
+        return projected
+
+    def _conflict(self, item: dict, as_list: bool) -> Response:
+        """409 item_name_in_use, Box sends a list of conflicts for folders only"""
+        conflict = self._mini(item)
+        return _error(
+            409,
+            "item_name_in_use",
+            "Item with the same name already exists",
+            {"conflicts": [conflict] if as_list else conflict},
+        )
+
+    # auth and users
+
+    def issue_refresh_token(self, refresh_token: str):
+        """Makes a refresh token valid for one refresh"""
+        with self._lock:
+            self.refresh_tokens.add(refresh_token)
+
+    def token(self, query: dict, body: bytes, headers) -> Response:
+        """POST /oauth2/token"""
+        form = urllib.parse.parse_qs(body.decode())
+        grant_type = form.get("grant_type", [None])[0]
+        with self._lock:
+            self.token_requests += 1
+            count = self.token_requests
+            if grant_type == "refresh_token":
+                refresh_token = form.get("refresh_token", [None])[0]
+                if refresh_token not in self.refresh_tokens:
+                    return (
+                        400,
+                        {"error": "invalid_grant", "error_description": "Invalid refresh token"},
+                        {},
+                    )
+                self.refresh_tokens.remove(refresh_token)
+                self.refresh_grants += 1
+            if grant_type == "authorization_code" and not form.get("code", [""])[0].startswith("code"):
+                return 400, {"error": "invalid_grant", "error_description": "Auth code doesn't exist"}, {}
+            if grant_type in ("refresh_token", "authorization_code"):
+                self.refresh_tokens.add(f"refresh_token_{count}")
+
+        payload = {
+            "access_token": f"access_token_{count}",
+            "expires_in": 3600,
+            "token_type": "bearer",
+            "restricted_to": [],
+        }
+        if grant_type in ("refresh_token", "authorization_code"):
+            payload["refresh_token"] = f"refresh_token_{count}"
+        return 200, payload, {}
+
+    def users_me(self, query: dict, body: bytes, headers) -> Response:
+        """GET /users/me"""
+        return 200, USER, {}
+
+    # folders and files
+
+    def get_item(self, item_id: str, query: dict, body: bytes, headers) -> Response:
+        """GET /folders/:id and /files/:id, including file representations"""
+        with self._lock:
+            item = self.items[item_id]
+            payload = self._project(item, query)
+            if item["type"] == "file" and "representations" in query.get("fields", ""):
+                payload["representations"] = {
+                    "entries": self._representations(item, headers.get("X-Rep-Hints"))
+                }
+        return 200, payload, {}
+
+    def folder_items(self, folder_id: str, query: dict, body: bytes, headers) -> Response:
+        """GET /folders/:id/items, offset or marker based"""
+        limit = min(int(query.get("limit", 100)), 1000)
+        with self._lock:
+            if self.items[folder_id]["type"] != "folder":
+                return _error(404, "not_found", "Not Found")
+            children = sorted(
+                self._children(folder_id), key=lambda item: (item["type"] != "folder", item["name"])
+            )
+            if query.get("usemarker", "").lower() == "true":
+                start = int(query.get("marker") or 0)
+                end = start + limit
+                payload = {"limit": limit, "next_marker": str(end) if end < len(children) else None}
+            else:
+                start = int(query.get("offset", 0))
+                end = start + limit
+                payload = {"total_count": len(children), "offset": start, "limit": limit}
+            payload["entries"] = [self._project(item, query, mini=True) for item in children[start:end]]
+        return 200, payload, {}
+
+    def create_folder(self, query: dict, body: bytes, headers) -> Response:
+        """POST /folders"""
+        data = json.loads(body)
+        parent_id = data["parent"]["id"]
+        with self._lock:
+            _ = self.items[parent_id]
+            existing = self._child_named(parent_id, data["name"])
+            if existing is not None:
+                return self._conflict(existing, as_list=True)
+            folder = self._add_item("folder", data["name"], parent_id)
+            self._event("ITEM_CREATE", folder)
+            return 201, self._full(folder), {}
+
+    def update_item(self, item_id: str, query: dict, body: bytes, headers) -> Response:
+        """PUT /folders/:id and /files/:id: rename, move, description and shared link"""
+        data = json.loads(body)
+        with self._lock:
+            item = self.items[item_id]
+            parent_id = (data.get("parent") or {}).get("id", item["parent_id"])
+            name = data.get("name", item["name"])
+            if (parent_id, name) != (item["parent_id"], item["name"]):
+                existing = self._child_named(parent_id, name)
+                if existing is not None:
+                    return self._conflict(existing, as_list=item["type"] == "folder")
+                self._touch_parent(self.items[item["parent_id"]])
+                if parent_id != item["parent_id"]:
+                    self._touch_parent(self.items[parent_id])
+                event_type = "ITEM_MOVE" if parent_id != item["parent_id"] else "ITEM_RENAME"
+                item["parent_id"], item["name"] = parent_id, name
+                self._event(event_type, item)
+            if "description" in data:
+                item["description"] = data["description"]
+            if "shared_link" in data:
+                item["shared_link"] = self._shared_link(item, data["shared_link"])
+            self._touch(item)
+            return 200, self._project(item, query), {}
+
+    def delete_item(self, item_id: str, query: dict, body: bytes, headers) -> Response:
+        """DELETE /folders/:id and /files/:id"""
+        with self._lock:
+            item = self.items[item_id]
+            recursive = query.get("recursive", "false").lower() == "true"
+            if item["type"] == "folder" and self._children(item_id) and not recursive:
+                return _error(400, "folder_not_empty", "Cannot delete - folder not empty")
+            self._event("ITEM_TRASH", item, item_status="trashed")
+            doomed = [other["id"] for other in self.items.values() if self._is_descendant(other, item_id)]
+            for other_id in doomed + [item_id]:
+                del self.items[other_id]
+            self._touch_parent(self.items[item["parent_id"]])
+        return 204, None, {}
+
+    def copy_item(self, item_id: str, query: dict, body: bytes, headers) -> Response:
+        """POST /folders/:id/copy and /files/:id/copy"""
+        data = json.loads(body)
+        parent_id = data["parent"]["id"]
+        with self._lock:
+            item = self.items[item_id]
+            name = data.get("name", item["name"])
+            existing = self._child_named(parent_id, name)
+            if existing is not None:
+                return self._conflict(existing, as_list=item["type"] == "folder")
+            copy = self._copy(item, parent_id, name)
+            self._event("ITEM_COPY", copy)
+            return 201, self._full(copy), {}
+
+    def _copy(self, item: dict, parent_id: str, name: str) -> dict:
+        fields = {"content": item["content"]} if item["type"] == "file" else {}
+        copy = self._add_item(item["type"], name, parent_id, description=item["description"], **fields)
+        for child in self._children(item["id"]):
+            self._copy(child, copy["id"], child["name"])
+        return copy
+
+    # uploads and downloads
+
+    def preflight(self, query: dict, body: bytes, headers) -> Response:
+        """OPTIONS /files/content"""
+        data = json.loads(body or b"{}")
+        parent_id = (data.get("parent") or {}).get("id")
+        with self._lock:
+            _ = self.items[parent_id]
+            existing = self._child_named(parent_id, data.get("name"))
+            if existing is not None:
+                return self._conflict(existing, as_list=False)
+        return 200, {"upload_url": f"{self.url}/api/2.0/files/content", "upload_token": None}, {}
+
+    def preflight_version(self, file_id: str, query: dict, body: bytes, headers) -> Response:
+        """OPTIONS /files/:id/content"""
+        with self._lock:
+            _ = self.items[file_id]
+        return (
+            200,
+            {"upload_url": f"{self.url}/api/2.0/files/{file_id}/content", "upload_token": None},
+            {},
+        )
+
+    @staticmethod
+    def _multipart(body: bytes, headers) -> Tuple[dict, bytes]:
+        """Returns the attributes and the file content of an upload"""
+        message = email.parser.BytesParser(policy=email.policy.HTTP).parsebytes(
+            f"Content-Type: {headers['Content-Type']}\r\n\r\n".encode() + body
+        )
+        attributes, content = {}, b""
+        for part in message.iter_parts():
+            name = part.get_param("name", header="content-disposition")
+            if name == "attributes":
+                attributes = json.loads(part.get_payload(decode=True))
+            elif name == "file":
+                content = part.get_payload(decode=True) or b""
+        return attributes, content
+
+    def upload(self, query: dict, body: bytes, headers) -> Response:
+        """POST upload /files/content"""
+        attributes, content = self._multipart(body, headers)
+        parent_id = attributes["parent"]["id"]
+        with self._lock:
+            _ = self.items[parent_id]
+            existing = self._child_named(parent_id, attributes["name"])
+            if existing is not None:
+                return self._conflict(existing, as_list=False)
+            file = self._add_item(
+                "file",
+                attributes["name"],
+                parent_id,
+                content=content,
+                description=attributes.get("description") or "",
+            )
+            self._event("ITEM_UPLOAD", file)
+            return 201, {"total_count": 1, "entries": [self._full(file)]}, {}
+
+    def upload_version(self, file_id: str, query: dict, body: bytes, headers) -> Response:
+        """POST upload /files/:id/content"""
+        attributes, content = self._multipart(body, headers)
+        with self._lock:
+            file = self.items[file_id]
+            file["content"] = content
+            file["sha1"] = hashlib.sha1(content).hexdigest()
+            file["name"] = attributes.get("name") or file["name"]
+            self._touch(file)
+            file["content_modified_at"] = file["modified_at"]
+            self._touch_parent(self.items[file["parent_id"]])
+            self._event("ITEM_UPLOAD", file)
+            return 201, {"total_count": 1, "entries": [self._full(file)]}, {}
+
+    # upload sessions
+
+    def _upload_session(self, session: dict) -> dict:
+        url = f"{self.url}/api/2.0/files/upload_sessions/{session['id']}"
+        return {
+            "type": "upload_session",
+            "id": session["id"],
+            "session_expires_at": session["expires_at"],
+            "part_size": session["part_size"],
+            "total_parts": -(-session["file_size"] // session["part_size"]),
+            "num_parts_processed": len(session["parts"]),
+            "session_endpoints": {
+                "upload_part": url,
+                "commit": f"{url}/commit",
+                "abort": url,
+                "list_parts": f"{url}/parts",
+                "status": url,
+            },
+        }
+
+    @staticmethod
+    def _digest(headers) -> str:
+        """The sha1 of a Digest: SHA=<base64> header, as hex"""
+        digest = (headers.get("Digest") or "").partition("SHA=")[2]
+        return base64.b64decode(digest).hex() if digest else ""
+
+    def create_upload_session(
+        self, file_id: str = None, *, query: dict, body: bytes, headers
+    ) -> Response:
+        """POST upload /files/upload_sessions and /files/:id/upload_sessions"""
+        data = json.loads(body or b"{}")
+        with self._lock:
+            if file_id is None:
+                _ = self.items[data["folder_id"]]
+                existing = self._child_named(data["folder_id"], data["file_name"])
+                if existing is not None:
+                    return self._conflict(existing, as_list=False)
+            else:
+                _ = self.items[file_id]
+            session = {
+                # upper case hex, like the session ids Box sends
+                "id": hashlib.md5(f"session{next(self._ids)}".encode()).hexdigest().upper(),
+                "folder_id": data.get("folder_id"),
+                "file_id": file_id,
+                "file_name": data.get("file_name"),
+                "file_size": int(data["file_size"]),
+                "part_size": self.upload_part_size,
+                "expires_at": _now(),
+                "parts": {},
+            }
+            self.upload_sessions[session["id"]] = session
+            return 201, self._upload_session(session), {}
+
+    def get_upload_session(self, session_id: str, query: dict, body: bytes, headers) -> Response:
+        """GET upload /files/upload_sessions/:id"""
+        with self._lock:
+            return 200, self._upload_session(self.upload_sessions[session_id]), {}
+
+    def upload_part(self, session_id: str, query: dict, body: bytes, headers) -> Response:
+        """PUT upload /files/upload_sessions/:id, checking the range and the part digest"""
+        with self._lock:
+            session = self.upload_sessions[session_id]
+            if self.corrupt_parts > 0:
+                self.corrupt_parts -= 1
+                body = bytes([body[0] ^ 0xFF]) + body[1:]
+        byte_range = re.fullmatch(r"bytes (\d+)-(\d+)/(\d+)", headers.get("Content-Range") or "")
+        if byte_range is None:
+            return _error(416, "range_not_satisfiable", "Missing or invalid Content-Range")
+        start, end, total = (int(value) for value in byte_range.groups())
+        last = start + session["part_size"] >= session["file_size"]
+        expected_end = session["file_size"] - 1 if last else start + session["part_size"] - 1
+        if total != session["file_size"] or start % session["part_size"] or end != expected_end:
+            return _error(416, "range_not_satisfiable", "Parts must be aligned on the part size")
+        if len(body) != end - start + 1:
+            return _error(416, "range_not_satisfiable", "Part size does not match its range")
+        sha1 = hashlib.sha1(body).hexdigest()
+        if sha1 != self._digest(headers):
+            return _error(400, "bad_digest", "The digest does not match the part content")
+
+        part = {"part_id": sha1[:8].upper(), "offset": start, "size": len(body), "sha1": sha1}
+        with self._lock:
+            session["parts"][start] = (part, body)
+        return 200, {"part": part}, {}
+
+    def upload_session_parts(self, session_id: str, query: dict, body: bytes, headers) -> Response:
+        """GET upload /files/upload_sessions/:id/parts"""
+        limit = int(query.get("limit", 100))
+        offset = int(query.get("offset", 0))
+        with self._lock:
+            session = self.upload_sessions[session_id]
+            parts = [part for _, (part, _) in sorted(session["parts"].items())]
+        return (
+            200,
+            {
+                "entries": parts[offset:offset + limit],
+                "limit": limit,
+                "offset": offset,
+                "total_count": len(parts),
+            },
+            {},
+        )
+
+    def commit_upload_session(self, session_id: str, query: dict, body: bytes, headers) -> Response:
+        """POST upload /files/upload_sessions/:id/commit, assembling the listed parts"""
+        data = json.loads(body or b"{}")
+        with self._lock:
+            session = self.upload_sessions[session_id]
+            uploaded = session["parts"]
+            listed = sorted(data.get("parts") or [], key=lambda part: part["offset"])
+            if any(
+                uploaded.get(part["offset"], ({},))[0].get("part_id") != part["part_id"]
+                for part in listed
+            ):
+                return _error(400, "invalid_parts", "A listed part was not uploaded")
+            content = b"".join(uploaded[part["offset"]][1] for part in listed)
+            if len(content) != session["file_size"]:
+                return _error(400, "missing_parts", "The parts do not cover the file")
+            if hashlib.sha1(content).hexdigest() != self._digest(headers):
+                return _error(400, "bad_digest", "The digest does not match the file content")
+
+            attributes = data.get("attributes") or {}
+            if session["file_id"] is None:
+                existing = self._child_named(session["folder_id"], session["file_name"])
+                if existing is not None:
+                    return self._conflict(existing, as_list=False)
+                file = self._add_item(
+                    "file",
+                    session["file_name"],
+                    session["folder_id"],
+                    content=content,
+                    description=attributes.get("description") or "",
+                )
+            else:
+                file = self.items[session["file_id"]]
+                file["content"] = content
+                file["sha1"] = hashlib.sha1(content).hexdigest()
+                file["name"] = session["file_name"] or file["name"]
+                self._touch(file)
+                file["content_modified_at"] = file["modified_at"]
+                self._touch_parent(self.items[file["parent_id"]])
+            del self.upload_sessions[session_id]
+            self._event("ITEM_UPLOAD", file)
+            return 201, {"total_count": 1, "entries": [self._full(file)]}, {}
+
+    def abort_upload_session(self, session_id: str, query: dict, body: bytes, headers) -> Response:
+        """DELETE upload /files/upload_sessions/:id"""
+        with self._lock:
+            del self.upload_sessions[session_id]
+        return 204, None, {}
+
+    def download(self, file_id: str, query: dict, body: bytes, headers) -> Response:
+        """GET /files/:id/content, honoring byte ranges"""
+        with self._lock:
+            content = self.items[file_id]["content"]
+        byte_range = re.fullmatch(r"bytes=(\d+)-(\d*)", headers.get("Range") or "")
+        if byte_range is None:
+            return 200, content, {}
+        start = int(byte_range.group(1))
+        end = min(int(byte_range.group(2) or len(content) - 1), len(content) - 1)
+        return 206, content[start:end + 1], {"Content-Range": f"bytes {start}-{end}/{len(content)}"}
+
+    # comments
+
+    def file_comments(self, file_id: str, query: dict, body: bytes, headers) -> Response:
+        """GET /files/:id/comments"""
+        limit = int(query.get("limit", 100))
+        offset = int(query.get("offset", 0))
+        with self._lock:
+            _ = self.items[file_id]
+            entries = [
+                comment
+                for comment in self.comments.values()
+                if self._commented_file_id(comment) == file_id
+            ]
+        return (
+            200,
+            {
+                "total_count": len(entries),
+                "offset": offset,
+                "limit": limit,
+                "entries": entries[offset:offset + limit],
+            },
+            {},
+        )
+
+    def _commented_file_id(self, comment: dict) -> str:
+        while comment["item"]["type"] == "comment":
+            comment = self.comments[comment["item"]["id"]]
+        return comment["item"]["id"]
+
+    def add_comment(self, query: dict, body: bytes, headers) -> Response:
+        """POST /comments, on a file or as a reply to a comment"""
+        data = json.loads(body)
+        with self._lock:
+            comment = {
+                "type": "comment",
+                "id": str(next(self._ids)),
+                "message": data["message"],
+                "is_reply_comment": data["item"]["type"] == "comment",
+                "created_by": USER,
+                "created_at": _now(),
+                "modified_at": _now(),
+                "item": {"type": data["item"]["type"], "id": data["item"]["id"]},
+            }
+            self.comments[comment["id"]] = comment
+        return 201, comment, {}
+
+    def delete_comment(self, comment_id: str, query: dict, body: bytes, headers) -> Response:
+        """DELETE /comments/:id"""
+        with self._lock:
+            del self.comments[comment_id]
+        return 204, None, {}
+
+    # search
+
+    def search(self, query: dict, body: bytes, headers) -> Response:
+        """GET /search, terms are ANDed unless OR is used, NOT and "exact phrases" work too"""
+        terms = re.findall(r'"[^"]*"|\S+', query.get("query", ""))
+        content_types = query.get("content_types", "name,description,file_content").split(",")
+        ancestors = [folder_id for folder_id in query.get("ancestor_folder_ids", "").split(",") if folder_id]
+        limit = int(query.get("limit", 30))
+        offset = int(query.get("offset", 0))
+
+        with self._lock:
+            matches = [
+                item
+                for item in self.items.values()
+                if item["id"] != "0"
+                and (not query.get("type") or item["type"] == query["type"])
+                and (not ancestors or any(self._is_descendant(item, folder_id) for folder_id in ancestors))
+                and self._search_match(item, terms, content_types)
+            ]
+            page = [self._full(item) for item in matches[offset:offset + limit]]
+        return (
+            200,
+            {"total_count": len(matches), "offset": offset, "limit": limit, "entries": page},
+            {},
+        )
+
+    @staticmethod
+    def _search_match(item: dict, terms: List[str], content_types: List[str]) -> bool:
+        texts = []
+        if "name" in content_types:
+            texts.append(item["name"])
+        if "description" in content_types:
+            texts.append(item["description"] or "")
+        if "file_content" in content_types and item["type"] == "file":
+            texts.append(item["content"][:65536].decode("utf-8", "ignore"))
+        words = _words(" ".join(texts))
+        phrase = f" {' '.join(words)} "
+
+        result, operator, negate = None, "AND", False
+        for term in terms:
+            if term in ("AND", "OR"):
+                operator = term
+                continue
+            if term == "NOT":
+                negate = True
+                continue
+            if term.startswith('"'):
+                found = f" {' '.join(_words(term))} " in phrase
+            else:
+                found = all(word in words for word in _words(term))
+            if negate:
+                found, negate = not found, False
+            if result is None:
+                result = found
+            elif operator == "OR":
+                result = result or found
+            else:
+                result = result and found
+            operator = "AND"
+        return bool(result)
+
+    # shared links
+
+    def _shared_link(self, item: dict, settings: Optional[dict]) -> Optional[dict]:
+        if settings is None:
+            return None
+        token = hashlib.sha1(f"{item['type']}{item['id']}".encode()).hexdigest()[:16]
+        permissions = {"can_download": True, "can_preview": True, "can_edit": False}
+        permissions.update(settings.get("permissions") or {})
+        access = settings.get("access") or "open"
+        return {
+            "url": f"{self.url}/s/{token}",
+            "download_url": f"{self.url}/shared/static/{token}" if item["type"] == "file" else None,
+            "access": access,
+            "effective_access": access,
+            "permissions": permissions,
+            "is_password_enabled": bool(settings.get("password")),
+        }
+
+    def shared_item(self, query: dict, body: bytes, headers) -> Response:
+        """GET /shared_items"""
+        box_api = urllib.parse.parse_qs(headers.get("BoxApi", ""))
+        url = box_api.get("shared_link", [None])[0]
+        with self._lock:
+            for item in self.items.values():
+                if item["shared_link"] and item["shared_link"]["url"] == url:
+                    return 200, self._full(item), {}
+        return _error(404, "not_found", "Not Found")
+
+    # representations
+
+    def _representations(self, item: dict, rep_hints: Optional[str]) -> List[dict]:
+        hints = re.findall(r"\[([^\]]+)\]", rep_hints) if rep_hints else REPRESENTATIONS
+        entries = []
+        for option in itertools.chain.from_iterable(hint.split(",") for hint in hints):
+            representation, _, params = option.partition("?")
+            ready = (
+                representation not in ON_DEMAND_REPRESENTATIONS
+                or (item["id"], representation) in self.generated
+            )
+            base = f"{self.url}/2.0/internal_files/{item['id']}/representations/{representation}"
+            entries.append(
+                {
+                    "representation": representation,
+                    "properties": dict(urllib.parse.parse_qsl(params)),
+                    "info": {"url": base},
+                    "status": {"state": "success" if ready else "none"},
+                    "content": {"url_template": f"{base}/content/{{+asset_path}}"},
+                }
+            )
+        return entries
+
+    def representation_info(
+        self, file_id: str, representation: str, query: dict, body: bytes, headers
+    ) -> Response:
+        """GET representation info url, which generates the on demand representations"""
+        with self._lock:
+            _ = self.items[file_id]
+            self.generated.add((file_id, representation))
+        return 200, {"representation": representation, "status": {"state": "success"}}, {}
+
+    def representation_content(
+        self, file_id: str, representation: str, asset_path: str, query: dict, body: bytes, headers
+    ) -> Response:
+        """GET representation content"""
+        with self._lock:
+            name = self.items[file_id]["name"]
+        return 200, f"{representation} representation of {name}".encode(), {}
+
+    # zip downloads
+
+    def create_zip(self, query: dict, body: bytes, headers) -> Response:
+        """POST /zip_downloads"""
+        data = json.loads(body)
+        with self._lock:
+            zip_id = str(next(self._ids))
+            self.zips[zip_id] = [item["id"] for item in data["items"]]
+        return (
+            200,
+            {
+                "download_url": f"{self.url}/2.0/zip_downloads/{zip_id}/content",
+                "status_url": f"{self.url}/2.0/zip_downloads/{zip_id}/status",
+                "expires_at": _now(),
+                "name_conflicts": [],
+            },
+            {},
+        )
+
+    def zip_content(self, zip_id: str, query: dict, body: bytes, headers) -> Response:
+        """GET zip download content"""
+        buffer = io.BytesIO()
+        with self._lock, zipfile.ZipFile(buffer, "w") as archive:
+            for item_id in self.zips[zip_id]:
+                self._zip_add(archive, self.items[item_id], "")
+        return 200, buffer.getvalue(), {"Content-Type": "application/zip"}
+
+    def _zip_add(self, archive: zipfile.ZipFile, item: dict, prefix: str):
+        if item["type"] == "file":
+            archive.writestr(prefix + item["name"], item["content"])
+            return
+        for child in self._children(item["id"]):
+            self._zip_add(archive, child, f"{prefix}{item['name']}/")
+
+    def zip_status(self, zip_id: str, query: dict, body: bytes, headers) -> Response:
+        """GET zip download status"""
+        with self._lock:
+            count = len(self.zips[zip_id])
+        return (
+            200,
+            {
+                "total_file_count": count,
+                "downloaded_file_count": count,
+                "skipped_file_count": 0,
+                "skipped_folder_count": 0,
+                "state": "succeeded",
+            },
+            {},
+        )
+
+    # events
+
+    def get_events(self, query: dict, body: bytes, headers) -> Response:
+        """GET /events, stream positions are indexes in the event list"""
+        with self._lock:
+            if query.get("stream_position") == "now":
+                start = end = len(self.events)
+            else:
+                start = int(query.get("stream_position") or 0)
+                end = start + int(query.get("limit") or 100)
+            entries = self.events[start:end]
+            return (
+                200,
+                {"chunk_size": len(entries), "next_stream_position": start + len(entries), "entries": entries},
+                {},
+            )
+
+    def events_options(self, query: dict, body: bytes, headers) -> Response:
+        """OPTIONS /events, the long polling url"""
+        realtime = {
+            "type": "realtime_server",
+            "url": f"{self.url}/realtime?channel=workshop",
+            "ttl": "10",
+            "max_retries": "10",
+            "retry_timeout": 10,
+        }
+        return 200, {"chunk_size": 1, "entries": [realtime]}, {}
+
+    def realtime(self, query: dict, body: bytes, headers) -> Response:
+        """GET of the long polling url, answering as soon as there are events past stream_position"""
+        position = int(query.get("stream_position") or 0)
+        with self._new_events:
+            changed = self._new_events.wait_for(lambda: len(self.events) > position, timeout=1.0)
+        return 200, {"message": "new_change" if changed else "reconnect"}, {}
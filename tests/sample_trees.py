@@ -0,0 +1,28 @@
+"""Folder trees built on the Box API stand-in, shared by the walker, cache, snapshot, mirror and diff tests"""
+from typing import Iterator, List
+
+# subfolders per folder, and levels, of the tree built by build_tree
+WIDTH = 3
+DEPTH = 3
+
+
+def build_tree(fake_box, parent_id: str = "0", depth: int = 1) -> List[str]:
+    """Builds WIDTH folders and a file per folder, DEPTH levels deep, returning the paths"""
+    paths = []
+    for index in range(WIDTH):
+        folder_id = fake_box.add_folder(f"folder_{depth}_{index}", parent_id)
+        paths.append(f"folder_{depth}_{index}")
+        if depth < DEPTH:
+            paths.extend(f"folder_{depth}_{index}/{path}" for path in build_tree(fake_box, folder_id, depth + 1))
+    fake_box.add_file(f"file_{depth}.txt", parent_id, b"content")
+    paths.append(f"file_{depth}.txt")
+    return paths
+
+
+def serial_walk(folder, parent_path: str = "") -> Iterator[str]:
+    """Paths under a folder, listed one folder at a time with the plain SDK"""
+    for item in folder.get_items():
+        path = f"{parent_path}/{item.name}"
+        yield path
+        if item.type == "folder":
+            yield from serial_walk(item, path)
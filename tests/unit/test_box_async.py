@@ -0,0 +1,120 @@
+"""Tests for the asyncio facade over the workshop helpers"""
+import asyncio
+import os
+import subprocess
+import sys
+import threading
+import time
+
+import pytest
+from boxsdk import BoxAPIException
+
+from workshops import box_async
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+@pytest.fixture(autouse=True)
+def fresh_executor(monkeypatch):
+    """Every test gets its own executor, shut down afterwards"""
+    monkeypatch.setattr("workshops.box_async._executor", None)
+    yield
+    if box_async._executor is not None:  # pylint: disable=protected-access
+        box_async._executor.shutdown(wait=True)  # pylint: disable=protected-access
+
+
+def test_calls_run_concurrently_up_to_the_limit():
+    box_async.set_max_concurrency(4)
+    lock = threading.Lock()
+    running = peak = 0
+
+    def blocking_call(value: int) -> int:
+        nonlocal running, peak
+        with lock:
+            running += 1
+            peak = max(peak, running)
+        time.sleep(0.05)
+        with lock:
+            running -= 1
+        return value
+
+    async def main():
+        return await asyncio.gather(*(box_async.run_sync(blocking_call, value) for value in range(12)))
+
+    assert asyncio.run(main()) == list(range(12))
+    assert peak == 4
+
+
+@pytest.mark.fake_box(latency=0.05)
+def test_box_calls_overlap(fake_box, box_client):
+    for index in range(8):
+        fake_box.add_folder(f"folder_{index}")
+    box_async.set_max_concurrency(8)
+
+    async def main():
+        root = box_client.folder("0")
+        listings = [box_async.get_folder_items(box_client, "0") for _ in range(4)]
+        creations = [box_async.create_box_folder(box_client, f"new_{index}", root) for index in range(4)]
+        return await asyncio.gather(*listings, *creations)
+
+    started = time.monotonic()
+    results = asyncio.run(main())
+    # eight calls of 50ms each, overlapped rather than one after the other
+    assert time.monotonic() - started < 8 * 0.05
+    assert all(len(items) == 8 for items in results[:4])
+    assert sorted(folder.name for folder in results[4:]) == [f"new_{index}" for index in range(4)]
+
+
+def test_errors_reach_the_awaiting_coroutine(fake_box, box_client):
+    async def main():
+        return await asyncio.gather(
+            box_async.get_folder_items(box_client, "404"),
+            box_async.get_folder_items(box_client, "0"),
+            return_exceptions=True,
+        )
+
+    missing, listed = asyncio.run(main())
+    assert isinstance(missing, BoxAPIException) and missing.status == 404
+    assert listed == []
+
+
+def test_replacing_the_executor_lets_running_calls_finish():
+    box_async.set_max_concurrency(1)
+    started = threading.Event()
+
+    def slow_call() -> str:
+        started.set()
+        time.sleep(0.1)
+        return "finished"
+
+    async def main():
+        running = asyncio.ensure_future(box_async.run_sync(slow_call))
+        await asyncio.get_running_loop().run_in_executor(None, started.wait)
+        previous = box_async.get_executor()
+        box_async.set_max_concurrency(2)
+        with pytest.raises(RuntimeError):
+            previous.submit(slow_call)
+        return await running, await box_async.run_sync(lambda: "new executor")
+
+    assert asyncio.run(main()) == ("finished", "new executor")
+    assert box_async.get_executor()._max_workers == 2  # pylint: disable=protected-access
+
+
+def test_simple_search_stops_at_max_results(fake_box, box_client):
+    for index in range(5):
+        fake_box.add_file(f"apple_{index}.txt", "0", b"apple")
+
+    results = asyncio.run(box_async.simple_search(box_client, "apple", max_results=3))
+
+    assert [item.name for item in results] == ["apple_0.txt", "apple_1.txt", "apple_2.txt"]
+
+
+def test_import_leaves_logging_alone():
+    code = (
+        "import logging, workshops.box_async; "
+        "assert not logging.getLogger().handlers; "
+        "assert logging.getLogger('boxsdk').level == logging.NOTSET"
+    )
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, capture_output=True, text=True, check=False)
+
+    assert result.returncode == 0, result.stderr[-2000:]
@@ -0,0 +1,89 @@
+"""Tests for the shared client registry"""
+import threading
+
+import pytest
+
+from utils.box_client import ClientRegistry
+
+
+class FakeAuth:
+    """Auth stand-in recording refresh calls"""
+
+    def __init__(self):
+        self.access_token = None
+        self.refreshes = 0
+
+    def refresh(self, access_token):
+        self.refreshes += 1
+        self.access_token = "token"
+
+
+class FakeClient:
+    """Client stand-in"""
+
+    def __init__(self):
+        self.auth = FakeAuth()
+
+
+def test_registry_builds_once_per_key():
+    registry = ClientRegistry()
+    built = []
+
+    def factory():
+        built.append(FakeClient())
+        return built[-1]
+
+    first = registry.get("ccg_user", None, factory)
+    second = registry.get("ccg_user", None, factory)
+    other = registry.get("ccg_user", "42", factory)
+
+    assert first is second
+    assert other is not first
+    assert len(built) == 2
+    assert first.auth.refreshes == 1
+
+
+def test_registry_single_flight_under_threads():
+    registry = ClientRegistry()
+    built = []
+    barrier = threading.Barrier(8)
+    results = []
+
+    def factory():
+        built.append(FakeClient())
+        return built[-1]
+
+    def worker():
+        barrier.wait()
+        results.append(registry.get("jwt", None, factory))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(built) == 1
+    assert all(result is built[0] for result in results)
+
+
+@pytest.mark.parametrize("ttl", [0.0, -1.0])
+def test_registry_rebuilds_after_ttl(ttl):
+    registry = ClientRegistry()
+    first = registry.get("jwt", None, FakeClient, ttl=ttl)
+    second = registry.get("jwt", None, FakeClient, ttl=ttl)
+
+    assert first is not second
+
+
+def test_registry_invalidate():
+    registry = ClientRegistry()
+    registry.get("jwt", None, FakeClient)
+    registry.get("jwt", "42", FakeClient)
+    registry.get("ccg_user", None, FakeClient)
+
+    assert registry.invalidate("jwt", "42") == 1
+    assert registry.invalidate("jwt") == 1
+    assert len(registry) == 1
+    assert registry.invalidate() == 1
+    assert len(registry) == 0
@@ -0,0 +1,57 @@
+"""Tests for the request instrumentation"""
+import io
+import json
+
+import pytest
+
+from utils.box_metrics import LatencyHistogram, collect_metrics, endpoint_name, get_metrics
+
+
+def test_endpoint_name_replaces_ids():
+    assert endpoint_name("get", "https://api.box.com/2.0/folders/123/items?limit=5") == "GET /folders/:id/items"
+    assert endpoint_name("POST", "https://upload.box.com/api/2.0/files/content") == "POST /files/content"
+    assert endpoint_name("GET", "https://api.box.com/2.0/users/me") == "GET /users/me"
+    session = "https://upload.box.com/api/2.0/files/upload_sessions/F971964745A5CD0C001BBE4E58196BFD"
+    assert endpoint_name("PUT", session) == "PUT /files/upload_sessions/:id"
+    assert endpoint_name("GET", f"{session.lower()}/parts") == "GET /files/upload_sessions/:id/parts"
+
+
+def test_histogram_percentiles():
+    histogram = LatencyHistogram()
+    for _ in range(99):
+        histogram.observe(0.02)
+    histogram.observe(3.0)
+
+    assert 0.01 < histogram.percentile(0.5) <= 0.025
+    assert histogram.percentile(1.0) == 3.0
+    assert histogram.cumulative()[-1] == ("+Inf", 100)
+
+
+@pytest.mark.fake_box(rate_limit_every=3)
+def test_collect_metrics_from_client(fake_box, box_client):
+    folder_id = fake_box.add_folder("workshops")
+    fake_box.add_file("sample.txt", folder_id, b"x" * 100)
+    box_client.auth.refresh(None)
+
+    with collect_metrics() as metrics:
+        for _ in range(3):
+            for item in box_client.folder(folder_id).get_items():
+                item.content()
+    api_requests, rate_limited = fake_box.api_requests, fake_box.rate_limited
+    box_client.user().get()
+
+    snapshot = metrics.snapshot()
+    assert set(snapshot) == {"GET /folders/:id/items", "GET /files/:id/content"}
+    assert sum(endpoint["calls"] for endpoint in snapshot.values()) == api_requests
+    assert sum(endpoint["retries"] for endpoint in snapshot.values()) == rate_limited
+    assert sum(endpoint["errors"] for endpoint in snapshot.values()) == rate_limited
+    assert snapshot["GET /files/:id/content"]["bytes_in"] >= 300
+    assert "GET /users/me" in get_metrics().snapshot()
+
+    buffer = io.StringIO()
+    metrics.dump(buffer)
+    assert json.loads(buffer.getvalue()) == snapshot
+
+    exported = metrics.to_prometheus()
+    assert 'box_sdk_requests_total{method="GET",path="/folders/:id/items"}' in exported
+    assert 'box_sdk_request_duration_seconds_bucket{method="GET",path="/files/:id/content",le="+Inf"}' in exported
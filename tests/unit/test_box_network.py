@@ -0,0 +1,71 @@
+"""Tests for the pooled network layer"""
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from utils.box_network import NetworkStats, PooledNetwork, get_network
+from utils.config import AppConfig
+
+TOKEN = {"Authorization": "Bearer token"}
+
+
+def get_root(network: PooledNetwork, url: str) -> int:
+    return network.request("GET", f"{url}/2.0/folders/0", access_token="token", headers=TOKEN).status_code
+
+
+def concurrent_requests(network: PooledNetwork, url: str, count: int):
+    with ThreadPoolExecutor(max_workers=count) as executor:
+        assert list(executor.map(lambda _: get_root(network, url), range(count))) == [200] * count
+
+
+def test_pool_settings_reach_the_adapter():
+    network = PooledNetwork(pool_connections=3, pool_maxsize=5, pool_block=True)
+    for scheme in ("http://", "https://"):
+        adapter = network._session.get_adapter(scheme)  # pylint: disable=protected-access
+        assert adapter.stats is network.stats
+        assert (adapter._pool_connections, adapter._pool_maxsize, adapter._pool_block) == (3, 5, True)
+        assert adapter.poolmanager.connection_pool_kw["maxsize"] == 5
+
+
+def test_network_is_shared_by_pool_settings():
+    config = AppConfig.from_values({"HTTP_POOL_MAXSIZE": "7"})
+    assert get_network(config) is get_network(AppConfig.from_values({"HTTP_POOL_MAXSIZE": "7"}))
+    blocking = AppConfig.from_values({"HTTP_POOL_MAXSIZE": "7", "HTTP_POOL_BLOCK": "true"})
+    assert get_network(blocking) is not get_network(config)
+    assert get_network(blocking)._session.get_adapter("https://")._pool_block  # pylint: disable=protected-access
+
+
+def test_sequential_requests_reuse_a_connection(fake_box):
+    network = PooledNetwork()
+    for _ in range(5):
+        assert get_root(network, fake_box.url) == 200
+
+    assert network.stats.snapshot() == {"requests": 5, "new_connections": 1, "reused_connections": 4}
+    network.stats.reset()
+    assert network.stats.snapshot() == {"requests": 0, "new_connections": 0, "reused_connections": 0}
+
+
+@pytest.mark.fake_box(latency=0.05)
+def test_blocking_pool_waits_for_a_connection(fake_box):
+    network = PooledNetwork(pool_maxsize=1, pool_block=True)
+    concurrent_requests(network, fake_box.url, 4)
+    # every request waited for the single pooled connection
+    assert network.stats.new_connections == 1
+    assert network.stats.reused_connections == 3
+
+
+@pytest.mark.fake_box(latency=0.05)
+def test_non_blocking_pool_opens_extra_connections(fake_box):
+    network = PooledNetwork(pool_maxsize=1, pool_block=False)
+    concurrent_requests(network, fake_box.url, 4)
+    assert network.stats.new_connections > 1
+
+
+def test_stats_are_thread_safe():
+    stats = NetworkStats()
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        for _ in range(1000):
+            executor.submit(stats.count_request)
+        for _ in range(100):
+            executor.submit(stats.count_new_connection)
+    assert stats.snapshot() == {"requests": 1000, "new_connections": 100, "reused_connections": 900}
@@ -0,0 +1,148 @@
+"""Tests for the bulk operations engine"""
+import re
+import time
+
+import pytest
+
+from boxsdk import BoxAPIException
+
+from utils.bulk_ops import BulkOp, ConflictPolicy, Job, JobStatus, numbered_name, run_bulk
+from utils.folder_cache import copy_item, move_item
+
+
+@pytest.fixture(name="folders")
+def fixture_folders(fake_box, box_client):
+    source = fake_box.add_folder("source")
+    target = fake_box.add_folder("target")
+    for index in range(3):
+        fake_box.add_file(f"file_{index}.txt", source, b"source")
+    fake_box.add_file("file_0.txt", target, b"target")
+    return box_client.folder(source), box_client.folder(target)
+
+
+def names(box_client, folder) -> set:
+    return {item.name for item in box_client.folder(folder.object_id).get_items()}
+
+
+def copy_jobs(folder, target):
+    return [Job(BulkOp.COPY, item, target) for item in folder.get_items()]
+
+
+def test_partial_failure_does_not_stop_the_batch(box_client, folders):
+    source, target = folders
+    jobs = copy_jobs(source, target) + [Job(BulkOp.DELETE, box_client.file("404"))]
+    progress = []
+
+    report = run_bulk(jobs, progress=lambda done, total, result: progress.append((done, total)))
+
+    assert [result.status for result in report.results] == [
+        JobStatus.FAILED,
+        JobStatus.DONE,
+        JobStatus.DONE,
+        JobStatus.FAILED,
+    ]
+    assert report.failed[0].error.code == "item_name_in_use"
+    assert report.counts() == {"done": 2, "skipped": 0, "reused": 0, "failed": 2}
+    assert sorted(progress) == [(done, 4) for done in range(1, 5)]
+
+
+@pytest.mark.parametrize(
+    "policy, status, expected",
+    [
+        (ConflictPolicy.SKIP, JobStatus.SKIPPED, {"file_0.txt", "file_1.txt", "file_2.txt"}),
+        (ConflictPolicy.REUSE, JobStatus.REUSED, {"file_0.txt", "file_1.txt", "file_2.txt"}),
+        (ConflictPolicy.OVERWRITE, JobStatus.DONE, {"file_0.txt", "file_1.txt", "file_2.txt"}),
+        (ConflictPolicy.RENAME, JobStatus.DONE, {"file_0.txt", "file_0 (1).txt", "file_1.txt", "file_2.txt"}),
+    ],
+)
+def test_conflict_policies(box_client, fake_box, folders, policy, status, expected):
+    source, target = folders
+    report = run_bulk(copy_jobs(source, target), policy=policy)
+
+    assert report.results[0].status == status
+    assert not report.failed
+    assert names(box_client, target) == expected
+    contents = {item["content"] for item in fake_box.items.values() if item["parent_id"] == target.object_id}
+    assert (b"target" in contents) == (policy != ConflictPolicy.OVERWRITE)
+
+
+def test_overwrite_never_deletes_a_folder(box_client, fake_box, folders):
+    source, target = folders
+    in_the_way = fake_box.add_folder("file_1.txt", target.object_id)
+    fake_box.add_file("kept.txt", in_the_way)
+
+    report = run_bulk(copy_jobs(source, target), policy=ConflictPolicy.OVERWRITE)
+
+    assert [result.status for result in report.results] == [JobStatus.DONE, JobStatus.FAILED, JobStatus.DONE]
+    assert report.failed[0].error.code == "item_name_in_use"
+    assert names(box_client, box_client.folder(in_the_way)) == {"kept.txt"}
+
+
+@pytest.mark.parametrize("op", [BulkOp.COPY, BulkOp.MOVE])
+def test_failed_overwrite_keeps_the_existing_file(box_client, fake_box, folders, monkeypatch, op):
+    source, target = folders
+    perform = {BulkOp.COPY: "utils.bulk_ops.copy_item", BulkOp.MOVE: "utils.bulk_ops.move_item"}[op]
+    calls = []
+
+    def failing_retry(item, parent_folder, name=None):
+        calls.append(name)
+        if len(calls) > 1:
+            raise BoxAPIException(500, code="internal_server_error")
+        return (copy_item if op == BulkOp.COPY else move_item)(item, parent_folder, name)
+
+    monkeypatch.setattr(perform, failing_retry)
+    file_0 = next(item for item in source.get_items() if item.name == "file_0.txt")
+    result = run_bulk([Job(op, file_0, target)], policy=ConflictPolicy.OVERWRITE).results[0]
+
+    assert result.status == JobStatus.FAILED
+    assert re.fullmatch(r"file_0 \(overwriting \w{8}\)\.txt", calls[1])
+    assert names(box_client, target) == {"file_0.txt"}
+    contents = [item["content"] for item in fake_box.items.values() if item["parent_id"] == target.object_id]
+    assert contents == [b"target"]
+
+
+def test_auto_rename_counts_up(box_client, folders):
+    source, target = folders
+    for _ in range(3):
+        run_bulk([Job(BulkOp.COPY, box_client.folder(source.object_id), target)], policy=ConflictPolicy.RENAME)
+
+    assert names(box_client, target) == {"file_0.txt", "source", "source (1)", "source (2)"}
+    assert numbered_name("archive.tar.gz", 2) == "archive.tar (2).gz"
+    assert numbered_name(".env", 1) == ".env (1)"
+
+
+def test_move_rename_and_delete(box_client, folders):
+    source, target = folders
+    items = {item.name: item for item in source.get_items()}
+    report = run_bulk(
+        [
+            Job(BulkOp.MOVE, items["file_1.txt"], target, name="moved.txt"),
+            Job(BulkOp.RENAME, items["file_2.txt"], "renamed.txt"),
+            Job(BulkOp.DELETE, items["file_0.txt"]),
+        ]
+    )
+
+    assert not report.failed
+    assert names(box_client, source) == {"renamed.txt"}
+    assert names(box_client, target) == {"file_0.txt", "moved.txt"}
+
+
+@pytest.mark.fake_box(rate_limit_every=4)
+def test_rate_limits_are_retried(box_client, fake_box, folders):
+    source, target = folders
+    report = run_bulk(copy_jobs(source, target), policy=ConflictPolicy.RENAME)
+
+    assert not report.failed
+    assert fake_box.rate_limited > 0
+
+
+@pytest.mark.fake_box(latency=0.02)
+def test_jobs_run_concurrently(box_client, fake_box):
+    folder = fake_box.add_folder("many")
+    files = [box_client.file(fake_box.add_file(f"file_{index}.txt", folder)) for index in range(32)]
+    started = time.monotonic()
+    report = run_bulk([Job(BulkOp.DELETE, file) for file in files], max_workers=8)
+
+    assert len(report.succeeded) == 32
+    # 32 deletes of 20ms each, well under a serial run
+    assert time.monotonic() - started < 32 * 0.02 / 2
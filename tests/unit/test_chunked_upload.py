@@ -0,0 +1,101 @@
+"""Tests for the chunked uploads"""
+import hashlib
+import os
+
+import pytest
+from boxsdk import BoxAPIException
+
+from utils.box_metrics import collect_metrics
+from utils.chunked_upload import chunked_update, chunked_upload, update_contents, upload_to_folder
+from workshops.files.files_sln import upload_file
+
+PART_SIZE = 1024
+
+pytestmark = pytest.mark.fake_box(upload_part_size=PART_SIZE)
+
+
+@pytest.fixture(name="local_file")
+def fixture_local_file(tmp_path) -> str:
+    path = tmp_path / "large.bin"
+    path.write_bytes(os.urandom(10 * PART_SIZE + 100))
+    return str(path)
+
+
+@pytest.fixture(autouse=True)
+def no_retry_delay(monkeypatch):
+    monkeypatch.setattr("utils.chunked_upload.PART_RETRY_DELAY", 0.0)
+
+
+def content_of(fake_box, file_id: str) -> bytes:
+    return fake_box.items[file_id]["content"]
+
+
+def test_upload_in_parts(fake_box, box_client, local_file):
+    progress = []
+    stats = chunked_upload(
+        box_client.folder("0"), local_file, max_workers=3, progress=lambda done, _: progress.append(done)
+    )
+
+    with open(local_file, "rb") as file:
+        content = file.read()
+    assert content_of(fake_box, stats.file.id) == content
+    assert stats.file.sha1 == hashlib.sha1(content).hexdigest()
+    assert (stats.file.name, stats.size, stats.parts, stats.retries) == ("large.bin", len(content), 11, 0)
+    assert stats.throughput > 0
+    assert sorted(progress)[-1] == len(content)
+    assert not fake_box.upload_sessions
+
+
+def test_corrupted_parts_are_retried(fake_box, box_client, local_file):
+    fake_box.corrupt_parts = 2
+    stats = chunked_upload(box_client.folder("0"), local_file)
+
+    assert stats.retries == 2
+    with open(local_file, "rb") as file:
+        assert content_of(fake_box, stats.file.id) == file.read()
+
+
+def test_failed_upload_is_aborted(fake_box, box_client, local_file):
+    fake_box.corrupt_parts = 1000
+    with pytest.raises(BoxAPIException) as raised:
+        chunked_upload(box_client.folder("0"), local_file, max_workers=2, resumable=False)
+
+    assert raised.value.code == "bad_digest"
+    assert not fake_box.upload_sessions
+    assert [item["name"] for item in fake_box.items.values()] == ["All Files"]
+
+
+def test_new_version_in_parts(fake_box, box_client, local_file):
+    file_id = fake_box.add_file("large.bin", "0", b"old")
+    stats = chunked_update(box_client.file(file_id), local_file, file_name="renamed.bin")
+
+    assert stats.file.id == file_id
+    assert stats.file.name == "renamed.bin"
+    with open(local_file, "rb") as file:
+        assert content_of(fake_box, file_id) == file.read()
+
+
+def test_threshold_picks_the_upload(fake_box, box_client, local_file):
+    folder = box_client.folder("0")
+    with collect_metrics() as metrics:
+        small = upload_to_folder(folder, local_file, "small.bin", threshold=os.path.getsize(local_file) + 1)
+        large = upload_to_folder(folder, local_file, "large.bin", threshold=os.path.getsize(local_file))
+        update_contents(small, local_file, threshold=0)
+    endpoints = metrics.snapshot()
+
+    assert endpoints["POST /files/content"]["calls"] == 1
+    assert endpoints["POST /files/upload_sessions"]["calls"] == 1
+    assert endpoints["POST /files/:id/upload_sessions"]["calls"] == 1
+    assert endpoints["PUT /files/upload_sessions/:id"]["calls"] == 22
+    assert content_of(fake_box, small.id) == content_of(fake_box, large.id)
+
+
+def test_upload_file_updates_existing_files_in_parts(fake_box, box_client, local_file):
+    folder = box_client.folder("0")
+    first = upload_file(box_client, folder, local_file, chunked_threshold=0)
+    with open(local_file, "ab") as file:
+        file.write(b"more")
+    second = upload_file(box_client, folder, local_file, chunked_threshold=0)
+
+    assert second.id == first.id
+    assert content_of(fake_box, first.id).endswith(b"more")
@@ -0,0 +1,191 @@
+"""Tests for the etag validated folder listing cache"""
+import sqlite3
+
+import pytest
+
+from tests.sample_trees import serial_walk
+from utils.box_metrics import collect_metrics
+from utils.folder_cache import (
+    CachedListing,
+    FolderCache,
+    LRUFolderCache,
+    SQLiteFolderCache,
+    cached_get_items,
+    copy_item,
+    create_subfolder,
+    delete_item,
+    move_item,
+    rename_item,
+)
+from utils.folder_walker import walk_folder
+
+LISTING = "GET /folders/:id/items"
+
+
+@pytest.fixture(name="cache", params=["lru", "sqlite"])
+def fixture_cache(request, tmp_path):
+    if request.param == "lru":
+        yield LRUFolderCache()
+    else:
+        cache = SQLiteFolderCache(str(tmp_path / "folder_cache.db"))
+        yield cache
+        cache.close()
+
+
+def walk(root, cache):
+    return [
+        entry.path
+        for entry in walk_folder(root, list_items=lambda folder: cached_get_items(folder, cache=cache))
+    ]
+
+
+def listings(metrics) -> int:
+    return metrics.snapshot().get(LISTING, {}).get("calls", 0)
+
+
+def test_folder_cache_is_abstract():
+    with pytest.raises(TypeError):
+        FolderCache()  # pylint: disable=abstract-class-instantiated
+
+
+def test_unchanged_tree_is_served_from_cache(root, cache):
+    expected = list(serial_walk(root))
+    with collect_metrics() as first:
+        assert walk(root, cache) == expected
+    with collect_metrics() as second:
+        assert walk(root, cache) == expected
+
+    # the root, 3, 9 and 27 folders
+    assert listings(first) == 40
+    assert listings(second) == 0
+    # one validation per folder
+    assert second.snapshot()["GET /folders/:id"]["calls"] == 40
+
+
+def test_max_age_skips_validation(root, cache):
+    cached_get_items(root, cache=cache)
+    with collect_metrics() as metrics:
+        items = cached_get_items(root, cache=cache, max_age=60)
+
+    assert [item.name for item in items] == [item.name for item in root.get_items()]
+    assert metrics.snapshot() == {}
+
+
+def test_fields_must_be_covered(root, cache):
+    cached_get_items(root, fields=["type", "id", "name"], cache=cache)
+    with collect_metrics() as metrics:
+        cached_get_items(root, fields=["type", "id"], cache=cache)
+        assert listings(metrics) == 0
+        items = cached_get_items(root, fields=["type", "id", "name", "size"], cache=cache)
+        assert listings(metrics) == 1
+    assert all(item.size is not None for item in items)
+
+
+def test_outside_change_is_detected(root, fake_box, cache):
+    cached_get_items(root, cache=cache)
+    fake_box.add_file("outside.txt")
+
+    assert "outside.txt" in [item.name for item in cached_get_items(root, cache=cache)]
+
+
+@pytest.mark.fake_box(parent_etags=False)
+def test_child_change_without_etag_change(root, box_client, cache, monkeypatch):
+    etag = root.get(fields=["etag"]).etag
+    child = next(item for item in cached_get_items(root, cache=cache) if item.type == "folder")
+    monkeypatch.setattr("tests.fake_box._now", lambda: "2100-01-01T00:00:00+00:00")
+    box_client.folder(child.object_id).rename("renamed")
+
+    assert root.get(fields=["etag"]).etag == etag
+    assert "renamed" in [item.name for item in cached_get_items(root, cache=cache)]
+
+
+@pytest.mark.fake_box(parent_etags=False)
+def test_listings_expire(root, box_client, cache, monkeypatch):
+    monkeypatch.setattr("tests.fake_box._now", lambda: "2100-01-01T00:00:00+00:00")
+    child = next(item for item in cached_get_items(root, cache=cache) if item.type == "folder")
+    box_client.folder(child.object_id).rename("first")
+    cached_get_items(root, cache=cache)
+    box_client.folder(child.object_id).rename("renamed")
+
+    # neither the etag nor the content_modified_at of the root moved
+    assert "first" in [item.name for item in cached_get_items(root, cache=cache)]
+    assert "renamed" in [item.name for item in cached_get_items(root, cache=cache, ttl=0.0)]
+
+
+def test_mutations_invalidate_affected_listings(root, box_client, cache):
+    walk(root, cache)
+    folders = {item.name: item for item in cached_get_items(root, cache=cache) if item.type == "folder"}
+    first, second, third = folders["folder_1_0"], folders["folder_1_1"], folders["folder_1_2"]
+    nested = {item.name: item for item in cached_get_items(first, cache=cache)}["folder_2_0"]
+
+    create_subfolder(first, "created", cache=cache)
+    assert cache.get(first.object_id) is None
+    assert cache.get(root.object_id) is not None
+
+    cached_get_items(first, cache=cache)
+    rename_item(nested, "renamed", cache=cache)
+    assert cache.get(first.object_id) is None
+    assert cache.get(nested.object_id) is not None
+
+    copy_item(second, third, cache=cache)
+    assert cache.get(third.object_id) is None
+    assert cache.get(second.object_id) is not None
+
+    cached_get_items(first, cache=cache)
+    move_item(nested, second, cache=cache)
+    assert cache.get(first.object_id) is None
+    assert cache.get(second.object_id) is None
+
+    subtree = [item.object_id for item in cached_get_items(nested, cache=cache) if item.type == "folder"]
+    assert all(cache.get(folder_id) is not None for folder_id in subtree)
+    delete_item(nested, cache=cache)
+    assert cache.get(nested.object_id) is None
+    assert all(cache.get(folder_id) is None for folder_id in subtree)
+    assert cache.get(root.object_id) is not None
+
+    assert walk(root, cache) == list(serial_walk(box_client.folder("0")))
+
+
+def test_lru_eviction():
+    cache = LRUFolderCache(max_entries=2)
+    for folder_id in "123":
+        cache.put(folder_id, cache_listing(folder_id))
+
+    assert len(cache) == 2
+    assert cache.get("1") is None
+    assert cache.parent_of("child_1") is None
+    assert cache.parent_of("child_3") == "3"
+
+
+def test_sqlite_cache_persists(tmp_path):
+    path = str(tmp_path / "folder_cache.db")
+    cache = SQLiteFolderCache(path)
+    cache.put("1", cache_listing("1"))
+    cache.close()
+
+    cache = SQLiteFolderCache(path)
+    assert cache.get("1") == cache_listing("1")
+    assert cache.parent_of("child_1") == "1"
+    cache.close()
+
+
+def test_sqlite_cache_drops_listings_without_listed_at(tmp_path):
+    path = str(tmp_path / "folder_cache.db")
+    with sqlite3.connect(path) as connection:
+        connection.execute(
+            "CREATE TABLE listings ("
+            "folder_id TEXT PRIMARY KEY, validator TEXT, fields TEXT, entries TEXT, validated_at REAL)"
+        )
+        connection.execute("INSERT INTO listings VALUES ('1', '[]', '[]', '[]', 1.0)")
+    connection.close()
+
+    cache = SQLiteFolderCache(path)
+    assert cache.get("1") is None
+    cache.put("1", cache_listing("1"))
+    assert cache.get("1") == cache_listing("1")
+    cache.close()
+
+
+def cache_listing(folder_id: str) -> CachedListing:
+    entries = [{"type": "file", "id": f"child_{folder_id}"}]
+    return CachedListing(("1", "1", None), ("type", "id", "name"), entries, 1.0, 1.0)
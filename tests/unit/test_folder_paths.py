@@ -0,0 +1,100 @@
+"""Tests for bulk folder creation"""
+import runpy
+
+import pytest
+
+from utils.box_metrics import collect_metrics
+from utils.folder_paths import ensure_folder, ensure_paths
+from utils.path_resolver import PathResolver
+from workshops.folders import folders_sln
+
+PATHS = [
+    "/workshops/folders/my_documents/work",
+    "/workshops/folders/downloads/personal",
+    "/workshops/files",
+    "workshops/search/",
+    "/samples/a/b/c",
+]
+
+PLANNED = {
+    "/workshops",
+    "/workshops/folders",
+    "/workshops/folders/my_documents",
+    "/workshops/folders/my_documents/work",
+    "/workshops/folders/downloads",
+    "/workshops/folders/downloads/personal",
+    "/workshops/files",
+    "/workshops/search",
+    "/samples",
+    "/samples/a",
+    "/samples/a/b",
+    "/samples/a/b/c",
+}
+
+
+def calls(metrics, endpoint: str) -> int:
+    return metrics.snapshot().get(endpoint, {}).get("calls", 0)
+
+
+@pytest.mark.fake_box(latency=0.005)
+def test_ensure_paths_creates_the_plan(box_client, fake_box):
+    with collect_metrics() as metrics:
+        folders = ensure_paths(box_client, PATHS, resolver=PathResolver())
+
+    assert set(folders) == PLANNED
+    names = {item["id"]: item["name"] for item in fake_box.items.values()}
+    assert all(names[folder.id] == path.rsplit("/", 1)[1] for path, folder in folders.items())
+    # only the root is listed, new folders are known to be empty
+    assert calls(metrics, "GET /folders/:id/items") == 1
+    assert calls(metrics, "POST /folders") == len(PLANNED)
+
+
+def test_rerun_is_served_from_the_index(box_client):
+    resolver = PathResolver()
+    first = ensure_paths(box_client, PATHS, resolver=resolver)
+    with collect_metrics() as metrics:
+        second = ensure_paths(box_client, PATHS, resolver=resolver)
+
+    assert {path: folder.id for path, folder in first.items()} == {
+        path: folder.id for path, folder in second.items()
+    }
+    assert metrics.snapshot() == {}
+
+
+def test_existing_folders_are_listed_not_created(box_client, fake_box):
+    workshops = fake_box.add_folder("workshops")
+    fake_box.add_folder("folders", workshops)
+    with collect_metrics() as metrics:
+        folders = ensure_paths(box_client, ["/workshops/folders/new"], resolver=PathResolver())
+
+    assert folders["/workshops"].id == workshops
+    assert calls(metrics, "POST /folders") == 1
+
+
+def test_conflict_reuses_the_error_payload(box_client, fake_box):
+    resolver = PathResolver()
+    root = box_client.folder("0")
+    assert resolver.lookup(root, "late") is None
+    late = fake_box.add_folder("late")
+
+    with collect_metrics() as metrics:
+        folder = ensure_folder(root, "late", resolver)
+
+    assert folder.id == late
+    assert set(metrics.snapshot()) == {"POST /folders"}
+
+
+def test_file_in_the_way(box_client, fake_box):
+    fake_box.add_file("workshops")
+    with pytest.raises(ValueError):
+        ensure_paths(box_client, ["/workshops/folders"], resolver=PathResolver())
+
+
+def test_folders_solution_runs_twice(box_client, fake_box, monkeypatch, capsys):
+    fake_box.add_folder("folders", fake_box.add_folder("workshops"))
+    monkeypatch.setattr("utils.box_client.get_client", lambda config: box_client)
+
+    for _ in range(2):
+        # the second run finds every folder in place
+        runpy.run_path(folders_sln.__file__, run_name="__main__")
+        assert "Description: This is where my donwloads go" in capsys.readouterr().out
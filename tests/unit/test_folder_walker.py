@@ -0,0 +1,40 @@
+"""Tests for the parallel folder walker"""
+import threading
+
+import pytest
+
+from tests.sample_trees import WIDTH, serial_walk
+from utils.folder_walker import walk_folder
+
+
+@pytest.mark.parametrize("max_prefetch", [0, 2, 1000])
+def test_walk_matches_serial_depth_first_order(root, max_prefetch):
+    entries = list(walk_folder(root, max_workers=4, max_prefetch=max_prefetch))
+
+    assert [entry.path for entry in entries] == list(serial_walk(root))
+    assert all(entry.depth == entry.path.count("/") for entry in entries)
+
+
+def test_walk_max_depth_and_types(root, fake_box):
+    fake_box.reset_counters()
+    entries = list(walk_folder(root, max_depth=2, types=["file"]))
+
+    assert {entry.item.type for entry in entries} == {"file"}
+    assert max(entry.depth for entry in entries) == 2
+    # the root and its WIDTH subfolders are listed, the folders at depth 2 are not
+    assert fake_box.api_requests == 1 + WIDTH
+
+
+def test_walk_cancellation(root):
+    cancel = threading.Event()
+    seen = []
+    for entry in walk_folder(root, cancel=cancel):
+        seen.append(entry)
+        if len(seen) == 5:
+            cancel.set()
+    assert len(seen) == 5
+
+    walker = walk_folder(root)
+    first = next(walker)
+    walker.close()
+    assert first.path == "/folder_1_0"
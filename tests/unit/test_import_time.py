@@ -0,0 +1,73 @@
+"""Import time budget of the command line entry points"""
+import os
+import statistics
+import subprocess
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# import time allowed per entry point once boxsdk and requests are loaded, as a share of boxsdk's own.
+# boxsdk/__init__ imports its JWT and CCG auth, so cryptography and PyJWT are always loaded and
+# only the time spent in our modules can be budgeted. Measuring it against boxsdk on the same
+# machine keeps the check independent of the runner's speed. The entry points measured 5 to 15%
+# of boxsdk, eager auth, callback or config loading on import would exceed this.
+IMPORT_TIME_BUDGET = 0.5
+
+# only needed for the first OAuth2 login
+LAZY_MODULES = {"utils.oauth_callback", "http.server", "webbrowser"}
+
+ENTRY_POINTS = [
+    "test_ccg",
+    "test_jwt",
+    "test_oauth",
+    "workshops.samples_init",
+    "workshops.comments.comment_init",
+    "workshops.comments.comments_sln",
+    "workshops.file_representations.files_representations_init",
+    "workshops.file_representations.file_representations_sln",
+    "workshops.files.files_init",
+    "workshops.files.files_sln",
+    "workshops.folders.folders_init",
+    "workshops.folders.folders_sln",
+    "workshops.search.search_init",
+    "workshops.search.search_sln",
+    "workshops.shared_links.shared_links_init",
+    "workshops.shared_links.shared_links_sln",
+]
+
+
+def import_times(statement: str) -> dict:
+    """Runs the import statement in a fresh interpreter, returning the cumulative microseconds per module"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", statement],
+        cwd=ROOT,
+        capture_output=True,
+        text=True,
+        check=False,
+    )
+    assert result.returncode == 0, result.stderr[-2000:]
+    times = {}
+    for line in result.stderr.splitlines():
+        if line.startswith("import time:") and "|" in line and "cumulative" not in line:
+            _, cumulative, name = line.split("|")
+            times[name.strip()] = int(cumulative)
+    return times
+
+
+@pytest.fixture(name="boxsdk_import_time", scope="module")
+def fixture_boxsdk_import_time() -> int:
+    """Microseconds boxsdk takes to import on its own, the median of a few runs"""
+    return statistics.median(import_times("import boxsdk")["boxsdk"] for _ in range(3))
+
+
+@pytest.mark.parametrize("module", ENTRY_POINTS)
+def test_entry_point_import_time(module, boxsdk_import_time):
+    times = import_times(
+        f"import boxsdk, requests; import {module}, utils.config; "
+        "assert utils.config._config is None, 'config built on import'"
+    )
+
+    assert not LAZY_MODULES & set(times)
+    assert times[module] < boxsdk_import_time * IMPORT_TIME_BUDGET
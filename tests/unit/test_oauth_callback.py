@@ -0,0 +1,71 @@
+"""Tests for the concurrent OAuth2 callback server"""
+import json
+import threading
+import urllib.error
+import urllib.parse
+import urllib.request
+
+import pytest
+
+from utils import box_oauth
+from utils.oauth_callback import OAuthCallbackServer
+
+FLOWS = 10
+
+
+def call_back(server: OAuthCallbackServer, **params) -> int:
+    """Calls back the server like the browser does, returning the status"""
+    url = f"{server.url}/callback?{urllib.parse.urlencode(params)}"
+    try:
+        with urllib.request.urlopen(url, timeout=10) as response:
+            return response.status
+    except urllib.error.HTTPError as err:
+        return err.code
+
+
+@pytest.fixture(name="callback_server")
+def fixture_callback_server(fake_box, config, monkeypatch, tmp_path):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(box_oauth, "_user_token_stores", {})
+    with OAuthCallbackServer("127.0.0.1", 0) as server:
+        yield server
+
+
+def test_concurrent_flows_store_tokens_per_user(callback_server, fake_box, config, tmp_path):
+    flows = [callback_server.begin_flow(config, f"user{index}")[1] for index in range(FLOWS)]
+    assert callback_server.pending() == FLOWS
+
+    statuses = []
+    threads = [
+        threading.Thread(
+            target=lambda flow=flow, index=index: statuses.append(
+                call_back(callback_server, code=f"code_{index}", state=flow.state)
+            )
+        )
+        for index, flow in enumerate(flows)
+    ]
+    for thread in reversed(threads):
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    oauths = [flow.wait(timeout=10) for flow in flows]
+
+    assert statuses == [200] * FLOWS
+    assert callback_server.pending() == 0
+    assert fake_box.token_requests == FLOWS
+    assert len({oauth.access_token for oauth in oauths}) == FLOWS
+    for index, oauth in enumerate(oauths):
+        with open(tmp_path / ".oauth" / f"user{index}.json", encoding="UTF-8") as file:
+            assert json.load(file)["access_token"] == oauth.access_token
+
+
+def test_unknown_state_and_errors(callback_server, config):
+    _, flow = callback_server.begin_flow(config, "user")
+
+    assert call_back(callback_server, code="code", state="forged") == 400
+    assert call_back(callback_server, error="access_denied", state=flow.state) == 400
+    with pytest.raises(RuntimeError):
+        flow.wait(timeout=10)
+    # a completed flow cannot be replayed
+    assert call_back(callback_server, code="code", state=flow.state) == 400
@@ -0,0 +1,98 @@
+"""Tests for the cached path resolver"""
+import pytest
+
+from utils.box_metrics import collect_metrics
+from utils.folder_cache import create_subfolder, rename_item
+from utils.path_resolver import PathResolver, resolve, resolve_folder
+
+LISTING = "GET /folders/:id/items"
+
+
+@pytest.fixture(name="tree")
+def fixture_tree(fake_box):
+    workshops = fake_box.add_folder("workshops")
+    for index in range(250):
+        fake_box.add_file(f"file_{index:03}.txt", workshops)
+    folders = fake_box.add_folder("folders", workshops)
+    fake_box.add_file("sample.txt", folders)
+    return {"workshops": workshops, "folders": folders}
+
+
+def listings(metrics) -> int:
+    return metrics.snapshot().get(LISTING, {}).get("calls", 0)
+
+
+def test_resolve_stops_paging_and_caches(box_client, tree):
+    resolver = PathResolver(page_size=100)
+    with collect_metrics() as first:
+        item = resolve(box_client, "/workshops/file_050.txt", resolver)
+    assert item.name == "file_050.txt"
+    # the root page, then the first page of workshops only
+    assert listings(first) == 2
+
+    with collect_metrics() as second:
+        assert resolve(box_client, "/workshops/file_050.txt", resolver).id == item.id
+        assert resolve(box_client, "workshops/file_010.txt", resolver).name == "file_010.txt"
+    assert listings(second) == 0
+
+    with collect_metrics() as third:
+        assert resolve(box_client, "/workshops/file_249.txt", resolver).name == "file_249.txt"
+    # the remaining pages of workshops, picked up where the first lookup stopped
+    assert listings(third) == 2
+
+
+def test_missing_names_are_cached(box_client, tree):
+    resolver = PathResolver()
+    assert resolve(box_client, "/workshops/missing", resolver) is None
+    with collect_metrics() as metrics:
+        assert resolve(box_client, "/workshops/missing", resolver) is None
+        assert resolve(box_client, "/workshops/file_000.txt/below", resolver) is None
+        with pytest.raises(ValueError):
+            resolve_folder(box_client, "/workshops/file_000.txt", resolver)
+    assert metrics.snapshot() == {}
+
+
+def test_lru_eviction(box_client, tree):
+    resolver = PathResolver(max_folders=1)
+    resolve(box_client, "/workshops/folders/sample.txt", resolver)
+    assert len(resolver) == 1
+
+    with collect_metrics() as metrics:
+        resolve(box_client, "/workshops", resolver)
+    assert listings(metrics) == 1
+
+
+def test_mutation_helpers_invalidate_the_resolver(box_client, tree):
+    workshops = resolve_folder(box_client, "/workshops")
+    assert resolve(box_client, "/workshops/created") is None
+
+    create_subfolder(workshops, "created")
+    created = resolve_folder(box_client, "/workshops/created")
+    rename_item(created, "renamed")
+
+    assert resolve(box_client, "/workshops/created") is None
+    assert resolve(box_client, "/workshops/renamed").id == created.id
+
+
+def test_indexes_are_per_session(box_client, tree):
+    resolver = PathResolver()
+    other = box_client.as_user(box_client.user("99"))
+    mine = resolve(box_client, "/workshops/folders", resolver)
+
+    with collect_metrics() as metrics:
+        theirs = resolve(other, "/workshops/folders", resolver)
+    # All Files and workshops are listed again for the other user
+    assert listings(metrics) == 2
+    assert theirs.id == mine.id
+    assert theirs.session is other.folder("0").session
+
+    assert resolver.invalidate(tree["workshops"])
+    assert len(resolver) == 2
+
+
+def test_indexes_expire(box_client, tree):
+    resolver = PathResolver(ttl=0.0)
+    assert resolve(box_client, "/workshops/missing", resolver) is None
+    with collect_metrics() as metrics:
+        assert resolve(box_client, "/workshops/missing", resolver) is None
+    assert listings(metrics) > 0
@@ -0,0 +1,120 @@
+"""Tests for the ranged, resumable downloads"""
+import os
+
+import pytest
+
+from utils import ranged_download as ranged
+from utils.box_metrics import collect_metrics
+from utils.ranged_download import byte_ranges, ranged_download
+from utils.sha1_index import get_sha1_index
+from workshops.files.files_sln import download_file
+
+RANGE_SIZE = 1024
+CONTENT = os.urandom(9 * RANGE_SIZE + 100)
+
+
+@pytest.fixture(autouse=True)
+def no_retry_delay(monkeypatch):
+    monkeypatch.setattr("utils.ranged_download.RANGE_RETRY_DELAY", 0.0)
+
+
+@pytest.fixture(name="downloads")
+def fixture_downloads(tmp_path) -> str:
+    path = tmp_path / "downloads"
+    path.mkdir()
+    return str(path)
+
+
+def read(path: str) -> bytes:
+    with open(path, "rb") as file:
+        return file.read()
+
+
+def test_byte_ranges():
+    assert byte_ranges(0, 10) == []
+    assert byte_ranges(25, 10) == [(0, 9), (10, 19), (20, 24)]
+
+
+def test_ranged_download(fake_box, box_client, downloads):
+    box_file = box_client.file(fake_box.add_file("large.bin", "0", CONTENT))
+    path = os.path.join(downloads, "large.bin")
+
+    with collect_metrics() as metrics:
+        stats = ranged_download(box_file, path, range_size=RANGE_SIZE)
+
+    assert read(path) == CONTENT
+    assert (stats.size, stats.ranges, stats.retries, stats.resumed) == (len(CONTENT), 10, 0, 0)
+    assert metrics.snapshot()["GET /files/:id/content"]["calls"] == 10
+    assert sorted(os.listdir(downloads)) == ["large.bin"]
+    assert get_sha1_index().lookup(path) == fake_box.items[box_file.object_id]["sha1"]
+
+
+def test_interrupted_download_resumes(fake_box, box_client, downloads, monkeypatch):
+    box_file = box_client.file(fake_box.add_file("large.bin", "0", CONTENT))
+    path = os.path.join(downloads, "large.bin")
+    download_range = ranged.download_range
+
+    def dropping_range(box_file, part_path, first, last):
+        if first >= 6 * RANGE_SIZE:
+            raise ConnectionAbortedError("connection lost")
+        return download_range(box_file, part_path, first, last)
+
+    monkeypatch.setattr("utils.ranged_download.download_range", dropping_range)
+    with pytest.raises(ConnectionAbortedError):
+        ranged_download(box_file, path, range_size=RANGE_SIZE)
+    assert os.path.exists(f"{path}.part.json") and not os.path.exists(path)
+
+    monkeypatch.setattr("utils.ranged_download.download_range", download_range)
+    with collect_metrics() as metrics:
+        stats = ranged_download(box_file, path, range_size=RANGE_SIZE)
+
+    assert stats.resumed == 6
+    assert metrics.snapshot()["GET /files/:id/content"]["calls"] == 4
+    assert read(path) == CONTENT
+
+
+def test_ranges_reach_disk_before_the_checkpoint(fake_box, box_client, downloads, monkeypatch):
+    box_file = box_client.file(fake_box.add_file("large.bin", "0", CONTENT))
+    path = os.path.join(downloads, "large.bin")
+    fsync, write_json_atomic = os.fsync, ranged.write_json_atomic
+    synced, checkpoints = [], []
+
+    def recording_fsync(fd):
+        synced.append(os.fstat(fd).st_ino)
+        fsync(fd)
+
+    def recording_checkpoint(checkpoint_path, record):
+        # ranges synced to the .part file so far, against the ranges the checkpoint claims
+        checkpoints.append((synced.count(os.stat(f"{path}.part").st_ino), len(record["done"])))
+        write_json_atomic(checkpoint_path, record)
+
+    monkeypatch.setattr("utils.ranged_download.os.fsync", recording_fsync)
+    monkeypatch.setattr("utils.ranged_download.write_json_atomic", recording_checkpoint)
+    ranged_download(box_file, path, range_size=RANGE_SIZE)
+
+    assert len(checkpoints) == 10
+    assert all(ranges_synced >= ranges_claimed for ranges_synced, ranges_claimed in checkpoints)
+
+
+def test_sha1_mismatch_is_rejected(fake_box, box_client, downloads):
+    box_file = box_client.file(fake_box.add_file("large.bin", "0", CONTENT))
+    fake_box.items[box_file.object_id]["sha1"] = "0" * 40
+    path = os.path.join(downloads, "large.bin")
+
+    with pytest.raises(ValueError):
+        ranged_download(box_file, path, range_size=RANGE_SIZE)
+    assert not os.listdir(downloads)
+
+
+def test_download_file_uses_ranges(fake_box, box_client, downloads):
+    box_file = box_client.file(fake_box.add_file("large.bin", "0", CONTENT)).get()
+    path = os.path.join(downloads, "large.bin")
+
+    small = os.path.join(downloads, "small.bin")
+    download_file(box_file, path, ranged_threshold=RANGE_SIZE)
+    download_file(box_file, small)
+
+    assert read(path) == CONTENT == read(small)
+    # only ranged downloads are verified and indexed
+    assert get_sha1_index().lookup(path) is not None
+    assert get_sha1_index().lookup(small) is None
@@ -0,0 +1,51 @@
+"""Tests for the workshop sample seeding"""
+import json
+
+import pytest
+
+from utils.box_metrics import collect_metrics
+from utils.path_resolver import resolve
+from utils.seeding import load_manifest, seed_samples
+
+
+def test_seed_all_samples(fake_box, box_client):
+    report = seed_samples(box_client, max_workers=4)
+
+    assert sorted(report.folders) == [
+        "comments", "file_representations", "files", "folders", "search", "shared_links"
+    ]
+    assert not report.failed
+    assert report.uploads["search"].counts()["uploaded"] == 12
+    assert resolve(box_client, "/workshops/shared_links/sample_file.txt") is not None
+    # the files workshop uploads its sample during the exercises
+    assert resolve(box_client, "/workshops/files/sample_file.txt") is None
+    pineapple = resolve(box_client, "/workshops/search/apple pineapple banana/pineapple.txt")
+    assert box_client.file(pineapple.id).get().description == "aka ananas"
+    apple = resolve(box_client, "/workshops/search/apple/apple1.txt")
+    assert box_client.file(apple.id).get().description == ""
+
+
+def test_seeding_again_changes_nothing(fake_box, box_client):
+    seed_samples(box_client, ["search", "comments"])
+
+    with collect_metrics() as metrics:
+        report = seed_samples(box_client, ["search", "comments"])
+
+    assert all(upload.counts()["unchanged"] == len(upload.results) for upload in report.uploads.values())
+    writes = [key for key in metrics.snapshot() if key.split(" ")[0] in ("POST", "PUT", "DELETE")]
+    assert not writes
+
+
+def test_manifest(tmp_path):
+    (tmp_path / "content").mkdir()
+    manifest = tmp_path / "samples.json"
+    manifest.write_text(json.dumps({"samples": [{"name": "a", "folder": "x/a/", "content": "content"}]}))
+
+    (sample,) = load_manifest(str(manifest))
+    assert (sample.name, sample.folder, sample.content) == ("a", "/x/a", str(tmp_path / "content"))
+    assert sample.descriptions == {}
+
+
+def test_unknown_sample_set(fake_box, box_client):
+    with pytest.raises(ValueError):
+        seed_samples(box_client, ["nope"])
@@ -0,0 +1,102 @@
+"""Tests for the local sha1 index and the uploads it skips"""
+import hashlib
+import os
+
+from utils.box_metrics import collect_metrics
+from utils.path_resolver import resolve
+from utils.sha1_index import PROCESS_POOL_MIN_FILES, Sha1Index, get_sha1_index, mmap_sha1
+from utils.tree_uploader import upload_tree
+from workshops.files.files_sln import upload_file
+
+
+def test_sha1_is_cached_until_the_file_changes(tmp_path, monkeypatch):
+    index = Sha1Index(str(tmp_path / "index.db"))
+    path = tmp_path / "a.txt"
+    path.write_bytes(b"first")
+    assert index.lookup(str(path)) is None
+    assert index.sha1(str(path)) == hashlib.sha1(b"first").hexdigest()
+
+    monkeypatch.setattr("utils.sha1_index.mmap_sha1", lambda path: "not hashed again")
+    assert index.sha1(str(path)) == hashlib.sha1(b"first").hexdigest()
+
+    path.write_bytes(b"second!")
+    assert index.lookup(str(path)) is None
+    assert index.sha1(str(path)) == "not hashed again"
+    index.close()
+
+
+def test_empty_file(tmp_path):
+    path = tmp_path / "empty.txt"
+    path.write_bytes(b"")
+    assert mmap_sha1(str(path)) == hashlib.sha1(b"").hexdigest()
+
+
+def test_hash_files_on_a_process_pool(tmp_path, monkeypatch):
+    monkeypatch.setattr("utils.sha1_index.PROCESS_POOL_MIN_FILES", 2)
+    monkeypatch.setattr("utils.sha1_index.PROCESS_POOL_MIN_BYTES", 0)
+    paths = []
+    for number in range(5):
+        path = tmp_path / f"{number}.bin"
+        path.write_bytes(os.urandom(100 + number))
+        paths.append(str(path))
+    index = Sha1Index(str(tmp_path / "index.db"))
+
+    hashes = index.hash_files(paths, max_workers=2)
+
+    assert hashes == {path: hashlib.sha1(open(path, "rb").read()).hexdigest() for path in paths}
+    reopened = Sha1Index(index.path)
+    assert all(reopened.lookup(path) == sha1 for path, sha1 in hashes.items())
+    index.close()
+    reopened.close()
+
+
+def test_small_batches_are_hashed_in_process(tmp_path, monkeypatch):
+    def no_pool(*args, **kwargs):
+        raise AssertionError("process pool started for a small batch")
+
+    monkeypatch.setattr("utils.sha1_index.ProcessPoolExecutor", no_pool)
+    paths = []
+    for number in range(PROCESS_POOL_MIN_FILES * 2):
+        path = tmp_path / f"{number}.bin"
+        path.write_bytes(os.urandom(1024))
+        paths.append(str(path))
+    index = Sha1Index(str(tmp_path / "index.db"))
+
+    hashes = index.hash_files(paths)
+
+    assert hashes == {path: hashlib.sha1(open(path, "rb").read()).hexdigest() for path in paths}
+    index.close()
+
+
+def test_unchanged_tree_is_not_uploaded_again(fake_box, box_client, tmp_path):
+    tree = tmp_path / "tree"
+    (tree / "docs").mkdir(parents=True)
+    (tree / "a.txt").write_bytes(b"a")
+    (tree / "docs/b.txt").write_bytes(b"bb")
+    (tree / "docs/c.txt").write_bytes(b"ccc")
+    upload_tree(box_client, str(tree))
+    (tree / "docs/c.txt").write_bytes(b"changed")
+
+    with collect_metrics() as metrics:
+        report = upload_tree(box_client, str(tree))
+
+    assert report.counts() == {"uploaded": 0, "updated": 1, "unchanged": 2, "failed": 0}
+    assert [result.local.remote_path for result in report.uploaded] == ["/docs/c.txt"]
+    assert report.files_per_second == 1 / report.seconds
+    assert report.bytes == len(b"changed")
+    assert "POST /files/content" not in metrics.snapshot()
+    assert metrics.snapshot()["POST /files/:id/content"]["calls"] == 1
+    assert fake_box.items[resolve(box_client, "/docs/c.txt").id]["content"] == b"changed"
+
+
+def test_upload_file_skips_identical_file(fake_box, box_client, tmp_path):
+    path = tmp_path / "same.txt"
+    path.write_bytes(b"same")
+    file_id = fake_box.add_file("same.txt", "0", b"same")
+
+    with collect_metrics() as metrics:
+        box_file = upload_file(box_client, box_client.folder("0"), str(path))
+
+    assert box_file.id == file_id
+    assert "POST /files/:id/content" not in metrics.snapshot()
+    assert get_sha1_index().lookup(str(path)) == hashlib.sha1(b"same").hexdigest()
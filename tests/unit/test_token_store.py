@@ -0,0 +1,199 @@
+"""Tests for the token store shared by several processes"""
+import json
+import multiprocessing
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from boxsdk.config import API
+
+from utils.box_client import get_client
+from utils.token_store import REFRESH_MARGIN, TokenStore
+
+PROCESSES = 8
+EXPIRIES = 3
+
+
+def refresh_worker(api_url: str, workdir: str, barrier, results):
+    """Refreshes the shared token once per expiry, like a worker would"""
+    os.chdir(workdir)
+    API.OAUTH2_API_URL = f"{api_url}/oauth2"
+
+    from utils.box_oauth import oauth_from_previous  # pylint: disable=import-outside-toplevel
+
+    for _ in range(EXPIRIES):
+        oauth = oauth_from_previous()
+        # the token the worker's requests were sent with
+        expired = oauth.access_token
+        barrier.wait()
+        try:
+            results.put(oauth.refresh(expired)[0])
+        except Exception as err:  # pylint: disable=broad-except
+            results.put(repr(err))
+        barrier.wait()
+
+
+@pytest.mark.fake_box(latency=0.05)
+def test_single_refresh_per_expiry_across_processes(fake_box, tmp_path):
+    TokenStore(str(tmp_path / ".oauth.json")).store("access_token_0", "refresh_token_0")
+    fake_box.issue_refresh_token("refresh_token_0")
+
+    context = multiprocessing.get_context("spawn")
+    barrier = context.Barrier(PROCESSES)
+    results = context.Queue()
+    workers = [
+        context.Process(
+            target=refresh_worker, args=(fake_box.url, str(tmp_path), barrier, results)
+        )
+        for _ in range(PROCESSES)
+    ]
+    for worker in workers:
+        worker.start()
+    tokens = [results.get(timeout=60) for _ in range(PROCESSES * EXPIRIES)]
+    for worker in workers:
+        worker.join(timeout=60)
+
+    assert fake_box.refresh_grants == EXPIRIES
+    assert sorted(set(tokens)) == [f"access_token_{count}" for count in range(1, EXPIRIES + 1)]
+    assert all(worker.exitcode == 0 for worker in workers)
+
+
+def test_store_reads_back_expiry(tmp_path):
+    path = str(tmp_path / ".oauth.json")
+    TokenStore(path).store("access", "refresh")
+
+    store = TokenStore(path)
+    assert store.load() == ("access", "refresh")
+    assert store.is_fresh()
+    assert not [name for name in os.listdir(tmp_path) if name.endswith(".tmp")]
+
+
+def write_tokens(path: str, access_token: str, refresh_token: str, expires_in: timedelta):
+    """Writes a token file whose access token expires in expires_in"""
+    now = datetime.today()
+    with open(path, "w", encoding="UTF-8") as file:
+        json.dump(
+            {
+                "access_token": access_token,
+                "access_token_expires_on": str(now + expires_in),
+                "refresh_token": refresh_token,
+                "refresh_token_expires_on": str(now + timedelta(days=60)),
+            },
+            file,
+        )
+
+
+def test_freshness(tmp_path):
+    path = str(tmp_path / ".oauth.json")
+    store = TokenStore(path)
+    assert not store.is_fresh() and store.seconds_to_refresh() == 0
+
+    write_tokens(path, "access", "refresh", REFRESH_MARGIN + timedelta(minutes=10))
+    assert store.is_fresh()
+    assert 9 * 60 < store.seconds_to_refresh() <= 10 * 60
+
+    write_tokens(path, "access", "refresh", REFRESH_MARGIN - timedelta(minutes=1))
+    assert not store.is_fresh() and store.seconds_to_refresh() == 0
+
+
+class RecordingOAuth:
+    """Stands in for the OAuth2 object, storing a new token on every refresh"""
+
+    def __init__(self, store: TokenStore) -> None:
+        self.store = store
+        self.access_token = "access_0"
+        self.refreshes = 0
+        self.refreshed = threading.Event()
+
+    def refresh(self, access_token: str):
+        self.refreshes += 1
+        self.access_token = f"access_{self.refreshes}"
+        self.store.store(self.access_token, f"refresh_{self.refreshes}")
+        self.refreshed.set()
+        return self.access_token, f"refresh_{self.refreshes}"
+
+
+def test_timer_refreshes_before_expiry(tmp_path):
+    path = str(tmp_path / ".oauth.json")
+    store = TokenStore(path)
+    write_tokens(path, "access_0", "refresh_0", REFRESH_MARGIN + timedelta(seconds=0.3))
+    oauth = RecordingOAuth(store)
+
+    store.schedule_refresh(oauth)
+    try:
+        assert not oauth.refreshed.wait(0.1)
+        assert oauth.refreshed.wait(5)
+    finally:
+        store.cancel_refresh()
+
+    # refreshed once, before the token expired, and the new token is good for an hour
+    assert oauth.refreshes == 1
+    assert store.load() == ("access_1", "refresh_1")
+    assert store.seconds_to_refresh() > 50 * 60
+
+
+def test_cancelled_timer_does_not_refresh(tmp_path):
+    path = str(tmp_path / ".oauth.json")
+    store = TokenStore(path)
+    write_tokens(path, "access_0", "refresh_0", REFRESH_MARGIN + timedelta(seconds=0.1))
+    oauth = RecordingOAuth(store)
+
+    store.schedule_refresh(oauth)
+    store.cancel_refresh()
+    assert not oauth.refreshed.wait(0.5)
+
+
+def test_one_timer_per_store(tmp_path):
+    path = str(tmp_path / ".oauth.json")
+    store = TokenStore(path)
+    write_tokens(path, "access_0", "refresh_0", REFRESH_MARGIN + timedelta(seconds=0.2))
+    first, latest = RecordingOAuth(store), RecordingOAuth(store)
+
+    store.schedule_refresh(first)
+    store.schedule_refresh(latest)
+    try:
+        assert latest.refreshed.wait(5)
+    finally:
+        store.cancel_refresh()
+
+    assert (first.refreshes, latest.refreshes) == (0, 1)
+
+
+@pytest.mark.parametrize("expires_in, refresh_grants", [(timedelta(minutes=30), 0), (timedelta(minutes=1), 1)])
+def test_get_client_refreshes_only_stale_tokens(fake_box, config, tmp_path, monkeypatch, expires_in, refresh_grants):
+    path = str(tmp_path / ".oauth.json")
+    store = TokenStore(path)
+    monkeypatch.setattr("utils.box_oauth._token_store", store)
+    write_tokens(path, "access_0", "refresh_0", expires_in)
+    fake_box.issue_refresh_token("refresh_0")
+
+    try:
+        client = get_client(config)
+    finally:
+        store.cancel_refresh()
+
+    assert fake_box.refresh_grants == refresh_grants
+    assert (client.auth.access_token == "access_0") == (refresh_grants == 0)
+
+
+def test_background_refresh_serves_every_client(fake_box, config, tmp_path, monkeypatch):
+    path = str(tmp_path / ".oauth.json")
+    store = TokenStore(path)
+    monkeypatch.setattr("utils.box_oauth._token_store", store)
+    write_tokens(path, "access_0", "refresh_0", REFRESH_MARGIN + timedelta(seconds=0.3))
+    fake_box.issue_refresh_token("refresh_0")
+
+    try:
+        clients = [get_client(config) for _ in range(3)]
+        deadline = time.monotonic() + 5
+        while fake_box.refresh_grants == 0 and time.monotonic() < deadline:
+            time.sleep(0.05)
+    finally:
+        store.cancel_refresh()
+
+    access_token, _ = store.load()
+    assert fake_box.refresh_grants == 1
+    assert access_token != "access_0"
+    assert [client.auth.access_token for client in clients] == [access_token] * 3
@@ -0,0 +1,129 @@
+"""Tests for the folder tree diffs"""
+import io
+import os
+
+import pytest
+
+from utils.tree_diff import (
+    ChangeKind,
+    DiffEntry,
+    content_changed,
+    diff_trees,
+    file_sha1,
+    folder_entries,
+    local_entries,
+    snapshot_entries,
+    summarize,
+)
+from utils.tree_snapshot import TreeSnapshot
+
+
+def changed(changes):
+    return sorted(
+        (change.kind.value, change.old and change.old.path, change.new and change.new.path) for change in changes
+    )
+
+
+def test_identical_trees_have_no_changes(root):
+    snapshot = TreeSnapshot.from_folder(root)
+    assert not diff_trees(snapshot_entries(snapshot), folder_entries(root))
+
+
+def test_snapshot_against_later_snapshot(root, box_client):
+    before = TreeSnapshot.from_folder(root)
+
+    def item_id(path):
+        return str(before.ids[before.find(path)])
+
+    box_client.folder(item_id("/folder_1_0")).rename("renamed")
+    box_client.folder(item_id("/folder_1_1/folder_2_0")).move(
+        parent_folder=box_client.folder(item_id("/folder_1_2")), name="moved"
+    )
+    box_client.folder(item_id("/folder_1_1")).upload_stream(io.BytesIO(b"new"), "new.txt")
+    box_client.file(item_id("/folder_1_2/file_2.txt")).update_contents_with_stream(io.BytesIO(b"changed"))
+    box_client.file(item_id("/file_1.txt")).delete()
+
+    changes = diff_trees(snapshot_entries(before), snapshot_entries(TreeSnapshot.from_folder(root)))
+
+    # the items of the renamed and moved folders are not moves of their own
+    assert changed(changes) == [
+        ("added", None, "/folder_1_1/new.txt"),
+        ("modified", "/folder_1_2/file_2.txt", "/folder_1_2/file_2.txt"),
+        ("moved", "/folder_1_0", "/renamed"),
+        ("moved", "/folder_1_1/folder_2_0", "/folder_1_2/moved"),
+        ("removed", "/file_1.txt", None),
+    ]
+    assert summarize(changes) == {"added": 1, "removed": 1, "modified": 1, "moved": 2}
+
+
+def test_local_directory_against_box(root, tmp_path):
+    local = tmp_path / "local"
+    for entry in folder_entries(root):
+        if entry.type == "folder":
+            os.makedirs(local / entry.path.lstrip("/"))
+        else:
+            (local / entry.path.lstrip("/")).write_bytes(b"content")
+    assert not diff_trees(folder_entries(root), local_entries(str(local)))
+
+    (local / "folder_1_0" / "file_2.txt").write_bytes(b"edited")
+    (local / "folder_1_1" / "extra.txt").write_bytes(b"extra")
+    os.remove(local / "folder_1_2" / "folder_2_2" / "file_3.txt")
+
+    changes = diff_trees(folder_entries(root), local_entries(str(local)), detect_moves=False)
+    assert changed(changes) == [
+        ("added", None, "/folder_1_1/extra.txt"),
+        ("modified", "/folder_1_0/file_2.txt", "/folder_1_0/file_2.txt"),
+        ("removed", "/folder_1_2/folder_2_2/file_3.txt", None),
+    ]
+
+
+def test_moves_detected_by_sha1(tmp_path):
+    for name, content in (("a.txt", b"alpha"), ("b.txt", b"beta"), ("c.txt", b"gamma")):
+        (tmp_path / name).write_bytes(content)
+    before = list(local_entries(str(tmp_path)))
+
+    os.mkdir(tmp_path / "sub")
+    os.rename(tmp_path / "a.txt", tmp_path / "sub" / "renamed.txt")
+    (tmp_path / "b.txt").write_bytes(b"beta!")
+    after = list(local_entries(str(tmp_path)))
+
+    assert changed(diff_trees(before, after)) == [
+        ("added", None, "/sub"),
+        ("modified", "/b.txt", "/b.txt"),
+        ("moved", "/a.txt", "/sub/renamed.txt"),
+    ]
+    assert changed(diff_trees(before, after, detect_moves=False))[0] == ("added", None, "/sub")
+    assert summarize(diff_trees(before, after, detect_moves=False))["moved"] == 0
+
+
+def test_type_change_and_size_only_comparison(tmp_path):
+    path = tmp_path / "file.txt"
+    path.write_bytes(b"content")
+    assert file_sha1(str(path)) == "040f06fd774092478d450774f5ba30c5da78acc8"
+
+    old = [DiffEntry("/item", "file", 7, None, 100, "1"), DiffEntry("/same", "file", 7, None, 100)]
+    new = [DiffEntry("/item", "folder", 0, None, 0, "1"), DiffEntry("/same", "file", 7, None, 0)]
+    kinds = [change.kind for change in diff_trees(old, new)]
+    assert kinds == [ChangeKind.REMOVED, ChangeKind.ADDED]
+
+
+def test_local_directory_without_hashes_against_box(root, tmp_path):
+    local = tmp_path / "local"
+    for entry in folder_entries(root):
+        if entry.type == "folder":
+            os.makedirs(local / entry.path.lstrip("/"))
+        else:
+            (local / entry.path.lstrip("/")).write_bytes(b"content")
+    # local mtimes have nothing to do with Box's modified_at, sizes are compared
+    assert not diff_trees(folder_entries(root), local_entries(str(local), hasher=None))
+
+    (local / "folder_1_0" / "file_2.txt").write_bytes(b"longer content")
+    changes = diff_trees(folder_entries(root), local_entries(str(local), hasher=None))
+    assert changed(changes) == [("modified", "/folder_1_0/file_2.txt", "/folder_1_0/file_2.txt")]
+
+
+def test_content_changed_is_a_bool():
+    box_file = DiffEntry("/file.txt", "file", 7, None, 100, "1")
+    assert content_changed(box_file, box_file._replace(modified_at=0)) is False
+    assert content_changed(box_file, box_file._replace(modified_at=200)) is True
+    assert content_changed(box_file, box_file._replace(id=None, modified_at=200)) is False
@@ -0,0 +1,93 @@
+"""Tests for the event driven tree mirror"""
+import io
+import threading
+import time
+
+import pytest
+
+from tests.sample_trees import serial_walk
+from utils.box_metrics import collect_metrics
+from utils.tree_mirror import TreeMirror
+
+
+@pytest.fixture(name="mirror")
+def fixture_mirror(root, box_client, tmp_path):
+    return TreeMirror(box_client, checkpoint_path=str(tmp_path / "mirror.json")).start()
+
+
+def mirrored_paths(mirror: TreeMirror):
+    return {mirror.path_of(item.id) for item in mirror.walk()}
+
+
+def test_build_mirrors_the_tree(mirror, root):
+    assert mirrored_paths(mirror) == set(serial_walk(root))
+    assert [item.name for item in mirror.list_folder()] == [item.name for item in root.get_items()]
+    assert mirror.find("/folder_1_0/folder_2_1/file_3.txt").type == "file"
+    assert mirror.find("/folder_1_0/missing") is None
+
+
+def test_sync_applies_item_events(mirror, root, box_client):
+    first = box_client.folder(mirror.find("/folder_1_0").id)
+    second = box_client.folder(mirror.find("/folder_1_1").id)
+
+    created = first.create_subfolder("created")
+    created.upload_stream(io.BytesIO(b"content"), "uploaded.txt")
+    box_client.folder(mirror.find("/folder_1_0/folder_2_0").id).rename("renamed")
+    box_client.folder(mirror.find("/folder_1_0/folder_2_1").id).move(parent_folder=second, name="moved")
+    box_client.folder(mirror.find("/folder_1_2/folder_2_2").id).copy(parent_folder=created)
+    box_client.folder(mirror.find("/folder_1_2/folder_2_0").id).delete()
+
+    with collect_metrics() as metrics:
+        assert mirror.sync() == 6
+    assert mirrored_paths(mirror) == set(serial_walk(root))
+    assert mirror.find("/folder_1_0/created/folder_2_2/folder_3_0") is not None
+    # the copied folder is listed, nothing else is
+    assert metrics.snapshot()["GET /folders/:id/items"]["calls"] == 4
+
+    assert mirror.sync() == 0
+
+
+def test_restart_resumes_from_the_checkpoint(mirror, root, box_client, tmp_path):
+    box_client.folder("0").create_subfolder("before_restart")
+    mirror.sync()
+    box_client.folder("0").create_subfolder("after_restart")
+
+    with collect_metrics() as metrics:
+        restarted = TreeMirror(box_client, checkpoint_path=str(tmp_path / "mirror.json")).start()
+    assert metrics.snapshot() == {}
+    assert restarted.find("/before_restart") is not None
+    assert restarted.find("/after_restart") is None
+
+    assert restarted.sync() == 1
+    assert mirrored_paths(restarted) == set(serial_walk(root))
+
+
+def test_moved_out_of_the_mirror(fake_box, box_client):
+    inside = fake_box.add_folder("inside")
+    outside = fake_box.add_folder("outside")
+    fake_box.add_file("file.txt", inside)
+    mirror = TreeMirror(box_client, folder_id=inside).start()
+
+    file = box_client.file(mirror.find("/file.txt").id)
+    file.move(parent_folder=box_client.folder(outside))
+    mirror.sync()
+    assert mirror.find("/file.txt") is None
+
+    file.move(parent_folder=box_client.folder(inside))
+    mirror.sync()
+    assert mirror.find("/file.txt").id == file.object_id
+
+
+def test_follow_long_polls(mirror, box_client):
+    stop = threading.Event()
+    follower = threading.Thread(target=mirror.follow, args=(stop,), daemon=True)
+    follower.start()
+    try:
+        folder = box_client.folder("0").create_subfolder("followed")
+        deadline = time.monotonic() + 5
+        while folder.id not in mirror and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert mirror.find("/followed").id == folder.id
+    finally:
+        stop.set()
+        follower.join(5)
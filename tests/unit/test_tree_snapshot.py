@@ -0,0 +1,88 @@
+"""Tests for the compact tree snapshots"""
+import io
+import os
+import zipfile
+
+import pytest
+
+from tests.sample_trees import serial_walk
+from utils.tree_snapshot import TreeSnapshot
+
+
+@pytest.fixture(name="snapshot")
+def fixture_snapshot(root):
+    return TreeSnapshot.from_folder(root)
+
+
+def test_snapshot_matches_the_tree(snapshot, box_client):
+    root = box_client.folder("0")
+    assert [snapshot.path_of(index) for index in snapshot.walk()] == list(serial_walk(root))
+
+    index = snapshot.find("/folder_1_0/folder_2_1/file_3.txt")
+    record = snapshot.record(index)
+    file = box_client.file(record.id).get()
+    assert (record.type, record.name, record.size, record.sha1) == ("file", file.name, file.size, file.sha1)
+    assert record.modified_at > 0
+    assert snapshot.record(snapshot.find("/folder_1_0")).sha1 is None
+    assert snapshot.find("/folder_1_0/missing") is None
+
+
+def test_save_and_load(snapshot, tmp_path):
+    path = str(tmp_path / "tree.snapshot")
+    snapshot.save(path)
+
+    with TreeSnapshot.load(path) as loaded:
+        assert len(loaded) == len(snapshot)
+        assert list(loaded) == list(snapshot)
+        assert loaded.find("/folder_1_2/folder_2_2/folder_3_2") == snapshot.find("/folder_1_2/folder_2_2/folder_3_2")
+
+
+def test_load_rejects_other_files(tmp_path):
+    path = tmp_path / "other"
+    path.write_bytes(b"not a snapshot at all, not at all")
+    with pytest.raises(ValueError):
+        TreeSnapshot.load(str(path))
+
+
+@pytest.mark.parametrize("keep", [0, 10, -1])
+def test_load_rejects_empty_and_truncated_files(snapshot, tmp_path, keep):
+    path = tmp_path / "tree.snapshot"
+    snapshot.save(str(path))
+    content = path.read_bytes()
+    path.write_bytes(content[:keep] if keep >= 0 else content[:keep])
+
+    with pytest.raises(ValueError, match="truncated"):
+        TreeSnapshot.load(str(path))
+
+
+def test_timestamps_outside_32_bits(tmp_path):
+    snapshot = TreeSnapshot()
+    root = snapshot.append("0", -1, "folder", "All Files")
+    old = snapshot.append("1", root, "file", "old.txt", modified_at="1969-07-20T20:17:40+00:00")
+    future = snapshot.append("2", root, "file", "future.txt", modified_at="2200-01-01T00:00:00+00:00")
+    path = str(tmp_path / "tree.snapshot")
+    snapshot.save(path)
+
+    with TreeSnapshot.load(path) as loaded:
+        assert loaded.record(old).modified_at == -14182940
+        assert loaded.record(future).modified_at == 7258118400
+    assert os.listdir(tmp_path) == ["tree.snapshot"]
+
+
+def test_unicode_names_and_large_values():
+    snapshot = TreeSnapshot()
+    root = snapshot.append("0", -1, "folder", "All Files")
+    index = snapshot.append("18446744073709551", root, "file", "résumé 📄.pdf", 2**40, "ab" * 20)
+
+    assert snapshot.record(index).name == "résumé 📄.pdf"
+    assert snapshot.record(index).size == 2**40
+    assert snapshot.find("/résumé 📄.pdf") == index
+
+
+def test_box_items_feed_download_zip(snapshot, box_client):
+    stream = io.BytesIO()
+    box_client.download_zip("tree.zip", snapshot.box_items(box_client, snapshot.children()), stream)
+
+    files = {snapshot.path_of(index).lstrip("/") for index in snapshot.walk() if snapshot.type(index) == "file"}
+    with zipfile.ZipFile(stream) as archive:
+        assert set(archive.namelist()) == files
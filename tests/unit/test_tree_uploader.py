@@ -0,0 +1,109 @@
+"""Tests for the directory tree uploader"""
+import pytest
+from requests.exceptions import ConnectionError as RequestsConnectionError
+
+from utils import chunked_upload
+from utils.box_metrics import collect_metrics
+from utils.path_resolver import resolve
+from utils.tree_uploader import FileStatus, failed_paths, scan_directory, upload_tree
+
+LOCAL_TREE = {
+    "a.txt": b"a",
+    "docs/b.txt": b"bb",
+    "docs/deep/c.txt": b"ccc",
+    "docs/deep/d.txt": b"dddd",
+    "empty/": None,
+    "other/e.txt": b"eeeee",
+}
+
+
+@pytest.fixture(name="local_tree")
+def fixture_local_tree(tmp_path) -> str:
+    root = tmp_path / "tree"
+    for path, content in LOCAL_TREE.items():
+        target = root / path
+        if content is None:
+            target.mkdir(parents=True)
+        else:
+            target.parent.mkdir(parents=True, exist_ok=True)
+            target.write_bytes(content)
+    return str(root)
+
+
+@pytest.fixture(autouse=True)
+def no_retry_delay(monkeypatch):
+    monkeypatch.setattr("utils.tree_uploader.FILE_RETRY_DELAY", 0.0)
+
+
+def test_scan_directory(local_tree):
+    folders, files = scan_directory(local_tree)
+    assert folders == ["/docs", "/empty", "/other", "/docs/deep"]
+    assert [(local.remote_path, local.size) for local in files] == [
+        ("/a.txt", 1),
+        ("/docs/b.txt", 2),
+        ("/docs/deep/c.txt", 3),
+        ("/docs/deep/d.txt", 4),
+        ("/other/e.txt", 5),
+    ]
+
+
+def test_upload_tree(fake_box, box_client, local_tree):
+    target = box_client.folder(fake_box.add_folder("target"))
+    with collect_metrics() as metrics:
+        report = upload_tree(box_client, local_tree, target, max_workers=4)
+
+    assert report.counts() == {"uploaded": 5, "updated": 0, "unchanged": 0, "failed": 0}
+    assert (report.folders, report.bytes) == (4, 15)
+    assert report.files_per_second > 0 and report.bytes_per_second > 0
+    # only the target folder is listed, the skeleton folders are created empty, and nothing is preflighted
+    assert metrics.snapshot()["POST /folders"]["calls"] == 4
+    assert metrics.snapshot()["GET /folders/:id/items"]["calls"] == 1
+    assert "OPTIONS /files/content" not in metrics.snapshot()
+    for path, content in LOCAL_TREE.items():
+        item = resolve(box_client, f"/target/{path.rstrip('/')}")
+        assert item is not None
+        if content is not None:
+            assert fake_box.items[item.id]["content"] == content
+
+
+def test_second_upload_adds_versions(fake_box, box_client, local_tree):
+    upload_tree(box_client, local_tree)
+    with open(f"{local_tree}/docs/b.txt", "wb") as file:
+        file.write(b"changed")
+
+    with collect_metrics() as metrics:
+        report = upload_tree(box_client, local_tree, skip_unchanged=False)
+
+    assert report.counts() == {"uploaded": 0, "updated": 5, "unchanged": 0, "failed": 0}
+    assert "POST /folders" not in metrics.snapshot()
+    assert fake_box.items[resolve(box_client, "/docs/b.txt").id]["content"] == b"changed"
+
+
+def test_files_are_retried_and_failures_listed(fake_box, box_client, local_tree, tmp_path, monkeypatch):
+    failures = {"/docs/b.txt": 1, "/other/e.txt": 100}
+    upload = chunked_upload.upload_to_folder
+
+    def flaky_upload(folder, path, file_name=None, threshold=chunked_upload.CHUNKED_UPLOAD_THRESHOLD):
+        remote_path = "/" + path[len(local_tree) + 1 :].replace("\\", "/")
+        if failures.get(remote_path, 0) > 0:
+            failures[remote_path] -= 1
+            raise RequestsConnectionError("connection reset")
+        return upload(folder, path, file_name, threshold)
+
+    monkeypatch.setattr("utils.tree_uploader.upload_to_folder", flaky_upload)
+    report = upload_tree(box_client, local_tree)
+
+    assert report.counts() == {"uploaded": 4, "updated": 0, "unchanged": 0, "failed": 1}
+    attempts = {result.local.remote_path: result.attempts for result in report.results}
+    assert attempts["/docs/b.txt"] == 2
+    assert attempts["/other/e.txt"] == 3
+    manifest = str(tmp_path / "failed.json")
+    report.write_manifest(manifest)
+    assert failed_paths(manifest) == ["/other/e.txt"]
+
+    failures.clear()
+    retried = upload_tree(box_client, local_tree, only=failed_paths(manifest))
+    assert [(result.local.remote_path, result.status) for result in retried.results] == [
+        ("/other/e.txt", FileStatus.UPLOADED)
+    ]
+
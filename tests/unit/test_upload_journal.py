@@ -0,0 +1,156 @@
+"""Tests for the upload journal and resumed chunked uploads"""
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from requests.exceptions import ConnectionError as RequestsConnectionError
+
+from utils.box_metrics import collect_metrics
+from utils.chunked_upload import chunked_update, chunked_upload, resume_all
+from utils.upload_journal import UploadJournal, get_upload_journal, journal_key
+from workshops.files.files_sln import upload_file
+
+PART_SIZE = 1024
+PARTS = 11
+
+pytestmark = pytest.mark.fake_box(upload_part_size=PART_SIZE)
+
+
+@pytest.fixture(name="local_file")
+def fixture_local_file(tmp_path) -> str:
+    path = tmp_path / "large.bin"
+    path.write_bytes(os.urandom((PARTS - 1) * PART_SIZE + 100))
+    return str(path)
+
+
+def crash_after(parts: int):
+    """Progress callback losing the connection once parts were sent"""
+
+    def progress(uploaded: int, _):
+        if uploaded >= parts * PART_SIZE:
+            raise RequestsConnectionError("connection lost")
+
+    return progress
+
+
+def read(path: str) -> bytes:
+    with open(path, "rb") as file:
+        return file.read()
+
+
+def test_journal_round_trip(tmp_path, local_file):
+    journal = UploadJournal(str(tmp_path / "journal"))
+    key = journal_key(local_file, folder_id="0", file_name="large.bin")
+    assert journal.load(key) is None
+
+    journal.start(key, "42", local_file, PART_SIZE, folder_id="0", file_name="large.bin")
+    journal.record_part(key, {"part_id": "A", "offset": 0, "size": PART_SIZE, "sha1": "x"})
+    with open(os.path.join(journal.directory, f"{key}.jsonl"), "a", encoding="UTF-8") as file:
+        file.write('{"part": {"part_id": "B", "off')
+
+    entry = journal.load(key)
+    assert (entry.session_id, entry.path, entry.folder_id, entry.file_name) == ("42", local_file, "0", "large.bin")
+    assert list(entry.parts) == [0]
+    assert [entry.key for entry in journal.entries()] == [key]
+
+    journal.discard(key)
+    assert not list(journal.entries())
+
+
+def test_part_finishing_after_discard(tmp_path, local_file):
+    journal = UploadJournal(str(tmp_path / "journal"))
+    key = journal_key(local_file, folder_id="0", file_name="large.bin")
+    journal.start(key, "42", local_file, PART_SIZE, folder_id="0", file_name="large.bin")
+    parts = [{"part_id": str(offset), "offset": offset, "size": PART_SIZE, "sha1": "x"} for offset in range(64)]
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        recorded = [executor.submit(journal.record_part, key, part) for part in parts]
+        journal.discard(key)
+    for future in recorded:
+        future.result()
+
+    assert not os.listdir(journal.directory)
+    assert journal.load(key) is None
+    journal.record_part(key, parts[0])
+    assert not os.listdir(journal.directory)
+
+
+def test_interrupted_upload_resumes(fake_box, box_client, local_file):
+    folder = box_client.folder("0")
+    with pytest.raises(RequestsConnectionError):
+        chunked_upload(folder, local_file, max_workers=1, progress=crash_after(4))
+    (entry,) = get_upload_journal().entries()
+    assert len(entry.parts) >= 4
+    assert entry.session_id in fake_box.upload_sessions
+
+    with collect_metrics() as metrics:
+        stats = chunked_upload(folder, local_file)
+
+    assert stats.resumed == len(entry.parts)
+    assert metrics.snapshot()["PUT /files/upload_sessions/:id"]["calls"] == PARTS - len(entry.parts)
+    assert "POST /files/upload_sessions" not in metrics.snapshot()
+    assert fake_box.items[stats.file.id]["content"] == read(local_file)
+    assert not list(get_upload_journal().entries())
+
+
+def test_changed_file_starts_over(fake_box, box_client, local_file):
+    folder = box_client.folder("0")
+    with pytest.raises(RequestsConnectionError):
+        chunked_upload(folder, local_file, progress=crash_after(2))
+    with open(local_file, "ab") as file:
+        file.write(b"changed")
+
+    stats = chunked_upload(folder, local_file)
+
+    assert stats.resumed == 0
+    assert fake_box.items[stats.file.id]["content"] == read(local_file)
+    # the session of the first attempt was aborted
+    assert not fake_box.upload_sessions
+
+
+def test_expired_session_starts_over(fake_box, box_client, local_file):
+    folder = box_client.folder("0")
+    with pytest.raises(RequestsConnectionError):
+        chunked_upload(folder, local_file, progress=crash_after(2))
+    fake_box.upload_sessions.clear()
+
+    stats = chunked_upload(folder, local_file)
+    assert stats.resumed == 0
+    assert fake_box.items[stats.file.id]["content"] == read(local_file)
+
+
+def test_resume_all(fake_box, box_client, local_file, tmp_path):
+    other = tmp_path / "other.bin"
+    other.write_bytes(os.urandom(3 * PART_SIZE))
+    gone = tmp_path / "gone.bin"
+    gone.write_bytes(os.urandom(3 * PART_SIZE))
+    version_of = box_client.file(fake_box.add_file("version.bin", "0", b"old"))
+
+    with pytest.raises(RequestsConnectionError):
+        chunked_upload(box_client.folder("0"), local_file, progress=crash_after(3))
+    with pytest.raises(RequestsConnectionError):
+        chunked_update(version_of, str(other), progress=crash_after(1))
+    with pytest.raises(RequestsConnectionError):
+        chunked_upload(box_client.folder("0"), str(gone), progress=crash_after(1))
+    os.remove(gone)
+    assert len(list(get_upload_journal().entries())) == 3
+
+    completed = resume_all(box_client)
+
+    assert sorted(stats.file.name for stats in completed) == ["large.bin", "version.bin"]
+    assert all(stats.resumed for stats in completed)
+    assert fake_box.items[version_of.object_id]["content"] == read(str(other))
+    assert not list(get_upload_journal().entries())
+    assert not fake_box.upload_sessions
+
+
+def test_upload_file_resumes(fake_box, box_client, local_file):
+    folder = box_client.folder("0")
+    with pytest.raises(RequestsConnectionError):
+        chunked_upload(folder, local_file, max_workers=1, progress=crash_after(5))
+
+    with collect_metrics() as metrics:
+        box_file = upload_file(box_client, folder, local_file, chunked_threshold=0)
+    assert metrics.snapshot()["PUT /files/upload_sessions/:id"]["calls"] <= PARTS - 5
+    assert fake_box.items[box_file.id]["content"] == read(local_file)
+    assert not list(get_upload_journal().entries())
@@ -0,0 +1,100 @@
+""" Atomic file writes and inter-process file locks
+---
+Content is written to a temporary file in the same folder and renamed over
+the target, so readers see either the old or the new file, never a partial one.
+"""
+import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import IO, Iterator
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+@contextmanager
+def atomic_writer(path: str, mode: str = "wb", **kwargs) -> Iterator[IO]:
+    """
+    Yields a uniquely named temporary file next to path, which replaces path
+    once the block completes, and is removed if it raises
+    """
+    folder = os.path.dirname(os.path.abspath(path))
+    file_descriptor, tmp_path = tempfile.mkstemp(
+        dir=folder, prefix=f".{os.path.basename(path)}.", suffix=".tmp"
+    )
+    try:
+        with os.fdopen(file_descriptor, mode, **kwargs) as file:
+            yield file
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+def write_json_atomic(path: str, data, indent: int = 4):
+    """Writes data as json to path atomically"""
+    with atomic_writer(path, "w", encoding="UTF-8") as file:
+        file.write(json.dumps(data, indent=indent))
+
+
+class FileLock:
+    """
+    Exclusive lock shared by every thread and process using the same lock file.
+    Use it as a context manager.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._thread_lock = threading.Lock()
+        self._file = None
+
+    def acquire(self):
+        """Blocks until the lock is held"""
+        self._thread_lock.acquire()
+        try:
+            file = open(self.path, "a+b")  # pylint: disable=consider-using-with
+            try:
+                if fcntl is not None:
+                    fcntl.flock(file.fileno(), fcntl.LOCK_EX)
+                else:
+                    file.seek(0)
+                    while True:
+                        try:
+                            msvcrt.locking(file.fileno(), msvcrt.LK_LOCK, 1)
+                            break
+                        except OSError:
+                            continue
+            except BaseException:
+                file.close()
+                raise
+        except BaseException:
+            self._thread_lock.release()
+            raise
+        self._file = file
+
+    def release(self):
+        """Releases the lock"""
+        file, self._file = self._file, None
+        try:
+            if fcntl is not None:
+                fcntl.flock(file.fileno(), fcntl.LOCK_UN)
+            else:
+                file.seek(0)
+                msvcrt.locking(file.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            file.close()
+            self._thread_lock.release()
+
+    def __enter__(self) -> "FileLock":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
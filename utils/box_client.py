@@ -3,10 +3,19 @@ Handles the box client object creation
 orchestrates the authentication process
 """
 
-from boxsdk import Client, JWTAuth, CCGAuth
-from utils.box_oauth import oauth_from_previous
+import threading
+import time
+from typing import Callable, Dict, Optional, Tuple
+
+from boxsdk import Client
+from utils.box_network import get_authorized_session, get_session
+from utils.box_oauth import get_token_store, oauth_from_previous
 from utils.config import AppConfig
-from utils.oauth_callback import callback_handle_request, open_browser
+
+AUTH_OAUTH = "oauth"
+AUTH_JWT = "jwt"
+AUTH_CCG_ENTERPRISE = "ccg_enterprise"
+AUTH_CCG_USER = "ccg_user"
 
 
 def get_client(config: AppConfig) -> Client:
@@ -15,6 +24,12 @@ def get_client(config: AppConfig) -> Client:
 
     # do we need to authorize the app?
     if not oauth.access_token:
+        # the callback server and browser are only needed for the first login
+        from utils.oauth_callback import (  # pylint: disable=import-outside-toplevel
+            callback_handle_request,
+            open_browser,
+        )
+
         auth_url, csrf_token = oauth.get_authorization_url(config.redirect_uri)
         open_browser(auth_url)
         callback_handle_request(config, csrf_token)
@@ -24,56 +39,188 @@ def get_client(config: AppConfig) -> Client:
     if not oauth.access_token:
         raise RuntimeError("Unable to authenticate")
 
-    oauth.refresh(oauth.access_token)
+    # only pay for a token round trip if the stored token is about to expire
+    token_store = get_token_store()
+    if not token_store.is_fresh():
+        oauth.refresh(oauth.access_token)
+    token_store.schedule_refresh(oauth)
 
-    return Client(oauth)
+    return Client(oauth, session=get_authorized_session(config, oauth))
 
 
 def get_jwt_client(config: AppConfig, as_user_id: str = None) -> Client:
     """Returns a boxsdk Client object"""
+    from boxsdk.auth.jwt_auth import JWTAuth  # pylint: disable=import-outside-toplevel
 
-    auth = JWTAuth.from_settings_file(config.jwt_config_path)
+    auth = JWTAuth.from_settings_file(
+        config.jwt_config_path, session=get_session(config)
+    )
 
-    client = Client(auth)
+    client = Client(auth, session=get_authorized_session(config, auth))
 
     if as_user_id:
         as_user = client.user(as_user_id)
-        client.as_user(as_user)
+        client = client.as_user(as_user)
 
     return client
 
 
 def get_ccg_enterprise_client(config: AppConfig, as_user_id: str = None) -> Client:
     """Returns a boxsdk Client object"""
+    from boxsdk.auth.ccg_auth import CCGAuth  # pylint: disable=import-outside-toplevel
 
     auth = CCGAuth(
         client_id=config.client_id,
         client_secret=config.client_secret,
         enterprise_id=config.enterprise_id,
+        session=get_session(config),
     )
 
-    client = Client(auth)
+    client = Client(auth, session=get_authorized_session(config, auth))
 
     if as_user_id:
         as_user = client.user(as_user_id)
-        client.as_user(as_user)
+        client = client.as_user(as_user)
 
     return client
 
 
 def get_ccg_user_client(config: AppConfig, as_user_id: str = None) -> Client:
     """Returns a boxsdk Client object"""
+    from boxsdk.auth.ccg_auth import CCGAuth  # pylint: disable=import-outside-toplevel
 
     auth = CCGAuth(
         client_id=config.client_id,
         client_secret=config.client_secret,
         user=config.ccg_user_id,
+        session=get_session(config),
     )
 
-    client = Client(auth)
+    client = Client(auth, session=get_authorized_session(config, auth))
 
     if as_user_id:
         as_user = client.user(as_user_id)
-        client.as_user(as_user)
+        client = client.as_user(as_user)
 
     return client
+
+
+def _get_oauth_client(config: AppConfig, as_user_id: str = None) -> Client:
+    """Returns an oAuth2 boxsdk Client object, optionally acting as a user"""
+    client = get_client(config)
+
+    if as_user_id:
+        client = client.as_user(client.user(as_user_id))
+
+    return client
+
+
+_CLIENT_FACTORIES: Dict[str, Callable[[AppConfig, Optional[str]], Client]] = {
+    AUTH_OAUTH: _get_oauth_client,
+    AUTH_JWT: get_jwt_client,
+    AUTH_CCG_ENTERPRISE: get_ccg_enterprise_client,
+    AUTH_CCG_USER: get_ccg_user_client,
+}
+
+
+class ClientRegistry:
+    """
+    Thread safe registry of shared, already authenticated clients
+    keyed by (auth mode, as_user_id).
+    Entries expire after a time to live and can be invalidated explicitly.
+    """
+
+    def __init__(self, ttl: float = 3000.0) -> None:
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._build_locks: Dict[Tuple[str, Optional[str]], threading.Lock] = {}
+        self._clients: Dict[Tuple[str, Optional[str]], Tuple[Client, float]] = {}
+
+    def get(
+        self,
+        auth_mode: str,
+        as_user_id: Optional[str],
+        factory: Callable[[], Client],
+        ttl: float = None,
+    ) -> Client:
+        """
+        Returns the shared client for the key,
+        building it with the factory if missing or expired.
+        Only one thread builds a given key, the others wait for it.
+        """
+        key = (auth_mode, as_user_id)
+
+        entry = self._clients.get(key)
+        if entry is not None and entry[1] > time.monotonic():
+            return entry[0]
+
+        with self._lock:
+            build_lock = self._build_locks.setdefault(key, threading.Lock())
+
+        with build_lock:
+            # another thread may have built it while we waited
+            entry = self._clients.get(key)
+            if entry is not None and entry[1] > time.monotonic():
+                return entry[0]
+
+            client = factory()
+            _authenticate(client)
+            expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+            with self._lock:
+                self._clients[key] = (client, expires_at)
+
+        return client
+
+    def invalidate(self, auth_mode: str = None, as_user_id: str = None) -> int:
+        """
+        Drops the matching clients, all of them if no auth mode is given.
+        Returns the number of clients dropped.
+        """
+        with self._lock:
+            keys = [
+                key
+                for key in self._clients
+                if auth_mode is None
+                or (key[0] == auth_mode and (as_user_id is None or key[1] == as_user_id))
+            ]
+            for key in keys:
+                del self._clients[key]
+
+        return len(keys)
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+
+def _authenticate(client: Client):
+    """Fetches an access token up front if the client does not have one yet"""
+    if client.auth.access_token is None:
+        client.auth.refresh(None)
+
+
+_registry = ClientRegistry()
+
+
+def get_shared_client(
+    config: AppConfig, auth_mode: str = AUTH_OAUTH, as_user_id: str = None
+) -> Client:
+    """
+    Returns a process wide shared boxsdk Client object
+    for the auth mode (oauth, jwt, ccg_enterprise or ccg_user)
+    """
+    try:
+        factory = _CLIENT_FACTORIES[auth_mode]
+    except KeyError as err:
+        raise ValueError(f"Unknown auth mode: {auth_mode}") from err
+
+    return _registry.get(
+        auth_mode,
+        as_user_id,
+        lambda: factory(config, as_user_id),
+        ttl=config.client_ttl,
+    )
+
+
+def invalidate_shared_clients(auth_mode: str = None, as_user_id: str = None) -> int:
+    """Drops shared clients, e.g. after their auth has been revoked"""
+    return _registry.invalidate(auth_mode, as_user_id)
@@ -0,0 +1,233 @@
+""" Request instrumentation for the Box clients
+---
+The pooled network layer records every SDK request here: call counts,
+errors, bytes sent and received, retries and a latency histogram per endpoint.
+Endpoints are the method and the API path with the ids replaced, e.g. GET /folders/:id/items.
+Recording is a dict lookup and a few additions under a lock, cheap enough to leave on.
+"""
+import bisect
+import functools
+import json
+import re
+import sys
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, TextIO, Tuple
+from urllib.parse import urlsplit
+
+# latency histogram bucket upper bounds, in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_API_PREFIX = re.compile(r"^/(?:api/)?2\.0")
+# numeric ids, and hex ids like upload session ids, which Box sends in upper case
+_ID_SEGMENT = re.compile(r"/(?:\d+|[0-9a-fA-F]{32,})(?=/|$)")
+
+
+@functools.lru_cache(maxsize=4096)
+def endpoint_name(method: str, url: str) -> str:
+    """Returns the endpoint of a request, e.g. GET /folders/:id/items"""
+    path = _API_PREFIX.sub("", urlsplit(url).path)
+    return f"{method.upper()} {_ID_SEGMENT.sub('/:id', path) or '/'}"
+
+
+class LatencyHistogram:
+    """Cumulative latency histogram with fixed buckets"""
+
+    __slots__ = ("bounds", "counts", "count", "sum", "max")
+
+    def __init__(self, bounds: Tuple[float, ...] = LATENCY_BUCKETS) -> None:
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(self.bounds, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def percentile(self, fraction: float) -> float:
+        """Estimates a percentile, interpolating within its bucket"""
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = self.bounds[index - 1] if index else 0.0
+                upper = self.bounds[index] if index < len(self.bounds) else self.max
+                return min(lower + (upper - lower) * (rank - seen) / count, self.max)
+            seen += count
+        return self.max
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """Returns the (le, count) pairs of a Prometheus histogram"""
+        buckets, total = [], 0
+        for bound, count in zip(self.bounds + (float("inf"),), self.counts):
+            total += count
+            buckets.append(("+Inf" if bound == float("inf") else repr(bound), total))
+        return buckets
+
+
+class EndpointMetrics:
+    """Counters of one endpoint"""
+
+    __slots__ = ("calls", "errors", "retries", "bytes_out", "bytes_in", "latency")
+
+    def __init__(self) -> None:
+        self.calls = 0
+        self.errors = 0
+        self.retries = 0
+        self.bytes_out = 0
+        self.bytes_in = 0
+        self.latency = LatencyHistogram()
+
+    def as_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "retries": self.retries,
+            "bytes_out": self.bytes_out,
+            "bytes_in": self.bytes_in,
+            "latency_total": round(self.latency.sum, 6),
+            "latency_p50": round(self.latency.percentile(0.50), 6),
+            "latency_p99": round(self.latency.percentile(0.99), 6),
+            "latency_max": round(self.latency.max, 6),
+        }
+
+
+class RequestMetrics:
+    """Thread safe per endpoint request metrics"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._endpoints: Dict[str, EndpointMetrics] = {}
+
+    def _endpoint(self, endpoint: str) -> EndpointMetrics:
+        metrics = self._endpoints.get(endpoint)
+        if metrics is None:
+            metrics = self._endpoints.setdefault(endpoint, EndpointMetrics())
+        return metrics
+
+    def record(self, endpoint: str, seconds: float, status: int, bytes_out: int, bytes_in: int):
+        """Records a completed request, status 0 meaning it failed without a response"""
+        with self._lock:
+            metrics = self._endpoint(endpoint)
+            metrics.calls += 1
+            if not status or status >= 400:
+                metrics.errors += 1
+            metrics.bytes_out += bytes_out
+            metrics.bytes_in += bytes_in
+            metrics.latency.observe(seconds)
+
+    def record_retry(self, endpoint: str):
+        """Records a retry of a request"""
+        with self._lock:
+            self._endpoint(endpoint).retries += 1
+
+    def reset(self):
+        with self._lock:
+            self._endpoints = {}
+
+    def snapshot(self) -> Dict[str, dict]:
+        """Returns the metrics of every endpoint, as plain dictionaries"""
+        with self._lock:
+            return {
+                endpoint: metrics.as_dict() for endpoint, metrics in sorted(self._endpoints.items())
+            }
+
+    def dump(self, file: TextIO = None):
+        """Writes the snapshot as json, to stdout by default"""
+        json.dump(self.snapshot(), file or sys.stdout, indent=4)
+
+    def to_prometheus(self, prefix: str = "box_sdk") -> str:
+        """Returns the metrics in the Prometheus text exposition format"""
+        counters = (
+            ("requests_total", "Requests sent", "calls"),
+            ("request_errors_total", "Requests failed or answered with an error status", "errors"),
+            ("request_retries_total", "Requests retried", "retries"),
+            ("request_bytes_total", "Request body bytes sent", "bytes_out"),
+            ("response_bytes_total", "Response body bytes received", "bytes_in"),
+        )
+        with self._lock:
+            endpoints = sorted(self._endpoints.items())
+            lines = []
+            for name, help_text, attribute in counters:
+                lines.append(f"# HELP {prefix}_{name} {help_text}")
+                lines.append(f"# TYPE {prefix}_{name} counter")
+                for endpoint, metrics in endpoints:
+                    lines.append(
+                        f"{prefix}_{name}{{{_labels(endpoint)}}} {getattr(metrics, attribute)}"
+                    )
+
+            name = f"{prefix}_request_duration_seconds"
+            lines.append(f"# HELP {name} Request latency")
+            lines.append(f"# TYPE {name} histogram")
+            for endpoint, metrics in endpoints:
+                labels = _labels(endpoint)
+                for bound, count in metrics.latency.cumulative():
+                    lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+                lines.append(f"{name}_sum{{{labels}}} {metrics.latency.sum}")
+                lines.append(f"{name}_count{{{labels}}} {metrics.latency.count}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(endpoint: str) -> str:
+    method, path = endpoint.split(" ", 1)
+    path = path.replace("\\", "\\\\").replace('"', '\\"')
+    return f'method="{method}",path="{path}"'
+
+
+_lock = threading.Lock()
+_metrics = RequestMetrics()
+_collectors: Tuple[RequestMetrics, ...] = (_metrics,)
+
+
+def get_metrics() -> RequestMetrics:
+    """Returns the process wide metrics, fed by all the clients from utils.box_client"""
+    return _metrics
+
+
+@contextmanager
+def collect_metrics() -> Iterator[RequestMetrics]:
+    """
+    Collects the metrics of the requests sent, from any thread,
+    while the context is active
+    """
+    global _collectors  # pylint: disable=global-statement
+
+    metrics = RequestMetrics()
+    with _lock:
+        _collectors = _collectors + (metrics,)
+    try:
+        yield metrics
+    finally:
+        with _lock:
+            _collectors = tuple(collector for collector in _collectors if collector is not metrics)
+
+
+def record_request(
+    method: str, url: str, seconds: float, status: int, bytes_out: int = 0, bytes_in: int = 0
+):
+    """Records a completed request in the active metrics"""
+    endpoint = endpoint_name(method, url)
+    for collector in _collectors:
+        collector.record(endpoint, seconds, status, bytes_out, bytes_in)
+
+
+def record_retry(method: str, url: str):
+    """Records a retry in the active metrics"""
+    endpoint = endpoint_name(method, url)
+    for collector in _collectors:
+        collector.record_retry(endpoint)
+
+
+def content_length(headers: Optional[dict]) -> int:
+    """Returns the Content-Length of a request or response, 0 if unknown"""
+    try:
+        return int(headers.get("Content-Length") or 0) if headers else 0
+    except ValueError:
+        return 0
@@ -0,0 +1,167 @@
+""" Pooled network layer for the Box clients
+---
+A boxsdk network layer backed by a single, tunable requests connection pool.
+Pool sizes and timeouts come from the AppConfig, and the layer counts how many
+requests reused a pooled connection versus opening a new one.
+Every request and retry is also recorded in utils.box_metrics.
+"""
+import threading
+import time
+from typing import Any, Callable, Dict, Tuple
+
+from requests.adapters import HTTPAdapter
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
+
+from boxsdk.network.default_network import DefaultNetwork
+from boxsdk.network.network_interface import NetworkResponse
+from boxsdk.session.session import AuthorizedSession, Session
+
+from utils.box_metrics import content_length, record_request, record_retry
+from utils.config import AppConfig
+
+
+class NetworkStats:
+    """Thread safe request and connection counters"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.new_connections = 0
+
+    def count_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def count_new_connection(self):
+        with self._lock:
+            self.new_connections += 1
+
+    @property
+    def reused_connections(self) -> int:
+        """Requests served on an already open connection"""
+        return max(self.requests - self.new_connections, 0)
+
+    def snapshot(self) -> Dict[str, int]:
+        """Returns the current counters"""
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "new_connections": self.new_connections,
+                "reused_connections": max(self.requests - self.new_connections, 0),
+            }
+
+    def reset(self):
+        with self._lock:
+            self.requests = 0
+            self.new_connections = 0
+
+
+class PooledHTTPAdapter(HTTPAdapter):
+    """requests adapter counting the connections its pools open"""
+
+    def __init__(self, stats: NetworkStats, **kwargs: Any) -> None:
+        self.stats = stats
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args: Any, **kwargs: Any):
+        super().init_poolmanager(*args, **kwargs)
+        stats = self.stats
+
+        class CountingHTTPConnectionPool(HTTPConnectionPool):
+            def _new_conn(self):
+                stats.count_new_connection()
+                return super()._new_conn()
+
+        class CountingHTTPSConnectionPool(HTTPSConnectionPool):
+            def _new_conn(self):
+                stats.count_new_connection()
+                return super()._new_conn()
+
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": CountingHTTPConnectionPool,
+            "https": CountingHTTPSConnectionPool,
+        }
+
+
+class PooledNetwork(DefaultNetwork):
+    """
+    boxsdk network layer using one tuned connection pool
+    per host for all the clients sharing it
+    """
+
+    def __init__(
+        self,
+        pool_connections: int = 10,
+        pool_maxsize: int = 32,
+        pool_block: bool = False,
+    ) -> None:
+        super().__init__()
+        self.stats = NetworkStats()
+        adapter = PooledHTTPAdapter(
+            self.stats,
+            pool_connections=pool_connections,
+            pool_maxsize=pool_maxsize,
+            pool_block=pool_block,
+        )
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+
+    def request(self, method: str, url: str, access_token: str, **kwargs: Any) -> NetworkResponse:
+        """Base class override, counting and timing the request"""
+        self.stats.count_request()
+        start = time.perf_counter()
+        try:
+            response = super().request(method, url, access_token, **kwargs)
+        except Exception:
+            record_request(method, url, time.perf_counter() - start, 0)
+            raise
+        record_request(
+            method,
+            url,
+            time.perf_counter() - start,
+            response.status_code,
+            content_length(response.request_response.request.headers),
+            content_length(response.headers),
+        )
+        return response
+
+    def retry_after(self, delay: float, request_method: Callable, *args: Any, **kwargs: Any) -> Any:
+        """Base class override, counting the retry"""
+        request = args[0] if args else None
+        if request is not None and hasattr(request, "url"):
+            record_retry(request.method, request.url)
+        return super().retry_after(delay, request_method, *args, **kwargs)
+
+
+_lock = threading.Lock()
+_networks: Dict[Tuple[int, int, bool], PooledNetwork] = {}
+
+
+def get_network(config: AppConfig) -> PooledNetwork:
+    """Returns the process wide network layer for the configured pool settings"""
+    key = (config.http_pool_connections, config.http_pool_maxsize, config.http_pool_block)
+    with _lock:
+        network = _networks.get(key)
+        if network is None:
+            network = PooledNetwork(*key)
+            _networks[key] = network
+    return network
+
+
+def _session_kwargs(config: AppConfig) -> Dict[str, Any]:
+    return {
+        "network_layer": get_network(config),
+        "default_network_request_kwargs": {
+            "timeout": (config.http_connect_timeout, config.http_read_timeout)
+        },
+    }
+
+
+def get_session(config: AppConfig) -> Session:
+    """Returns an unauthorized session on the pooled network, for the auth objects"""
+    return Session(**_session_kwargs(config))
+
+
+def get_authorized_session(config: AppConfig, oauth) -> AuthorizedSession:
+    """Returns an authorized session on the pooled network, for the clients"""
+    return AuthorizedSession(oauth, **_session_kwargs(config))
@@ -1,69 +1,105 @@
 """ Manage oAuth2 for Box"""
-from datetime import datetime, timedelta
-import json
-import os.path
+import os
+import re
+import threading
+from typing import Dict
+
 from boxsdk import OAuth2
-from utils.config import AppConfig
+from boxsdk.auth.cooperatively_managed_oauth2 import CooperativelyManagedOAuth2
+from utils.box_network import get_session
+from utils.config import AppConfig, get_config
+from utils.token_store import TokenStore
+
+# per user token files live in this folder
+TOKEN_STORE_DIR = ".oauth"
+
+_token_store = TokenStore(".oauth.json")
+_user_token_stores: Dict[str, TokenStore] = {}
+_user_token_stores_lock = threading.Lock()
+
+
+def get_token_store() -> TokenStore:
+    """Returns the process wide store backed by .oauth.json"""
+    return _token_store
+
+
+def get_user_token_store(user_key: str) -> TokenStore:
+    """Returns the store of a user, backed by .oauth/<user_key>.json"""
+    file_name = re.sub(r"[^\w.@-]", "_", user_key)
+    with _user_token_stores_lock:
+        token_store = _user_token_stores.get(file_name)
+        if token_store is None:
+            os.makedirs(TOKEN_STORE_DIR, exist_ok=True)
+            token_store = TokenStore(os.path.join(TOKEN_STORE_DIR, f"{file_name}.json"))
+            _user_token_stores[file_name] = token_store
+        return token_store
+
+
+class SharedTokenOAuth2(CooperativelyManagedOAuth2):
+    """
+    Reads the access token from the token store on every request,
+    so a refresh made through any client sharing the store serves all of them
+    """
+
+    @property
+    def access_token(self) -> str:
+        access_token, _ = self._get_tokens()
+        return access_token or super().access_token
 
 
-def oauth_from_config(config: AppConfig) -> OAuth2:
+def oauth_from_config(config: AppConfig, token_store: TokenStore = None) -> OAuth2:
     """
     Returns a boxsdk OAuth2 object
     from the configuration file
     """
+    token_store = token_store or _token_store
     return OAuth2(
         client_id=config.client_id,
         client_secret=config.client_secret,
-        store_tokens=store_tokens,
+        store_tokens=token_store.store,
+        session=get_session(config),
     )
 
 
 def store_tokens(access_token: str, refresh_token: str):
     """Stores the access and refresh tokens in a file"""
-    access_token_expires_on = datetime.today() + timedelta(minutes=60)
-    refresh_token_expires_on = datetime.today() + timedelta(days=60)
-    oauth_json = {
-        "access_token": access_token,
-        "access_token_expires_on": str(access_token_expires_on),
-        "refresh_token": refresh_token,
-        "refresh_token_expires_on": str(refresh_token_expires_on),
-    }
-    with open(".oauth.json", "w", encoding="UTF-8") as file:
-        file.write(json.dumps(oauth_json, indent=4))
-
-
-def oauth_from_previous() -> OAuth2:
+    _token_store.store(access_token, refresh_token)
+
+
+def oauth_from_previous(token_store: TokenStore = None) -> OAuth2:
     """
     Returns an OAuth2 object
-    Instatiated from the .oauth.json file
+    Instatiated from the .oauth.json file, or the given store,
     and the configurations
     """
 
-    oauth = oauth_from_config(AppConfig())
-    if not os.path.isfile(".oauth.json"):
-        return oauth
+    config = get_config()
+    token_store = token_store or _token_store
+    access_token, refresh_token = token_store.load()
+    if not access_token:
+        return oauth_from_config(config, token_store)
 
-    with open(".oauth.json", "r", encoding="UTF-8") as file:
-        oauth_json = file.read()
-
-    oauth_dict = json.loads(oauth_json)
-
-    oauth = OAuth2(
-        client_id=AppConfig().client_id,
-        client_secret=AppConfig().client_secret,
-        store_tokens=store_tokens,
-        access_token=oauth_dict.get("access_token"),
-        refresh_token=oauth_dict.get("refresh_token"),
+    # tokens are looked up in the store before each request and refresh,
+    # so clients sharing it never reuse a spent refresh token or a replaced access token
+    oauth = SharedTokenOAuth2(
+        retrieve_tokens=token_store.load,
+        client_id=config.client_id,
+        client_secret=config.client_secret,
+        store_tokens=token_store.store,
+        access_token=access_token,
+        refresh_token=refresh_token,
+        refresh_lock=token_store.refresh_lock,
+        session=get_session(config),
     )
 
     return oauth
 
 
-def oauth_authenticate(code: str):
+def oauth_authenticate(code: str, token_store: TokenStore = None):
     """
     Retreives the access and refresh tokens
     from using the code obtained from the first leg
     of the oAuth2 process
     """
-    oauth = oauth_from_config(AppConfig())
+    oauth = oauth_from_config(get_config(), token_store)
     oauth.authenticate(code)
@@ -0,0 +1,271 @@
+""" Bulk copy, move, rename and delete
+---
+Runs many item operations on a bounded thread pool.
+Name conflicts are settled by a policy instead of failing the item, a 429 that
+outlasts the SDK's own retries pauses every worker for its Retry-After,
+and a failed item is reported without stopping the rest of the batch.
+Listing caches and path indexes are invalidated through utils.folder_cache.
+"""
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from enum import Enum
+from typing import Callable, Iterable, List, NamedTuple, Optional, Union
+
+from boxsdk import BoxAPIException
+from boxsdk.object.folder import Folder
+from boxsdk.object.item import Item
+
+from utils.folder_cache import copy_item, delete_item, move_item, rename_item
+from utils.folder_paths import name_conflict
+
+# operations run concurrently by default
+BULK_MAX_WORKERS = 8
+
+# attempts of an operation answered with a 429
+BULK_MAX_ATTEMPTS = 4
+
+# pause when a 429 has no usable Retry-After, in seconds
+BULK_RATE_LIMIT_PAUSE = 1.0
+
+# names tried by ConflictPolicy.RENAME before giving up
+MAX_AUTO_RENAMES = 100
+
+
+class BulkOp(str, Enum):
+    """Operations a bulk job runs"""
+
+    COPY = "copy"
+    MOVE = "move"
+    RENAME = "rename"
+    DELETE = "delete"
+
+
+class ConflictPolicy(str, Enum):
+    """
+    What to do when the target name is already in use.
+    REUSE keeps the existing item, OVERWRITE replaces an existing file with a file
+    and RENAME numbers the name, e.g. "name (1)".
+    """
+
+    FAIL = "fail"
+    SKIP = "skip"
+    REUSE = "reuse"
+    OVERWRITE = "overwrite"
+    RENAME = "rename"
+
+
+class JobStatus(str, Enum):
+    """Outcome of a job, SKIPPED and REUSED being settled name conflicts"""
+
+    DONE = "done"
+    SKIPPED = "skipped"
+    REUSED = "reused"
+    FAILED = "failed"
+
+
+class Job(NamedTuple):
+    """
+    An operation on an item.
+    target is the destination folder of a copy or move, the new name of a rename.
+    name optionally renames a copied or moved item.
+    """
+
+    op: BulkOp
+    item: Item
+    target: Union[Folder, str, None] = None
+    name: Optional[str] = None
+
+
+class JobResult(NamedTuple):
+    """Outcome of a job, item being the copied, moved, renamed or reused item"""
+
+    job: Job
+    status: JobStatus
+    item: Optional[Item] = None
+    error: Optional[Exception] = None
+    attempts: int = 1
+    seconds: float = 0.0
+
+
+class BulkReport(NamedTuple):
+    """Results of a batch, in job order"""
+
+    results: List[JobResult]
+    seconds: float
+
+    @property
+    def failed(self) -> List[JobResult]:
+        return [result for result in self.results if result.status == JobStatus.FAILED]
+
+    @property
+    def succeeded(self) -> List[JobResult]:
+        return [result for result in self.results if result.status != JobStatus.FAILED]
+
+    def counts(self) -> dict:
+        """Number of jobs by status"""
+        counts = {status.value: 0 for status in JobStatus}
+        for result in self.results:
+            counts[result.status.value] += 1
+        return counts
+
+
+def numbered_name(name: str, number: int) -> str:
+    """Returns name with a number before its extension, e.g. report (2).pdf"""
+    stem, extension = os.path.splitext(name)
+    if not stem:
+        stem, extension = extension, ""
+    return f"{stem} ({number}){extension}"
+
+
+def overwrite_name(name: str) -> str:
+    """Returns the temporary name of an item overwriting name, until the file in its way is deleted"""
+    stem, extension = os.path.splitext(name)
+    if not stem:
+        stem, extension = extension, ""
+    return f"{stem} (overwriting {uuid.uuid4().hex[:8]}){extension}"
+
+
+class RateLimitGate:
+    """Holds every worker back until a rate limit pause is over"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._until = 0.0
+
+    def wait(self):
+        while True:
+            with self._lock:
+                delay = self._until - time.monotonic()
+            if delay <= 0:
+                return
+            time.sleep(delay)
+
+    def pause(self, seconds: float):
+        with self._lock:
+            self._until = max(self._until, time.monotonic() + seconds)
+
+
+def retry_after(box_err: BoxAPIException) -> float:
+    """Seconds a 429 asks to wait, BULK_RATE_LIMIT_PAUSE if it does not say"""
+    try:
+        return float((box_err.headers or {}).get("Retry-After") or BULK_RATE_LIMIT_PAUSE)
+    except ValueError:
+        return BULK_RATE_LIMIT_PAUSE
+
+
+def _perform(job: Job, name: Optional[str]) -> Item:
+    if job.op == BulkOp.COPY:
+        return copy_item(job.item, job.target, name)
+    if job.op == BulkOp.MOVE:
+        return move_item(job.item, job.target, name)
+    if job.op == BulkOp.RENAME:
+        return rename_item(job.item, name)
+    delete_item(job.item)
+    return None
+
+
+def _can_settle(job: Job, policy: ConflictPolicy, conflict: dict) -> bool:
+    """Overwriting only replaces a file with a file, it never deletes a folder tree"""
+    if policy == ConflictPolicy.OVERWRITE:
+        return conflict.get("type") == job.item.object_type == "file"
+    return policy != ConflictPolicy.FAIL
+
+
+def _settle_conflict(job: Job, policy: ConflictPolicy, conflict: dict, name: str, attempt: int):
+    """
+    Settles a name conflict, returning the status and item of the job if it is over,
+    or the name to try again with
+    """
+    if policy == ConflictPolicy.SKIP:
+        return JobStatus.SKIPPED, None, None
+    if policy == ConflictPolicy.REUSE:
+        return JobStatus.REUSED, job.item.translator.translate(job.item.session, conflict), None
+    if policy == ConflictPolicy.OVERWRITE:
+        # the existing file is only deleted once the item is in place under a temporary name
+        return None, None, overwrite_name(name)
+    # ConflictPolicy.RENAME, numbering the name first in conflict, e.g. "name (1)", "name (2)"
+    return None, None, numbered_name(name, attempt)
+
+
+def _replace(job: Job, item: Item, conflict: dict, name: str) -> Item:
+    """Deletes the file an overwriting item was placed next to, and gives the item its name"""
+    delete_item(job.item.translator.translate(job.item.session, conflict))
+    return rename_item(item, name)
+
+
+def run_job(job: Job, policy: ConflictPolicy = ConflictPolicy.FAIL, gate: RateLimitGate = None) -> JobResult:
+    """Runs one job, settling name conflicts by policy"""
+    gate = RateLimitGate() if gate is None else gate
+    started = time.monotonic()
+    name = job.target if job.op == BulkOp.RENAME else job.name
+    attempts = renames = 0
+    conflicting_name = replaced = None
+    while True:
+        gate.wait()
+        attempts += 1
+        try:
+            item = _perform(job, name)
+        except BoxAPIException as box_err:
+            error = box_err
+            if box_err.status == 429 and attempts < BULK_MAX_ATTEMPTS:
+                gate.pause(retry_after(box_err))
+                continue
+            conflict = name_conflict(box_err) if box_err.code == "item_name_in_use" else None
+            if conflict and _can_settle(job, policy, conflict) and renames < MAX_AUTO_RENAMES:
+                renames += 1
+                if conflicting_name is None:
+                    conflicting_name = name or conflict["name"]
+                status, item, name = _settle_conflict(job, policy, conflict, conflicting_name, renames)
+                if status is not None:
+                    return JobResult(job, status, item, None, attempts, time.monotonic() - started)
+                if policy == ConflictPolicy.OVERWRITE and replaced is None:
+                    replaced = conflict
+                continue
+        except Exception as err:  # pylint: disable=broad-except
+            error = err
+        else:
+            if replaced is None:
+                return JobResult(job, JobStatus.DONE, item, None, attempts, time.monotonic() - started)
+            try:
+                item = _replace(job, item, replaced, conflicting_name)
+                return JobResult(job, JobStatus.DONE, item, None, attempts, time.monotonic() - started)
+            except Exception as err:  # pylint: disable=broad-except
+                # the item stays under its temporary name, reported with the failure
+                logging.warning("Overwrite of %s failed: %s", conflicting_name, err)
+                return JobResult(job, JobStatus.FAILED, item, err, attempts, time.monotonic() - started)
+        logging.warning("%s of %s failed: %s", job.op.value, job.item.object_id, error)
+        return JobResult(job, JobStatus.FAILED, None, error, attempts, time.monotonic() - started)
+
+
+def run_bulk(
+    jobs: Iterable[Job],
+    policy: ConflictPolicy = ConflictPolicy.FAIL,
+    max_workers: int = BULK_MAX_WORKERS,
+    progress: Callable[[int, int, JobResult], None] = None,
+) -> BulkReport:
+    """
+    Runs the jobs concurrently and returns their results, in job order.
+    progress is called with (completed, total, result) after every job.
+    """
+    jobs = list(jobs)
+    gate = RateLimitGate()
+    lock = threading.Lock()
+    completed = 0
+    started = time.monotonic()
+
+    def run(job: Job) -> JobResult:
+        nonlocal completed
+        result = run_job(job, policy, gate)
+        if progress is not None:
+            with lock:
+                completed += 1
+                progress(completed, len(jobs), result)
+        return result
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="bulk-ops") as executor:
+        results = list(executor.map(run, jobs))
+    return BulkReport(results, time.monotonic() - started)
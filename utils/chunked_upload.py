@@ -0,0 +1,361 @@
+""" Chunked uploads
+---
+Files from CHUNKED_UPLOAD_THRESHOLD up go through an upload session instead of a
+single request, so a multi-GB upload is not one long request that times out.
+The file is read once, in order, computing the sha1 the commit needs while its
+parts go up concurrently. A part failing is retried on its own.
+Acknowledged parts are recorded in the upload journal, so an upload cut short
+resumes where it stopped: the file is hashed again, which needs no network,
+and only the missing parts are sent. resume_all() finishes every upload left
+in the journal. A session that cannot complete is aborted so its parts do not linger.
+"""
+import functools
+import hashlib
+import logging
+import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from boxsdk import BoxAPIException, Client
+from boxsdk.object.file import File
+from boxsdk.object.folder import Folder
+from boxsdk.object.upload_session import UploadSession
+from requests.exceptions import RequestException
+
+from utils.path_resolver import get_path_resolver
+from utils.upload_journal import UploadJournal, get_upload_journal, journal_key
+
+# files this size and larger are uploaded in parts, Box accepts upload sessions from 20MB
+CHUNKED_UPLOAD_THRESHOLD = 50 * 1024 * 1024
+
+# parts uploaded concurrently by default
+UPLOAD_MAX_WORKERS = 4
+
+# attempts of a part before the upload fails
+PART_MAX_ATTEMPTS = 3
+
+# first pause before retrying a part, doubling at every attempt, in seconds
+PART_RETRY_DELAY = 1.0
+
+# attempts of a commit answered with a 202 while Box processes the parts
+COMMIT_MAX_ATTEMPTS = 5
+
+ProgressCallback = Callable[[int, int], None]
+
+
+class UploadStats(NamedTuple):
+    """Outcome of a chunked upload, resumed being the number of parts sent before a restart"""
+
+    file: File
+    size: int
+    parts: int
+    retries: int
+    seconds: float
+    resumed: int = 0
+
+    @property
+    def throughput(self) -> float:
+        """Bytes per second"""
+        return self.size / self.seconds if self.seconds else 0.0
+
+
+def retryable_error(err: Exception) -> bool:
+    """Errors worth sending a part again for, the SDK having already retried 429s and 5xx"""
+    if isinstance(err, BoxAPIException):
+        return err.status == 429 or err.status >= 500 or err.code == "bad_digest"
+    return isinstance(err, RequestException)
+
+
+def upload_part(upload_session: UploadSession, part: bytes, offset: int, total_size: int) -> Tuple[dict, int]:
+    """Uploads one part, retrying it, and returns the part record and the number of retries"""
+    part_sha1 = hashlib.sha1(part).digest()
+    attempt = 1
+    while True:
+        try:
+            return upload_session.upload_part_bytes(part, offset, total_size, part_sha1), attempt - 1
+        except (BoxAPIException, RequestException) as err:
+            if attempt >= PART_MAX_ATTEMPTS or not retryable_error(err):
+                raise
+            logging.warning("Part at %s of session %s failed, retrying: %s", offset, upload_session.object_id, err)
+            time.sleep(PART_RETRY_DELAY * 2 ** (attempt - 1))
+            attempt += 1
+
+
+def upload_parts(
+    upload_session: UploadSession,
+    path: str,
+    max_workers: int = UPLOAD_MAX_WORKERS,
+    progress: ProgressCallback = None,
+    uploaded_parts: Dict[int, dict] = None,
+    on_part: Callable[[dict], None] = None,
+) -> Tuple[List[dict], bytes, int]:
+    """
+    Reads the file in order and uploads its parts concurrently, skipping the
+    uploaded_parts, by offset, which are only hashed.
+    on_part is called with every part record as Box acknowledges it.
+    Returns the part records, the sha1 of the whole file and the number of retries.
+    At most two parts per worker are held in memory.
+    """
+    total_size = os.path.getsize(path)
+    uploaded_parts = uploaded_parts or {}
+    digest = hashlib.sha1()
+    in_flight = threading.BoundedSemaphore(2 * max_workers)
+    lock = threading.Lock()
+    uploaded = 0
+    failed = threading.Event()
+    results: List[Future] = []
+
+    def sent(size: int):
+        nonlocal uploaded
+        if progress is not None:
+            with lock:
+                uploaded += size
+                progress(uploaded, total_size)
+
+    def send(part: bytes, offset: int) -> Tuple[dict, int]:
+        try:
+            record = upload_part(upload_session, part, offset, total_size)
+            if on_part is not None:
+                on_part(record[0])
+            sent(len(part))
+            return record
+        except BaseException:
+            failed.set()
+            raise
+        finally:
+            in_flight.release()
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="upload-parts") as executor:
+        with open(path, "rb") as file:
+            offset = 0
+            while offset < total_size and not failed.is_set():
+                part = file.read(upload_session.part_size)
+                if not part:
+                    raise ValueError(f"{path} shrank while being uploaded")
+                digest.update(part)
+                if offset in uploaded_parts:
+                    done = Future()
+                    done.set_result((uploaded_parts[offset], 0))
+                    results.append(done)
+                    sent(len(part))
+                else:
+                    in_flight.acquire()  # pylint: disable=consider-using-with
+                    results.append(executor.submit(send, part, offset))
+                offset += len(part)
+
+    records = [result.result() for result in results]
+    return [record for record, _ in records], digest.digest(), sum(retries for _, retries in records)
+
+
+def commit_upload(
+    upload_session: UploadSession, content_sha1: bytes, parts: List[dict], attributes: dict = None
+) -> File:
+    """Commits the parts, waiting while Box answers that it is still processing them"""
+    for attempt in range(COMMIT_MAX_ATTEMPTS):
+        file = upload_session.commit(content_sha1, parts=parts, file_attributes=attributes)
+        if file is not None:
+            return file
+        time.sleep(PART_RETRY_DELAY * 2**attempt)
+    raise RuntimeError(f"Upload session {upload_session.object_id} was not committed")
+
+
+def _abort(upload_session: UploadSession):
+    try:
+        upload_session.abort()
+    except (BoxAPIException, RequestException) as abort_err:
+        logging.warning("Could not abort upload session %s: %s", upload_session.object_id, abort_err)
+
+
+def _resumable(err: BaseException) -> bool:
+    """Interruptions worth resuming from, rather than giving the session up"""
+    return not isinstance(err, Exception) or retryable_error(err)
+
+
+def _open_session(
+    create: Callable[[], UploadSession],
+    session_factory: Callable[[str], UploadSession],
+    path: str,
+    key: str,
+    journal: UploadJournal,
+    **target,
+) -> Tuple[UploadSession, Dict[int, dict]]:
+    """Returns the journaled session of an upload and its uploaded parts, or a new session"""
+    entry = journal.load(key)
+    if entry is not None:
+        stat = os.stat(path)
+        if (entry.size, entry.mtime_ns) == (stat.st_size, stat.st_mtime_ns):
+            try:
+                upload_session = session_factory(entry.session_id).get()
+                logging.info("Resuming upload of %s, %s parts already sent", path, len(entry.parts))
+                return upload_session, entry.parts
+            except BoxAPIException as box_err:
+                if box_err.status != 404:
+                    raise
+                logging.info("Upload session of %s expired, starting over", path)
+        else:
+            logging.info("%s changed since its upload started, starting over", path)
+            _abort(session_factory(entry.session_id))
+        journal.discard(key)
+
+    upload_session = create()
+    journal.start(key, upload_session.object_id, path, upload_session.part_size, **target)
+    return upload_session, {}
+
+
+def _run_session(
+    create: Callable[[], UploadSession],
+    session_factory: Callable[[str], UploadSession],
+    path: str,
+    max_workers: int,
+    progress: Optional[ProgressCallback],
+    journal: Optional[UploadJournal],
+    **target,
+) -> UploadStats:
+    started = time.monotonic()
+    key = journal_key(path, **target)
+    if journal is None:
+        upload_session, uploaded_parts = create(), {}
+    else:
+        upload_session, uploaded_parts = _open_session(create, session_factory, path, key, journal, **target)
+
+    try:
+        parts, content_sha1, retries = upload_parts(
+            upload_session,
+            path,
+            max_workers,
+            progress,
+            uploaded_parts,
+            on_part=None if journal is None else functools.partial(journal.record_part, key),
+        )
+        file = commit_upload(upload_session, content_sha1, parts)
+    except BaseException as err:
+        if journal is not None and _resumable(err):
+            logging.warning("Upload of %s interrupted, it resumes on the next attempt: %s", path, err)
+        else:
+            _abort(upload_session)
+            if journal is not None:
+                journal.discard(key)
+        raise
+    if journal is not None:
+        journal.discard(key)
+
+    stats = UploadStats(
+        file, os.path.getsize(path), len(parts), retries, time.monotonic() - started, len(uploaded_parts)
+    )
+    logging.info(
+        "Uploaded %s, %s bytes in %s parts at %.1f MB/s",
+        file.name,
+        stats.size,
+        stats.parts,
+        stats.throughput / (1024 * 1024),
+    )
+    return stats
+
+
+def _session_factory(item) -> Callable[[str], UploadSession]:
+    return lambda session_id: item.translator.get("upload_session")(session=item.session, object_id=session_id)
+
+
+def chunked_upload(
+    folder: Folder,
+    path: str,
+    file_name: str = None,
+    max_workers: int = UPLOAD_MAX_WORKERS,
+    progress: ProgressCallback = None,
+    journal: UploadJournal = None,
+    resumable: bool = True,
+) -> UploadStats:
+    """
+    Uploads a new file to a folder through an upload session,
+    resuming the journaled upload of the same file to the same folder if there is one
+    """
+    file_name = file_name or os.path.basename(path)
+    journal = (get_upload_journal() if journal is None else journal) if resumable else None
+    return _run_session(
+        lambda: folder.create_upload_session(os.path.getsize(path), file_name),
+        _session_factory(folder),
+        path,
+        max_workers,
+        progress,
+        journal,
+        folder_id=folder.object_id,
+        file_name=file_name,
+    )
+
+
+def chunked_update(
+    file: File,
+    path: str,
+    file_name: str = None,
+    max_workers: int = UPLOAD_MAX_WORKERS,
+    progress: ProgressCallback = None,
+    journal: UploadJournal = None,
+    resumable: bool = True,
+) -> UploadStats:
+    """
+    Uploads a new version of a file through an upload session,
+    resuming the journaled upload of the same version if there is one
+    """
+    journal = (get_upload_journal() if journal is None else journal) if resumable else None
+    return _run_session(
+        lambda: file.create_upload_session(os.path.getsize(path), file_name),
+        _session_factory(file),
+        path,
+        max_workers,
+        progress,
+        journal,
+        file_id=file.object_id,
+        file_name=file_name,
+    )
+
+
+def resume_all(
+    box_client: Client, journal: UploadJournal = None, max_workers: int = UPLOAD_MAX_WORKERS
+) -> List[UploadStats]:
+    """
+    Finishes every upload left in the journal, e.g. after a crash.
+    An upload that fails again stays in the journal, one whose local file is gone is dropped.
+    """
+    journal = get_upload_journal() if journal is None else journal
+    completed = []
+    for entry in journal.entries():
+        if not os.path.exists(entry.path):
+            logging.warning("%s is gone, dropping its upload", entry.path)
+            _abort(box_client.upload_session(entry.session_id))
+            journal.discard(entry.key)
+            continue
+        try:
+            if entry.file_id is not None:
+                stats = chunked_update(
+                    box_client.file(entry.file_id), entry.path, entry.file_name, max_workers, journal=journal
+                )
+            else:
+                stats = chunked_upload(
+                    box_client.folder(entry.folder_id), entry.path, entry.file_name, max_workers, journal=journal
+                )
+            completed.append(stats)
+        except Exception as err:  # pylint: disable=broad-except
+            logging.error("Could not resume the upload of %s: %s", entry.path, err)
+    return completed
+
+
+def upload_to_folder(
+    folder: Folder, path: str, file_name: str = None, threshold: int = CHUNKED_UPLOAD_THRESHOLD
+) -> File:
+    """Uploads a new file, in parts from threshold bytes up"""
+    if os.path.getsize(path) >= threshold:
+        file = chunked_upload(folder, path, file_name).file
+    else:
+        file = folder.upload(path, file_name)
+    # keeps the name index of a folder known to be empty, e.g. just created, right
+    get_path_resolver().add(folder, file)
+    return file
+
+
+def update_contents(file: File, path: str, threshold: int = CHUNKED_UPLOAD_THRESHOLD) -> File:
+    """Uploads a new version of a file, in parts from threshold bytes up"""
+    if os.path.getsize(path) >= threshold:
+        return chunked_update(file, path).file
+    return file.update_contents(path)
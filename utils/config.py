@@ -1,28 +1,158 @@
 """ Application configurations """
 import os
-from dotenv import load_dotenv
+import threading
+import time
+from typing import Mapping, Optional
+
+from dotenv import dotenv_values, find_dotenv
+
+# how often, in seconds, the .env file is checked for changes
+CONFIG_CHECK_INTERVAL = 1.0
 
 
 class AppConfig:
-    """application configurations"""
+    """
+    application configurations
+    ---
+    An immutable snapshot of the environment and the .env file.
+    AppConfig() returns the memoized snapshot, which is only rebuilt
+    when the .env file changes, use reload_config() to force it.
+    """
+
+    __slots__ = (
+        "client_id",
+        "client_secret",
+        "redirect_uri",
+        "callback_hostname",
+        "callback_port",
+        "enterprise_id",
+        "ccg_user_id",
+        "jwt_config_path",
+        "client_ttl",
+        "http_pool_connections",
+        "http_pool_maxsize",
+        "http_pool_block",
+        "http_connect_timeout",
+        "http_read_timeout",
+        "async_max_concurrency",
+    )
+
+    # Common configurations
+    client_id: Optional[str]
+    client_secret: Optional[str]
+
+    # OAuth2 configurations
+    redirect_uri: Optional[str]
+    callback_hostname: Optional[str]
+    callback_port: int
+
+    # CCG configurations
+    enterprise_id: Optional[str]
+    ccg_user_id: Optional[str]
 
-    def __init__(self) -> None:
-        load_dotenv()
-        # Common configurations
-        self.client_id = os.getenv("CLIENT_ID")
-        self.client_secret = os.getenv("CLIENT_SECRET")
+    # JWT configurations
+    jwt_config_path: Optional[str]
 
-        # OAuth2 configurations
-        self.redirect_uri = os.getenv("REDIRECT_URI")
-        self.callback_hostname = os.getenv("CALLBACK_HOSTNAME")
-        self.callback_port = int(os.getenv("CALLBACK_PORT", 5000))
+    # Shared client registry configurations
+    client_ttl: float
 
-        # CCG configurations
-        self.enterprise_id = os.getenv("ENTERPRISE_ID")
-        self.ccg_user_id = os.getenv("CCG_USER_ID")
+    # Network configurations
+    http_pool_connections: int
+    http_pool_maxsize: int
+    http_pool_block: bool
+    http_connect_timeout: float
+    http_read_timeout: float
 
-        # JWT configurations
-        self.jwt_config_path = os.getenv("JWT_CONFIG_PATH")
+    # Asyncio facade configurations
+    async_max_concurrency: int
+
+    def __new__(cls) -> "AppConfig":
+        return get_config()
+
+    @classmethod
+    def from_values(cls, values: Mapping[str, Optional[str]]) -> "AppConfig":
+        """Builds a configuration from a mapping of environment variables"""
+        config = object.__new__(cls)
+        fields = {
+            "client_id": values.get("CLIENT_ID"),
+            "client_secret": values.get("CLIENT_SECRET"),
+            "redirect_uri": values.get("REDIRECT_URI"),
+            "callback_hostname": values.get("CALLBACK_HOSTNAME"),
+            "callback_port": int(values.get("CALLBACK_PORT") or 5000),
+            "enterprise_id": values.get("ENTERPRISE_ID"),
+            "ccg_user_id": values.get("CCG_USER_ID"),
+            "jwt_config_path": values.get("JWT_CONFIG_PATH"),
+            "client_ttl": float(values.get("CLIENT_TTL") or 3000),
+            "http_pool_connections": int(values.get("HTTP_POOL_CONNECTIONS") or 10),
+            "http_pool_maxsize": int(values.get("HTTP_POOL_MAXSIZE") or 32),
+            "http_pool_block": (values.get("HTTP_POOL_BLOCK") or "").lower()
+            in ("1", "true", "yes"),
+            "http_connect_timeout": float(values.get("HTTP_CONNECT_TIMEOUT") or 10),
+            "http_read_timeout": float(values.get("HTTP_READ_TIMEOUT") or 60),
+            "async_max_concurrency": int(values.get("ASYNC_MAX_CONCURRENCY") or 32),
+        }
+        for name, value in fields.items():
+            object.__setattr__(config, name, value)
+        return config
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"AppConfig is immutable, cannot set {name}")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"AppConfig is immutable, cannot delete {name}")
 
     def __repr__(self) -> str:
-        return f"AppConfig({self.__dict__})"
+        fields = {name: getattr(self, name) for name in self.__slots__}
+        return f"AppConfig({fields})"
+
+
+_lock = threading.Lock()
+_config: Optional[AppConfig] = None
+_dotenv_path = ""
+_dotenv_mtime: Optional[int] = None
+_checked_at = 0.0
+
+
+def _dotenv_mtime_ns(path: str) -> Optional[int]:
+    try:
+        return os.stat(path).st_mtime_ns if path else None
+    except FileNotFoundError:
+        return None
+
+
+def _load() -> AppConfig:
+    """Reads the .env file, the environment variables take precedence"""
+    values = dotenv_values(_dotenv_path) if _dotenv_path else {}
+    values.update(os.environ)
+    return AppConfig.from_values(values)
+
+
+def get_config() -> AppConfig:
+    """
+    Returns the current configuration snapshot,
+    re-reading the .env file only if it changed
+    """
+    global _config, _dotenv_path, _dotenv_mtime, _checked_at  # pylint: disable=global-statement
+
+    config = _config
+    if config is not None and time.monotonic() - _checked_at < CONFIG_CHECK_INTERVAL:
+        return config
+
+    with _lock:
+        if not _dotenv_path:
+            _dotenv_path = find_dotenv()
+        mtime = _dotenv_mtime_ns(_dotenv_path)
+        if _config is None or mtime != _dotenv_mtime:
+            _config = _load()
+            _dotenv_mtime = mtime
+        _checked_at = time.monotonic()
+        return _config
+
+
+def reload_config() -> AppConfig:
+    """Rebuilds the configuration snapshot, e.g. after changing os.environ"""
+    global _config  # pylint: disable=global-statement
+
+    with _lock:
+        _config = None
+    return get_config()
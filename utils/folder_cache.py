@@ -0,0 +1,366 @@
+""" Folder listing cache
+---
+Caches folder listings by folder id, validated against the folder's etag,
+sequence_id and content_modified_at. A cached listing costs one small folder
+GET instead of all the listing pages, or nothing if it was validated less than
+max_age seconds ago. Box does not guarantee a folder's etag moves when its
+children change, so listings older than ttl seconds are listed again whatever
+their validator says.
+Listings live in memory (LRUFolderCache) or in a SQLite file (SQLiteFolderCache).
+The mutation helpers invalidate exactly the listings they change,
+and the matching name indexes of the path resolver.
+"""
+import abc
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from boxsdk.object.folder import Folder
+from boxsdk.object.item import Item
+
+from utils.folder_listing import DEFAULT_ITEM_FIELDS, DEFAULT_PAGE_SIZE, get_items
+from utils.path_resolver import get_path_resolver
+
+# folder fields compared to tell if a cached listing is still current
+VALIDATOR_FIELDS = ("etag", "sequence_id", "content_modified_at")
+
+# listings kept by the default in memory cache
+FOLDER_CACHE_SIZE = 1024
+
+# seconds a listing is served on its validator alone before it is listed again
+FOLDER_CACHE_TTL = 300.0
+
+
+class CachedListing(NamedTuple):
+    """A folder listing, as raw API objects, and the folder version it was taken at"""
+
+    validator: Tuple[Optional[str], ...]
+    fields: Tuple[str, ...]
+    entries: List[dict]
+    validated_at: float
+    listed_at: float
+
+
+class FolderCache(abc.ABC):
+    """Base class of the listing caches"""
+
+    @abc.abstractmethod
+    def get(self, folder_id: str) -> Optional[CachedListing]:
+        """Returns a folder's cached listing, None if there is none"""
+
+    @abc.abstractmethod
+    def put(self, folder_id: str, listing: CachedListing):
+        """Caches a folder's listing"""
+
+    @abc.abstractmethod
+    def touch(self, folder_id: str, validated_at: float):
+        """Records a successful validation"""
+
+    @abc.abstractmethod
+    def parent_of(self, item_id: str) -> Optional[str]:
+        """Returns the folder of an item seen in a cached listing"""
+
+    @abc.abstractmethod
+    def invalidate(self, folder_id: str) -> bool:
+        """Drops a folder's listing, returns True if it was cached"""
+
+    @abc.abstractmethod
+    def clear(self):
+        """Drops every listing"""
+
+    def invalidate_tree(self, folder_id: str) -> int:
+        """Drops a folder's listing and the cached listings of its subfolders"""
+        dropped = 0
+        stack = [folder_id]
+        while stack:
+            current = stack.pop()
+            listing = self.get(current)
+            if listing is not None:
+                stack.extend(entry["id"] for entry in listing.entries if entry.get("type") == "folder")
+            dropped += self.invalidate(current)
+        return dropped
+
+
+class LRUFolderCache(FolderCache):
+    """In memory cache keeping the most recently used listings"""
+
+    def __init__(self, max_entries: int = FOLDER_CACHE_SIZE) -> None:
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._listings: "OrderedDict[str, CachedListing]" = OrderedDict()
+        self._parents: Dict[str, str] = {}
+
+    def __len__(self) -> int:
+        return len(self._listings)
+
+    def get(self, folder_id: str) -> Optional[CachedListing]:
+        with self._lock:
+            listing = self._listings.get(folder_id)
+            if listing is not None:
+                self._listings.move_to_end(folder_id)
+            return listing
+
+    def put(self, folder_id: str, listing: CachedListing):
+        with self._lock:
+            self._drop(folder_id)
+            self._listings[folder_id] = listing
+            for entry in listing.entries:
+                self._parents[entry["id"]] = folder_id
+            while len(self._listings) > self.max_entries:
+                self._drop(next(iter(self._listings)))
+
+    def touch(self, folder_id: str, validated_at: float):
+        with self._lock:
+            listing = self._listings.get(folder_id)
+            if listing is not None:
+                self._listings[folder_id] = listing._replace(validated_at=validated_at)
+
+    def parent_of(self, item_id: str) -> Optional[str]:
+        with self._lock:
+            return self._parents.get(item_id)
+
+    def invalidate(self, folder_id: str) -> bool:
+        with self._lock:
+            return self._drop(folder_id)
+
+    def clear(self):
+        with self._lock:
+            self._listings.clear()
+            self._parents.clear()
+
+    def _drop(self, folder_id: str) -> bool:
+        listing = self._listings.pop(folder_id, None)
+        if listing is None:
+            return False
+        for entry in listing.entries:
+            if self._parents.get(entry["id"]) == folder_id:
+                del self._parents[entry["id"]]
+        return True
+
+
+class SQLiteFolderCache(FolderCache):
+    """On disk cache, shared by runs and processes"""
+
+    def __init__(self, path: str = ".folder_cache.db") -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        with self._lock:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS listings ("
+                "folder_id TEXT PRIMARY KEY, validator TEXT, fields TEXT, entries TEXT, validated_at REAL, "
+                "listed_at REAL)"
+            )
+            columns = [row[1] for row in self._connection.execute("PRAGMA table_info(listings)")]
+            if "listed_at" not in columns:
+                # listings cached before listed_at was recorded are listed again
+                self._connection.execute("DELETE FROM listings")
+                self._connection.execute("ALTER TABLE listings ADD COLUMN listed_at REAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS parents (item_id TEXT PRIMARY KEY, folder_id TEXT)"
+            )
+            self._connection.execute("CREATE INDEX IF NOT EXISTS parents_folder ON parents (folder_id)")
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    def get(self, folder_id: str) -> Optional[CachedListing]:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT validator, fields, entries, validated_at, listed_at FROM listings WHERE folder_id = ?",
+                (folder_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        validator, fields, entries, validated_at, listed_at = row
+        return CachedListing(
+            tuple(json.loads(validator)), tuple(json.loads(fields)), json.loads(entries), validated_at, listed_at
+        )
+
+    def put(self, folder_id: str, listing: CachedListing):
+        with self._lock, self._connection:
+            self._connection.execute("BEGIN")
+            self._drop(folder_id)
+            self._connection.execute(
+                "INSERT INTO listings VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    folder_id,
+                    json.dumps(listing.validator),
+                    json.dumps(listing.fields),
+                    json.dumps(listing.entries),
+                    listing.validated_at,
+                    listing.listed_at,
+                ),
+            )
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO parents VALUES (?, ?)",
+                [(entry["id"], folder_id) for entry in listing.entries],
+            )
+
+    def touch(self, folder_id: str, validated_at: float):
+        with self._lock:
+            self._connection.execute(
+                "UPDATE listings SET validated_at = ? WHERE folder_id = ?", (validated_at, folder_id)
+            )
+
+    def parent_of(self, item_id: str) -> Optional[str]:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT folder_id FROM parents WHERE item_id = ?", (item_id,)
+            ).fetchone()
+        return row[0] if row else None
+
+    def invalidate(self, folder_id: str) -> bool:
+        with self._lock, self._connection:
+            self._connection.execute("BEGIN")
+            return self._drop(folder_id)
+
+    def clear(self):
+        with self._lock, self._connection:
+            self._connection.execute("BEGIN")
+            self._connection.execute("DELETE FROM listings")
+            self._connection.execute("DELETE FROM parents")
+
+    def _drop(self, folder_id: str) -> bool:
+        dropped = self._connection.execute("DELETE FROM listings WHERE folder_id = ?", (folder_id,)).rowcount
+        self._connection.execute("DELETE FROM parents WHERE folder_id = ?", (folder_id,))
+        return dropped > 0
+
+
+_lock = threading.Lock()
+_cache: FolderCache = LRUFolderCache()
+
+
+def get_folder_cache() -> FolderCache:
+    """Returns the process wide listing cache, in memory unless replaced"""
+    return _cache
+
+
+def set_folder_cache(cache: FolderCache) -> FolderCache:
+    """Replaces the process wide listing cache, e.g. with a SQLiteFolderCache"""
+    global _cache  # pylint: disable=global-statement
+
+    with _lock:
+        previous, _cache = _cache, cache
+    return previous
+
+
+def _validator(folder: Folder) -> Tuple[Optional[str], ...]:
+    info = folder.get(fields=list(VALIDATOR_FIELDS))
+    return tuple(info.response_object.get(field) for field in VALIDATOR_FIELDS)
+
+
+def cached_get_items(
+    folder: Folder,
+    fields: Optional[Iterable[str]] = DEFAULT_ITEM_FIELDS,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    max_age: float = 0.0,
+    cache: FolderCache = None,
+    ttl: float = FOLDER_CACHE_TTL,
+) -> List[Item]:
+    """
+    Lists a folder's items from the cache, if the folder did not change.
+    Listings validated less than max_age seconds ago are not validated again,
+    listings taken ttl seconds ago or more are listed again.
+    fields=None caches the full default item fields.
+    """
+    cache = get_folder_cache() if cache is None else cache
+    fields = tuple(fields) if fields is not None else ()
+    folder_id = folder.object_id
+
+    listing = cache.get(folder_id)
+    now = time.time()
+    # a listing serves requests for the same fields, or for a subset of its projection
+    usable = (
+        listing is not None
+        and now - listing.listed_at < ttl
+        and (listing.fields == fields or bool(fields and listing.fields) and set(fields) <= set(listing.fields))
+    )
+    if usable and now - listing.validated_at < max_age:
+        return _translate(folder, listing.entries)
+
+    validator = _validator(folder)
+    if usable and listing.validator == validator:
+        cache.touch(folder_id, now)
+        return _translate(folder, listing.entries)
+
+    # the validator is read before listing, so changes made meanwhile fail the next validation
+    items = list(get_items(folder, fields or None, page_size))
+    cache.put(folder_id, CachedListing(validator, fields, [item.response_object for item in items], now, now))
+    return items
+
+
+def _translate(folder: Folder, entries: List[dict]) -> List[Item]:
+    return [folder.translator.translate(folder.session, dict(entry)) for entry in entries]
+
+
+def invalidate_folder(folder_id: str, cache: FolderCache = None):
+    """Drops a changed folder's cached listing and name index"""
+    cache = get_folder_cache() if cache is None else cache
+    cache.invalidate(folder_id)
+    get_path_resolver().invalidate(folder_id)
+
+
+def _invalidate_parent(item: Item, cache: FolderCache):
+    parent = getattr(item, "parent", None)
+    parent_id = parent.object_id if parent is not None else cache.parent_of(item.object_id)
+    if parent_id is not None:
+        invalidate_folder(parent_id, cache)
+
+
+# mutations, invalidating the listings they change
+
+
+def create_subfolder(parent_folder: Folder, name: str, cache: FolderCache = None) -> Folder:
+    """Creates a folder, invalidating its parent's listing"""
+    cache = get_folder_cache() if cache is None else cache
+    try:
+        return parent_folder.create_subfolder(name)
+    finally:
+        invalidate_folder(parent_folder.object_id, cache)
+
+
+def rename_item(item: Item, name: str, cache: FolderCache = None) -> Item:
+    """Renames an item, invalidating its parent's listing"""
+    cache = get_folder_cache() if cache is None else cache
+    _invalidate_parent(item, cache)
+    renamed = item.rename(name)
+    _invalidate_parent(renamed, cache)
+    return renamed
+
+
+def copy_item(item: Item, parent_folder: Folder, name: str = None, cache: FolderCache = None) -> Item:
+    """Copies an item, invalidating the destination folder's listing"""
+    cache = get_folder_cache() if cache is None else cache
+    try:
+        return item.copy(parent_folder=parent_folder, name=name)
+    finally:
+        invalidate_folder(parent_folder.object_id, cache)
+
+
+def move_item(item: Item, parent_folder: Folder, name: str = None, cache: FolderCache = None) -> Item:
+    """Moves an item, invalidating the source and destination folders' listings"""
+    cache = get_folder_cache() if cache is None else cache
+    _invalidate_parent(item, cache)
+    try:
+        return item.move(parent_folder=parent_folder, name=name)
+    finally:
+        invalidate_folder(parent_folder.object_id, cache)
+
+
+def delete_item(item: Item, recursive: bool = True, cache: FolderCache = None) -> bool:
+    """Deletes an item, invalidating its parent's listing and, for folders, the whole subtree"""
+    cache = get_folder_cache() if cache is None else cache
+    if item.object_type == "folder":
+        deleted = item.delete(recursive=recursive)
+        cache.invalidate_tree(item.object_id)
+        get_path_resolver().invalidate(item.object_id)
+    else:
+        deleted = item.delete()
+    _invalidate_parent(item, cache)
+    return deleted
@@ -0,0 +1,116 @@
+""" Bulk folder creation
+---
+ensure_paths creates a whole set of folder paths, like os.makedirs for many paths at once.
+Existing folders are found through the cached path resolver, so re-runs are
+mostly served from its name indexes. A name conflict reuses the folder from the
+error payload instead of fetching it again. Folders just created are known to
+be empty and are never listed. Independent branches are created concurrently.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, Optional
+
+from boxsdk import BoxAPIException, Client
+from boxsdk.object.folder import Folder
+
+from utils.folder_cache import get_folder_cache
+from utils.path_resolver import PathResolver, get_path_resolver
+
+# folders created concurrently by default
+ENSURE_MAX_WORKERS = 8
+
+
+def name_conflict(box_err: BoxAPIException) -> Optional[dict]:
+    """Returns the conflicting item of an item_name_in_use error"""
+    conflicts = (box_err.context_info or {}).get("conflicts")
+    if isinstance(conflicts, list):
+        return conflicts[0] if conflicts else None
+    return conflicts
+
+
+def ensure_folder(parent_folder: Folder, folder_name: str, resolver: PathResolver = None) -> Folder:
+    """Returns the folder named folder_name in parent_folder, creating it if needed"""
+    resolver = get_path_resolver() if resolver is None else resolver
+    existing = resolver.lookup(parent_folder, folder_name)
+    if existing is not None:
+        if existing.type != "folder":
+            raise ValueError(f"'{folder_name}' exists in folder {parent_folder.object_id} and is a {existing.type}")
+        return existing
+
+    try:
+        folder = parent_folder.create_subfolder(folder_name)
+        created = True
+    except BoxAPIException as box_err:
+        conflict = name_conflict(box_err) if box_err.code == "item_name_in_use" else None
+        if conflict is None or conflict.get("type") != "folder":
+            raise box_err
+        # someone else created it, the error already has the folder's mini representation
+        folder = parent_folder.translator.translate(parent_folder.session, conflict)
+        created = False
+    get_folder_cache().invalidate(parent_folder.object_id)
+    resolver.add(parent_folder, folder, created_empty=created)
+    logging.debug("Folder %s with id: %s", folder.name, folder.id)
+    return folder
+
+
+def _plan(paths: Iterable[str]) -> Dict[str, dict]:
+    """Returns the folder tree of a set of paths, as nested dictionaries"""
+    tree: Dict[str, dict] = {}
+    for path in paths:
+        node = tree
+        for name in (part for part in path.split("/") if part):
+            node = node.setdefault(name, {})
+    return tree
+
+
+def ensure_paths(
+    box_client: Client,
+    paths: Iterable[str],
+    root: Folder = None,
+    max_workers: int = ENSURE_MAX_WORKERS,
+    resolver: PathResolver = None,
+) -> Dict[str, Folder]:
+    """
+    Creates the folders of every path, relative to root (All Files by default),
+    and returns all the folders of the plan by path, e.g. {"/a": ..., "/a/b": ...}.
+    Sibling folders, and everything below them, are created concurrently.
+    """
+    root = box_client.folder(folder_id="0") if root is None else root
+    folders: Dict[str, Folder] = {}
+    errors = []
+    outstanding = 0
+    done = threading.Condition()
+
+    def submit(executor: ThreadPoolExecutor, parent: Folder, parent_path: str, tree: Dict[str, dict]):
+        nonlocal outstanding
+        with done:
+            outstanding += len(tree)
+        for name, subtree in tree.items():
+            executor.submit(create, executor, parent, f"{parent_path}/{name}", name, subtree)
+
+    def create(executor: ThreadPoolExecutor, parent: Folder, path: str, name: str, subtree: Dict[str, dict]):
+        nonlocal outstanding
+        try:
+            if not errors:
+                folder = ensure_folder(parent, name, resolver)
+                with done:
+                    folders[path] = folder
+                submit(executor, folder, path, subtree)
+        except Exception as err:  # pylint: disable=broad-except
+            logging.error("Could not create %s: %s", path, err)
+            with done:
+                errors.append(err)
+        finally:
+            with done:
+                outstanding -= 1
+                done.notify_all()
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="ensure-paths") as executor:
+        submit(executor, root, "", _plan(paths))
+        with done:
+            done.wait_for(lambda: outstanding == 0)
+
+    if errors:
+        raise errors[0]
+    return folders
@@ -0,0 +1,118 @@
+""" Parallel recursive folder walker
+---
+Walks a Box folder tree depth first, yielding (depth, path, item) records as it goes.
+While a folder's items are yielded, its subfolders are already being listed
+on a bounded thread pool, so wide trees are not listed one folder at a time.
+Close the generator, or set the cancel event, to stop the walk early.
+"""
+import functools
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Collection, Dict, Iterable, Iterator, List, NamedTuple, Optional, Set
+
+from boxsdk.object.folder import Folder
+from boxsdk.object.item import Item
+
+from utils.folder_listing import DEFAULT_ITEM_FIELDS, DEFAULT_PAGE_SIZE, get_items
+
+# folders listed concurrently by default
+WALK_MAX_WORKERS = 8
+
+# folders listed ahead of the walk by default, bounding memory on huge trees
+WALK_MAX_PREFETCH = 1000
+
+
+class WalkEntry(NamedTuple):
+    """An item found by the walker, depth 1 being the walked folder's items"""
+
+    depth: int
+    path: str
+    item: Item
+
+
+class Listing(NamedTuple):
+    """A folder's items and the futures listing its subfolders"""
+
+    items: List[Item]
+    children: Dict[str, Future]
+    prefetched: bool
+
+
+def list_folder(
+    folder: Folder,
+    fields: Optional[Iterable[str]] = DEFAULT_ITEM_FIELDS,
+    page_size: int = DEFAULT_PAGE_SIZE,
+) -> List[Item]:
+    """Lists all the items of a folder"""
+    return list(get_items(folder, fields, page_size))
+
+
+def walk_folder(
+    folder: Folder,
+    max_depth: int = None,
+    types: Collection[str] = None,
+    max_workers: int = WALK_MAX_WORKERS,
+    cancel: threading.Event = None,
+    max_prefetch: int = WALK_MAX_PREFETCH,
+    fields: Optional[Iterable[str]] = DEFAULT_ITEM_FIELDS,
+    page_size: int = DEFAULT_PAGE_SIZE,
+    list_items: Callable[[Folder], List[Item]] = None,
+) -> Iterator[WalkEntry]:
+    """
+    Yields the items under a folder in depth first order,
+    with their depth and their path relative to the folder.
+    Only items of the given types ("file", "folder", "web_link") are yielded,
+    but every folder down to max_depth is walked.
+    At most max_prefetch folders are listed ahead of the one being yielded.
+    Items only have the requested fields, unless list_items replaces the listing.
+    """
+    if list_items is None:
+        list_items = functools.partial(list_folder, fields=fields, page_size=page_size)
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="folder-walker")
+    prefetch = threading.Semaphore(max_prefetch)
+    pending: Set[Future] = set()
+    pending_lock = threading.Lock()
+
+    def descend(depth: int) -> bool:
+        return max_depth is None or depth < max_depth
+
+    def submit(subfolder: Folder, depth: int, prefetched: bool) -> Future:
+        future = executor.submit(list_ahead, subfolder, depth, prefetched)
+        with pending_lock:
+            pending.add(future)
+        return future
+
+    def list_ahead(subfolder: Folder, depth: int, prefetched: bool) -> Listing:
+        items = list_items(subfolder)
+        # list the subfolders right away, while the walk is still elsewhere in the tree
+        children: Dict[str, Future] = {}
+        if descend(depth) and (cancel is None or not cancel.is_set()):
+            for item in items:
+                if item.type == "folder" and prefetch.acquire(blocking=False):
+                    children[item.id] = submit(item, depth + 1, True)
+        return Listing(items, children, prefetched)
+
+    def walk(future: Future, depth: int, parent_path: str) -> Iterator[WalkEntry]:
+        listing = future.result()
+        with pending_lock:
+            pending.discard(future)
+        if listing.prefetched:
+            prefetch.release()
+
+        for item in listing.items:
+            if cancel is not None and cancel.is_set():
+                return
+            path = f"{parent_path}/{item.name}"
+            if types is None or item.type in types:
+                yield WalkEntry(depth, path, item)
+            if item.type == "folder" and descend(depth):
+                child = listing.children.get(item.id) or submit(item, depth + 1, False)
+                yield from walk(child, depth + 1, path)
+
+    try:
+        yield from walk(submit(folder, 1, False), 1, "")
+    finally:
+        with pending_lock:
+            for future in pending:
+                future.cancel()
+        executor.shutdown(wait=False)
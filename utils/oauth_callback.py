@@ -1,33 +1,69 @@
-""" Handles the call back request from Box OAuth2.0
+""" Handles the call back requests from Box OAuth2.0
 ---
-This is a simple HTTP server that listens for a request from Box OAuth2.0.
-picking up the code and csrf_token from the query string.
+A long lived, threaded HTTP server handling many authorization flows at once.
+Each flow is keyed by its CSRF state; when Box redirects the browser back,
+the code is exchanged for tokens on a worker thread, the tokens going to the
+flow's token store, and the browser gets a single buffered response.
 """
+import html
 import logging
+import threading
+import time
 import urllib.parse
 import webbrowser
-from http.server import BaseHTTPRequestHandler, HTTPServer
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Tuple
 
-from utils.box_oauth import oauth_authenticate
+from boxsdk import OAuth2
+
+from utils.box_oauth import get_user_token_store, oauth_from_config
 from utils.config import AppConfig
+from utils.token_store import TokenStore
 
-CSRF_TOKEN_ORIG = ""
+# flows not completed within this many seconds are dropped
+FLOW_TTL = 600.0
 
+CALLBACK_PAGE = """<html><head><title>Sample Box SDK oAuth2 Callback</title></head>
+<body>
+<h2>oAuth Callback received:</h2>
+<h5>Code: {code}</h5>
+<h5>State: {state}</h5>
+<h5>Error: {error}</h5>
+<h5>Error Message: {error_description}</h5>
+<p>{message}</p>
+</body></html>"""
 
-class CallbackServer(BaseHTTPRequestHandler):
-    """
-    Creates a mini http request handler to handle a single callback request"""
 
-    def do_GET(self):  # pylint: disable=invalid-name
+class AuthorizationFlow:
+    """A pending authorization, completed when Box calls back with its state"""
+
+    def __init__(self, state: str, oauth: OAuth2, token_store: Optional[TokenStore] = None) -> None:
+        self.state = state
+        self.oauth = oauth
+        self.token_store = token_store
+        self.created_at = time.monotonic()
+        self.future: Future = Future()
+
+    def wait(self, timeout: float = None) -> OAuth2:
         """
-        Gets the redirect call back from Box OAuth2.0
-        capturing the code and csrf_token from the query string
-        and calls for the completion of the OAuth2.0 process.
+        Waits for the token exchange and returns the authenticated OAuth2 object,
+        raises concurrent.futures.TimeoutError if the user did not finish in time
         """
-        self.send_response(200)
-        self.send_header("Content-type", "text/html")
-        self.end_headers()
+        return self.future.result(timeout)
+
 
+class CallbackHandler(BaseHTTPRequestHandler):
+    """Handles the redirect call back from Box OAuth2.0"""
+
+    def log_message(self, format, *args):  # pylint: disable=redefined-builtin
+        logging.debug("Callback server: " + format, *args)
+
+    def do_GET(self):  # pylint: disable=invalid-name
+        """
+        Captures the code and state from the query string,
+        and hands the token exchange to the server's workers.
+        """
         params = urllib.parse.parse_qs(urllib.parse.urlparse(self.path).query)
 
         code = " ".join(params.get("code")) if params.get("code") else None
@@ -39,59 +75,146 @@ class CallbackServer(BaseHTTPRequestHandler):
             else None
         )
 
-        logging.info("code: %s", code)
-        logging.info("state: %s", state)
-        logging.info("error: %s", error)
-        logging.info("error_description: %s", error_description)
+        logging.info("state: %s, error: %s", state, error)
 
-        assert state == CSRF_TOKEN_ORIG
-        _ = oauth_authenticate(code) if code else None
+        status, message = self.server.callback.complete(state, code, error, error_description)
+        page = CALLBACK_PAGE.format(
+            code=html.escape(str(code)),
+            state=html.escape(str(state)),
+            error=html.escape(str(error)),
+            error_description=html.escape(str(error_description)),
+            message=html.escape(message),
+        ).encode("utf-8")
 
-        self.wfile.write(
-            bytes(
-                "<html><head><title>Sample Box SDK oAuth2 Callback</title></head>",  # noqa: E501
-                "utf-8",
-            )
-        )
-        # self.wfile.write(bytes("<p>Request: %s</p>" % self.path, "utf-8"))
-        self.wfile.write(bytes("<body>", "utf-8"))
-        self.wfile.write(bytes("<h2>oAuth Callback received:</h2>", "utf-8"))
-        self.wfile.write(bytes(f"<h5>Code: {code}</h5>", "utf-8"))
-        self.wfile.write(bytes(f"<h5>State: {state}</h5>", "utf-8"))
-        self.wfile.write(bytes(f"<h5>Error: {error}</h5>", "utf-8"))
-        self.wfile.write(
-            bytes(f"<h5>Error Message: {error_description}</h5>", "utf-8")
-        )  # noqa: E501
-        self.wfile.write(
-            bytes("<p>You can close this browser window.</p>", "utf-8")
-        )  # noqa: E501
-        self.wfile.write(bytes("</body></html>", "utf-8"))
-
-
-def callback_handle_request(config: AppConfig, csrf_token: str):
-    """
-    Handles the call back request from Box OAuth2.0
-    Creates a simple HTTP server that listens for a request from Box OAuth2.0.
-    """
-    global CSRF_TOKEN_ORIG  # pylint: disable=global-statement
-    CSRF_TOKEN_ORIG = csrf_token
-
-    web_server = HTTPServer(
-        (config.callback_hostname, config.callback_port), CallbackServer
-    )
+        self.send_response(status)
+        self.send_header("Content-type", "text/html; charset=utf-8")
+        self.send_header("Content-Length", str(len(page)))
+        self.end_headers()
+        self.wfile.write(page)
 
-    logging.info(
-        "Server started http://%s:%s",
-        config.callback_hostname,
-        config.callback_port,
-    )
 
-    try:
-        web_server.handle_request()
-    finally:
-        web_server.server_close()
+class OAuthCallbackServer:
+    """
+    Threaded callback server for concurrent authorization flows.
+    Start a flow with begin_flow, send the user to its url,
+    and wait on the flow for the tokens.
+    """
 
-    logging.info("Server stopped.")
+    def __init__(self, hostname: str = "localhost", port: int = 5000, max_workers: int = 4) -> None:
+        self._flows: Dict[str, AuthorizationFlow] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="oauth-callback")
+        self._http = ThreadingHTTPServer((hostname, port), CallbackHandler)
+        self._http.daemon_threads = True
+        self._http.callback = self
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._http.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "OAuthCallbackServer":
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._http.serve_forever, daemon=True)
+            self._thread.start()
+            logging.info("Server started %s", self.url)
+        return self
+
+    def stop(self):
+        if self._thread is not None:
+            self._http.shutdown()
+            self._thread = None
+        self._http.server_close()
+        self._executor.shutdown(wait=True)
+        logging.info("Server stopped.")
+
+    def __enter__(self) -> "OAuthCallbackServer":
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def expect(self, state: str, oauth: OAuth2, token_store: TokenStore = None) -> AuthorizationFlow:
+        """Registers a flow for an authorization url already handed out"""
+        flow = AuthorizationFlow(state, oauth, token_store)
+        now = time.monotonic()
+        with self._lock:
+            for stale in [flow for flow in self._flows.values() if now - flow.created_at > FLOW_TTL]:
+                del self._flows[stale.state]
+                stale.future.set_exception(TimeoutError(f"Authorization {stale.state} expired"))
+            self._flows[state] = flow
+        return flow
+
+    def begin_flow(self, config: AppConfig, user_key: str = None) -> Tuple[str, AuthorizationFlow]:
+        """
+        Starts an authorization, returning the url to send the user to and the flow.
+        With a user_key, the tokens go to that user's store instead of .oauth.json.
+        """
+        token_store = get_user_token_store(user_key) if user_key else None
+        oauth = oauth_from_config(config, token_store)
+        auth_url, csrf_token = oauth.get_authorization_url(config.redirect_uri)
+        return auth_url, self.expect(csrf_token, oauth, token_store)
+
+    def pending(self) -> int:
+        """Number of flows waiting for their call back"""
+        with self._lock:
+            return len(self._flows)
+
+    def complete(
+        self, state: Optional[str], code: Optional[str], error: Optional[str], error_description: Optional[str]
+    ) -> Tuple[int, str]:
+        """Completes the flow of a call back, returning the response status and message"""
+        with self._lock:
+            flow = self._flows.pop(state, None) if state else None
+        if flow is None:
+            return 400, "Unknown or expired authorization request, please start again."
+
+        if error or not code:
+            flow.future.set_exception(RuntimeError(f"Authorization failed: {error} {error_description}"))
+            return 400, "Authorization failed, you can close this browser window."
+
+        self._executor.submit(self._exchange, flow, code)
+        return 200, "You can close this browser window."
+
+    @staticmethod
+    def _exchange(flow: AuthorizationFlow, code: str):
+        try:
+            flow.oauth.authenticate(code)
+        except Exception as err:  # pylint: disable=broad-except
+            logging.error("Token exchange failed: %s", err)
+            flow.future.set_exception(err)
+        else:
+            flow.future.set_result(flow.oauth)
+
+
+_lock = threading.Lock()
+_server: Optional[OAuthCallbackServer] = None
+
+
+def get_callback_server(config: AppConfig) -> OAuthCallbackServer:
+    """Returns the process wide callback server, started on first use"""
+    global _server  # pylint: disable=global-statement
+
+    with _lock:
+        if _server is None:
+            _server = OAuthCallbackServer(config.callback_hostname, config.callback_port).start()
+        return _server
+
+
+def callback_handle_request(config: AppConfig, csrf_token: str, timeout: float = None):
+    """
+    Handles the call back request from Box OAuth2.0
+    Waits for the flow with the given state, storing the tokens in .oauth.json.
+    """
+    with _lock:
+        server = _server
+    if server is not None:
+        server.expect(csrf_token, oauth_from_config(config)).wait(timeout)
+        return
+
+    with OAuthCallbackServer(config.callback_hostname, config.callback_port) as server:
+        server.expect(csrf_token, oauth_from_config(config)).wait(timeout)
 
 
 def open_browser(auth_url: str):
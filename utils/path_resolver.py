@@ -0,0 +1,167 @@
+""" Path to id resolver
+---
+Resolves paths like /workshops/folders to Box items, one folder level at a time.
+Each folder gets a name index, filled while its listing is paged and
+kept in an LRU of folders, so a repeated lookup costs no API calls.
+Paging stops at the page holding the name and resumes there for the next miss.
+A fully listed folder answers misses too, so unknown names are cached as well.
+Indexes belong to the session that listed them: All Files is a different
+folder for every user, and the items found are bound to that session, so
+as-user clients and other users never share an index. Indexes expire after
+a ttl, for changes made outside this process.
+"""
+import threading
+import time
+import weakref
+from collections import OrderedDict
+from typing import Dict, Iterator, Optional, Tuple
+
+from boxsdk import Client
+from boxsdk.object.folder import Folder
+from boxsdk.object.item import Item
+
+from utils.folder_listing import DEFAULT_ITEM_FIELDS, DEFAULT_PAGE_SIZE, get_items
+
+# folders indexed by default
+RESOLVER_MAX_FOLDERS = 256
+
+# seconds a name index is trusted by default, names found missing included
+RESOLVER_TTL = 300.0
+
+
+class FolderIndex:
+    """Name index of a folder, filled a page at a time as names are looked up"""
+
+    def __init__(self, folder: Folder, page_size: int = DEFAULT_PAGE_SIZE) -> None:
+        self.items: Dict[str, Item] = {}
+        self.complete = False
+        self.created_at = time.monotonic()
+        self.session = weakref.ref(folder.session)
+        self._lock = threading.Lock()
+        self._pages: Iterator[Item] = iter(get_items(folder, DEFAULT_ITEM_FIELDS, page_size))
+
+    def lookup(self, name: str) -> Optional[Item]:
+        """Returns the item named name, listing only as far as needed"""
+        with self._lock:
+            item = self.items.get(name)
+            while item is None and not self.complete:
+                listed = next(self._pages, None)
+                if listed is None:
+                    self.complete = True
+                else:
+                    self.items.setdefault(listed.name, listed)
+                    if listed.name == name:
+                        item = listed
+            return item
+
+    def add(self, item: Item):
+        """Records an item created in the folder"""
+        with self._lock:
+            self.items[item.name] = item
+
+    def mark_empty(self):
+        """Records that the folder is known to be empty, e.g. just created"""
+        with self._lock:
+            self._pages = iter(())
+            self.complete = True
+
+
+class PathResolver:
+    """Resolves paths to items, caching the name index of max_folders folders"""
+
+    def __init__(
+        self,
+        max_folders: int = RESOLVER_MAX_FOLDERS,
+        ttl: Optional[float] = RESOLVER_TTL,
+        page_size: int = DEFAULT_PAGE_SIZE,
+    ) -> None:
+        self.max_folders = max_folders
+        self.ttl = ttl
+        self.page_size = page_size
+        self._lock = threading.Lock()
+        self._indexes: "OrderedDict[Tuple[int, str], FolderIndex]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._indexes)
+
+    def index(self, folder: Folder) -> FolderIndex:
+        """Returns the name index of a folder as seen by its session, created empty on first use"""
+        key = (id(folder.session), folder.object_id)
+        with self._lock:
+            index = self._indexes.get(key)
+            if index is not None and self.ttl is not None and time.monotonic() - index.created_at > self.ttl:
+                index = None
+            # a session id can be reused once the session is gone
+            if index is not None and index.session() is not folder.session:
+                index = None
+            if index is None:
+                index = self._indexes[key] = FolderIndex(folder, self.page_size)
+                while len(self._indexes) > self.max_folders:
+                    self._indexes.popitem(last=False)
+            self._indexes.move_to_end(key)
+            return index
+
+    def lookup(self, folder: Folder, name: str) -> Optional[Item]:
+        """Returns the item named name in a folder, None if there is none"""
+        return self.index(folder).lookup(name)
+
+    def resolve(self, root: Folder, path: str) -> Optional[Item]:
+        """Returns the item at a path relative to root, None if any part is missing"""
+        item: Item = root
+        for name in (part for part in path.split("/") if part):
+            if item.object_type != "folder":
+                return None
+            item = self.lookup(item, name)
+            if item is None:
+                return None
+        return item
+
+    def add(self, folder: Folder, item: Item, created_empty: bool = False):
+        """Records an item created in a folder, and whether it is a new empty folder"""
+        self.index(folder).add(item)
+        if created_empty:
+            self.index(item).mark_empty()
+
+    def invalidate(self, folder_id: str) -> bool:
+        """Drops a folder's name indexes, of every session, returns True if it was indexed"""
+        with self._lock:
+            keys = [key for key in self._indexes if key[1] == folder_id]
+            for key in keys:
+                del self._indexes[key]
+            return bool(keys)
+
+    def clear(self):
+        with self._lock:
+            self._indexes.clear()
+
+
+_lock = threading.Lock()
+_resolver = PathResolver()
+
+
+def get_path_resolver() -> PathResolver:
+    """Returns the process wide path resolver"""
+    return _resolver
+
+
+def set_path_resolver(resolver: PathResolver) -> PathResolver:
+    """Replaces the process wide path resolver"""
+    global _resolver  # pylint: disable=global-statement
+
+    with _lock:
+        previous, _resolver = _resolver, resolver
+    return previous
+
+
+def resolve(box_client: Client, path: str, resolver: PathResolver = None) -> Optional[Item]:
+    """Returns the item at an absolute path, like /workshops/folders, None if it does not exist"""
+    resolver = get_path_resolver() if resolver is None else resolver
+    return resolver.resolve(box_client.folder(folder_id="0"), path)
+
+
+def resolve_folder(box_client: Client, path: str, resolver: PathResolver = None) -> Folder:
+    """Returns the folder at an absolute path, raising ValueError if there is none"""
+    item = resolve(box_client, path, resolver)
+    if item is None or item.object_type != "folder":
+        raise ValueError(f"Folder '{path}' not found")
+    return item
@@ -0,0 +1,195 @@
+""" Ranged downloads
+---
+Files from RANGED_DOWNLOAD_THRESHOLD up are downloaded as byte ranges fetched
+concurrently, each over its own connection, instead of a single stream.
+Ranges are written in place into a sparse file preallocated next to the
+target, <path>.part, and every completed range is recorded in a json
+checkpoint, <path>.part.json, so a download cut short resumes with the missing
+ranges only. A range failing is retried on its own.
+The assembled file is verified against the sha1 Box reports before it replaces
+the target, and its sha1 is kept in the sha1 index for later uploads.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, NamedTuple, Set, Tuple
+
+from boxsdk import BoxAPIException
+from boxsdk.object.file import File
+from requests.exceptions import RequestException
+
+from utils.atomic_file import write_json_atomic
+from utils.chunked_upload import retryable_error
+from utils.sha1_index import get_sha1_index, mmap_sha1
+
+# files this size and larger are downloaded in ranges
+RANGED_DOWNLOAD_THRESHOLD = 64 * 1024 * 1024
+
+# bytes fetched by a range request
+RANGE_SIZE = 8 * 1024 * 1024
+
+# ranges downloaded concurrently by default
+DOWNLOAD_MAX_WORKERS = 4
+
+# attempts of a range before the download fails
+RANGE_MAX_ATTEMPTS = 3
+
+# first pause before retrying a range, doubling at every attempt, in seconds
+RANGE_RETRY_DELAY = 1.0
+
+ProgressCallback = Callable[[int, int], None]
+
+
+class DownloadStats(NamedTuple):
+    """Outcome of a ranged download, resumed being the number of ranges fetched before a restart"""
+
+    path: str
+    size: int
+    ranges: int
+    retries: int
+    seconds: float
+    resumed: int = 0
+
+    @property
+    def throughput(self) -> float:
+        """Bytes per second"""
+        return self.size / self.seconds if self.seconds else 0.0
+
+
+def byte_ranges(size: int, range_size: int = RANGE_SIZE) -> List[Tuple[int, int]]:
+    """Splits size bytes into inclusive (first, last) byte ranges"""
+    return [(offset, min(offset + range_size, size) - 1) for offset in range(0, size, range_size)]
+
+
+def _load_checkpoint(path: str, box_file: File, size: int, sha1: str, range_size: int) -> Set[int]:
+    """Returns the offsets of the ranges already downloaded, none if the checkpoint is for other content"""
+    try:
+        with open(f"{path}.part.json", "r", encoding="UTF-8") as file:
+            checkpoint = json.load(file)
+        if os.path.getsize(f"{path}.part") != size:
+            return set()
+    except (OSError, ValueError):
+        return set()
+    expected = {"file_id": box_file.object_id, "size": size, "sha1": sha1, "range_size": range_size}
+    if any(checkpoint.get(key) != value for key, value in expected.items()):
+        logging.info("Checkpoint of %s is for other content, starting over", path)
+        return set()
+    return set(checkpoint.get("done", []))
+
+
+def _discard(path: str):
+    for leftover in (f"{path}.part", f"{path}.part.json"):
+        try:
+            os.remove(leftover)
+        except FileNotFoundError:
+            pass
+
+
+def download_range(box_file: File, part_path: str, first: int, last: int) -> int:
+    """Writes one byte range in place and syncs it to disk, retrying it, and returns the number of retries"""
+    attempt = 1
+    while True:
+        try:
+            with open(part_path, "r+b") as stream:
+                stream.seek(first)
+                box_file.download_to(stream, byte_range=(first, last))
+                if stream.tell() != last + 1:
+                    raise RequestException(f"Range {first}-{last} of file {box_file.object_id} ended early")
+                # the range is on disk before the checkpoint can claim it
+                stream.flush()
+                os.fsync(stream.fileno())
+            return attempt - 1
+        except (BoxAPIException, RequestException) as err:
+            if attempt >= RANGE_MAX_ATTEMPTS or not retryable_error(err):
+                raise
+            logging.warning("Range at %s of file %s failed, retrying: %s", first, box_file.object_id, err)
+            time.sleep(RANGE_RETRY_DELAY * 2 ** (attempt - 1))
+            attempt += 1
+
+
+def ranged_download(
+    box_file: File,
+    path: str,
+    max_workers: int = DOWNLOAD_MAX_WORKERS,
+    range_size: int = RANGE_SIZE,
+    progress: ProgressCallback = None,
+) -> DownloadStats:
+    """
+    Downloads a file to path in concurrent byte ranges, resuming a previous
+    attempt, and verifies it against the sha1 of the file.
+    An interrupted download keeps its .part and checkpoint files for the next attempt.
+    """
+    started = time.monotonic()
+    if getattr(box_file, "size", None) is None or getattr(box_file, "sha1", None) is None:
+        box_file = box_file.get(fields=["type", "id", "name", "size", "sha1"])
+    size, sha1 = box_file.size, box_file.sha1
+    part_path = f"{path}.part"
+
+    done = _load_checkpoint(path, box_file, size, sha1, range_size)
+    if not done:
+        with open(part_path, "wb") as stream:
+            stream.truncate(size)
+    resumed = len(done)
+    pending = [(first, last) for first, last in byte_ranges(size, range_size) if first not in done]
+    lock = threading.Lock()
+    downloaded = sum(min(range_size, size - offset) for offset in done)
+
+    def checkpoint():
+        record = {
+            "file_id": box_file.object_id,
+            "size": size,
+            "sha1": sha1,
+            "range_size": range_size,
+            "done": sorted(done),
+        }
+        write_json_atomic(f"{path}.part.json", record)
+
+    def fetch(byte_range: Tuple[int, int]) -> int:
+        nonlocal downloaded
+        first, last = byte_range
+        retries = download_range(box_file, part_path, first, last)
+        with lock:
+            done.add(first)
+            checkpoint()
+            downloaded += last - first + 1
+            if progress is not None:
+                progress(downloaded, size)
+        return retries
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="download-ranges") as executor:
+        futures = [executor.submit(fetch, byte_range) for byte_range in pending]
+    retries = sum(future.result() for future in futures)
+
+    actual = mmap_sha1(part_path)
+    if actual != sha1:
+        _discard(path)
+        raise ValueError(f"Download of file {box_file.object_id} has sha1 {actual}, expected {sha1}")
+    os.replace(part_path, path)
+    _discard(path)
+    get_sha1_index().store(path, os.stat(path), sha1)
+
+    stats = DownloadStats(path, size, len(byte_ranges(size, range_size)), retries, time.monotonic() - started, resumed)
+    logging.info(
+        "Downloaded %s, %s bytes in %s ranges, %.1f MB/s, %s retries",
+        path,
+        size,
+        stats.ranges,
+        stats.throughput / (1024 * 1024),
+        retries,
+    )
+    return stats
+
+
+def download_to_path(box_file: File, path: str, threshold: int = RANGED_DOWNLOAD_THRESHOLD) -> File:
+    """Downloads a file to path, in concurrent ranges from threshold bytes up"""
+    if getattr(box_file, "size", None) is None:
+        box_file = box_file.get(fields=["type", "id", "name", "size", "sha1"])
+    if box_file.size >= threshold and box_file.size > 0:
+        ranged_download(box_file, path)
+    else:
+        with open(path, "wb") as stream:
+            box_file.download_to(stream)
+    return box_file
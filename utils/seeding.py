@@ -0,0 +1,139 @@
+""" Workshop sample seeding
+---
+Provisions the sample folders and files of the workshops from a declarative
+manifest, workshops/samples.json. Each sample set names its Box folder, the
+local directory uploaded into it, if any, and descriptions given to its files
+by name pattern.
+Seeding follows the dependency graph of the samples: the folders of every set
+are planned together and created with ensure_paths, where a folder waits only
+for its parent, then the trees of every set upload concurrently. Existing
+folders are reused, identical files skipped and descriptions only written when
+they differ, so seeding again is cheap and changes nothing.
+"""
+import fnmatch
+import json
+import logging
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List, NamedTuple, Optional
+
+from boxsdk import Client
+from boxsdk.object.file import File
+from boxsdk.object.folder import Folder
+
+from utils.folder_paths import ensure_paths
+from utils.tree_uploader import TREE_MAX_WORKERS, FileResult, LocalFile, TreeUploadReport, scan_directory, upload_tree
+
+# manifest used by default, content directories are relative to it
+SAMPLES_MANIFEST = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "workshops", "samples.json"
+)
+
+
+class SampleSet(NamedTuple):
+    """Samples of a workshop: a Box folder path, the local tree uploaded into it and file descriptions by pattern"""
+
+    name: str
+    folder: str
+    content: Optional[str] = None
+    descriptions: Dict[str, str] = {}
+
+
+class SeedReport(NamedTuple):
+    """Folders of the seeded sample sets by name, and their upload reports"""
+
+    folders: Dict[str, Folder]
+    uploads: Dict[str, TreeUploadReport]
+    seconds: float
+
+    @property
+    def failed(self) -> List[FileResult]:
+        return [result for report in self.uploads.values() for result in report.failed]
+
+
+def load_manifest(path: str = SAMPLES_MANIFEST) -> List[SampleSet]:
+    """Reads the sample sets of a manifest, resolving their content directories"""
+    with open(path, "r", encoding="UTF-8") as file:
+        records = json.load(file)["samples"]
+    base = os.path.dirname(os.path.abspath(path))
+    return [
+        SampleSet(
+            record["name"],
+            "/" + record["folder"].strip("/"),
+            os.path.join(base, record["content"]) if record.get("content") else None,
+            record.get("descriptions", {}),
+        )
+        for record in records
+    ]
+
+
+def describer(descriptions: Dict[str, str]):
+    """after_upload hook giving files the description of the first pattern their name matches"""
+
+    def describe(file: File, _local_file: LocalFile):
+        description = next(
+            (text for pattern, text in descriptions.items() if fnmatch.fnmatch(file.name, pattern)), None
+        )
+        if description is None:
+            return
+        current = getattr(file, "description", None)
+        if current is None:
+            current = file.get(fields=["description"]).description
+        if current != description:
+            file.update_info(data={"description": description})
+
+    return describe
+
+
+def seed_samples(
+    box_client: Client,
+    names: Iterable[str] = None,
+    manifest: str = SAMPLES_MANIFEST,
+    max_workers: int = TREE_MAX_WORKERS,
+) -> SeedReport:
+    """
+    Seeds the sample sets of a manifest, all of them unless names are given, into All Files.
+    Failed files are logged and listed in the report.
+    """
+    started = time.monotonic()
+    samples = load_manifest(manifest)
+    if names is not None:
+        wanted = list(names)
+        unknown = set(wanted) - {sample.name for sample in samples}
+        if unknown:
+            raise ValueError(f"Unknown sample sets: {', '.join(sorted(unknown))}")
+        samples = [sample for sample in samples if sample.name in wanted]
+
+    paths = []
+    for sample in samples:
+        paths.append(sample.folder)
+        if sample.content is not None:
+            paths.extend(sample.folder + path for path in scan_directory(sample.content)[0])
+    created = ensure_paths(box_client, paths, max_workers=max_workers)
+    folders = {sample.name: created[sample.folder] for sample in samples}
+    for sample in samples:
+        logging.info("\tFolder %s (%s)", sample.folder, folders[sample.name].object_id)
+
+    trees = [sample for sample in samples if sample.content is not None]
+    uploads: Dict[str, TreeUploadReport] = {}
+    if trees:
+        workers = max(1, max_workers // len(trees))
+        with ThreadPoolExecutor(max_workers=len(trees), thread_name_prefix="seed") as executor:
+            futures = {
+                sample.name: executor.submit(
+                    upload_tree,
+                    box_client,
+                    sample.content,
+                    folders[sample.name],
+                    max_workers=workers,
+                    after_upload=describer(sample.descriptions) if sample.descriptions else None,
+                )
+                for sample in trees
+            }
+        uploads = {name: future.result() for name, future in futures.items()}
+
+    report = SeedReport(folders, uploads, time.monotonic() - started)
+    for result in report.failed:
+        logging.error(" \tFailed %s: %s", result.local.path, result.error)
+    return report
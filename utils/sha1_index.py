@@ -0,0 +1,133 @@
+""" Local sha1 index
+---
+Caches the sha1 of local files in SQLite, keyed by path, size and mtime, so a
+file is hashed again only once it changed and a re-run over an unchanged tree
+hashes nothing. Files are hashed through mmap, and large batches of files are hashed
+on a process pool, hashing being CPU bound.
+The sha1s compare with the sha1 Box reports for a file, to skip identical uploads.
+"""
+import hashlib
+import mmap
+import multiprocessing
+import os
+import sqlite3
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterable, Optional
+
+# index file used by default
+SHA1_INDEX_PATH = ".sha1_index.db"
+
+# files, and bytes, a batch needs before it is hashed on a process pool,
+# starting the spawned processes costs more than hashing smaller batches in process
+PROCESS_POOL_MIN_FILES = 32
+PROCESS_POOL_MIN_BYTES = 64 * 1024 * 1024
+
+# start method of the hashing processes, hashing runs next to other threads and forking them could deadlock
+PROCESS_POOL_START_METHOD = "spawn"
+
+
+def mmap_sha1(path: str) -> str:
+    """Returns the sha1 of a local file, as Box reports it, hashing a memory map of it"""
+    with open(path, "rb") as file:
+        if os.fstat(file.fileno()).st_size == 0:
+            return hashlib.sha1().hexdigest()
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return hashlib.sha1(mapped).hexdigest()
+
+
+class Sha1Index:
+    """On disk sha1 cache, shared by runs and processes"""
+
+    def __init__(self, path: str = SHA1_INDEX_PATH) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        with self._lock:
+            self._connection.execute("PRAGMA journal_mode=WAL")
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS hashes (path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, sha1 TEXT)"
+            )
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+    def lookup(self, path: str, stat: os.stat_result = None) -> Optional[str]:
+        """Returns the cached sha1 of a file, None if it is unknown or changed since"""
+        stat = os.stat(path) if stat is None else stat
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT sha1 FROM hashes WHERE path = ? AND size = ? AND mtime_ns = ?",
+                (os.path.abspath(path), stat.st_size, stat.st_mtime_ns),
+            ).fetchone()
+        return row[0] if row else None
+
+    def store(self, path: str, stat: os.stat_result, sha1: str):
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO hashes VALUES (?, ?, ?, ?)",
+                (os.path.abspath(path), stat.st_size, stat.st_mtime_ns, sha1),
+            )
+
+    def sha1(self, path: str) -> str:
+        """Returns the sha1 of a file, hashing it only if it changed"""
+        stat = os.stat(path)
+        sha1 = self.lookup(path, stat)
+        if sha1 is None:
+            sha1 = mmap_sha1(path)
+            self.store(path, stat, sha1)
+        return sha1
+
+    def hash_files(self, paths: Iterable[str], max_workers: int = None) -> Dict[str, str]:
+        """Returns the sha1 of every file by path, hashing the changed ones on a process pool"""
+        hashes: Dict[str, str] = {}
+        changed = []
+        for path in paths:
+            stat = os.stat(path)
+            sha1 = self.lookup(path, stat)
+            if sha1 is None:
+                changed.append((path, stat))
+            else:
+                hashes[path] = sha1
+
+        changed_bytes = sum(stat.st_size for _, stat in changed)
+        if len(changed) >= PROCESS_POOL_MIN_FILES and changed_bytes >= PROCESS_POOL_MIN_BYTES:
+            context = multiprocessing.get_context(PROCESS_POOL_START_METHOD)
+            with ProcessPoolExecutor(max_workers=max_workers, mp_context=context) as executor:
+                sha1s = list(executor.map(mmap_sha1, [path for path, _ in changed], chunksize=16))
+        else:
+            sha1s = [mmap_sha1(path) for path, _ in changed]
+
+        with self._lock, self._connection:
+            self._connection.execute("BEGIN")
+            for (path, stat), sha1 in zip(changed, sha1s):
+                self._connection.execute(
+                    "INSERT OR REPLACE INTO hashes VALUES (?, ?, ?, ?)",
+                    (os.path.abspath(path), stat.st_size, stat.st_mtime_ns, sha1),
+                )
+                hashes[path] = sha1
+        return hashes
+
+
+_lock = threading.Lock()
+_index: Optional[Sha1Index] = None
+
+
+def get_sha1_index() -> Sha1Index:
+    """Returns the process wide sha1 index, in .sha1_index.db unless replaced"""
+    global _index  # pylint: disable=global-statement
+
+    with _lock:
+        if _index is None:
+            _index = Sha1Index()
+        return _index
+
+
+def set_sha1_index(index: Sha1Index) -> Optional[Sha1Index]:
+    """Replaces the process wide sha1 index"""
+    global _index  # pylint: disable=global-statement
+
+    with _lock:
+        previous, _index = _index, index
+    return previous
@@ -0,0 +1,153 @@
+""" Expiry aware storage for the oAuth2 tokens
+---
+Tokens are kept in memory and persisted to a json file (.oauth.json by default).
+The file is only re-read when it changes on disk, and it is written atomically.
+Refreshes are serialized across processes by a lock file next to it,
+so processes sharing the file refresh once per expiry and reuse the result.
+"""
+from datetime import datetime, timedelta
+import json
+import logging
+import os
+import threading
+from typing import Optional, Tuple
+
+from boxsdk import OAuth2
+
+from utils.atomic_file import FileLock, write_json_atomic
+
+ACCESS_TOKEN_TTL = timedelta(minutes=60)
+REFRESH_TOKEN_TTL = timedelta(days=60)
+
+# refresh the access token this long before it expires
+REFRESH_MARGIN = timedelta(minutes=5)
+
+# wait this long before trying again after a failed background refresh
+REFRESH_RETRY_DELAY = 30.0
+
+
+def _parse_datetime(value: Optional[str]) -> Optional[datetime]:
+    try:
+        return datetime.fromisoformat(value) if value else None
+    except ValueError:
+        return None
+
+
+class TokenStore:
+    """Keeps the oAuth2 tokens in memory, backed by a json file"""
+
+    def __init__(self, path: str = ".oauth.json") -> None:
+        self.path = path
+        self.access_token: Optional[str] = None
+        self.refresh_token: Optional[str] = None
+        self.access_token_expires_on: Optional[datetime] = None
+        self.refresh_token_expires_on: Optional[datetime] = None
+        self.refresh_lock = FileLock(f"{path}.lock")
+        self._lock = threading.Lock()
+        self._file_version: Optional[Tuple[int, int]] = None
+        self._timer: Optional[threading.Timer] = None
+        self._oauth: Optional[OAuth2] = None
+
+    def load(self) -> Tuple[Optional[str], Optional[str]]:
+        """
+        Returns the access and refresh tokens,
+        re-reading the file only if it changed since the last read
+        """
+        with self._lock:
+            try:
+                stat = os.stat(self.path)
+            except FileNotFoundError:
+                return self.access_token, self.refresh_token
+
+            # atomic writes replace the file, so the inode changes on every write
+            file_version = (stat.st_ino, stat.st_mtime_ns)
+            if file_version != self._file_version:
+                with open(self.path, "r", encoding="UTF-8") as file:
+                    oauth_dict = json.loads(file.read())
+                self.access_token = oauth_dict.get("access_token")
+                self.refresh_token = oauth_dict.get("refresh_token")
+                self.access_token_expires_on = _parse_datetime(
+                    oauth_dict.get("access_token_expires_on")
+                )
+                self.refresh_token_expires_on = _parse_datetime(
+                    oauth_dict.get("refresh_token_expires_on")
+                )
+                self._file_version = file_version
+
+            return self.access_token, self.refresh_token
+
+    def store(self, access_token: str, refresh_token: str):
+        """Stores the access and refresh tokens, use as the store_tokens callback"""
+        now = datetime.today()
+        with self._lock:
+            self.access_token = access_token
+            self.refresh_token = refresh_token
+            self.access_token_expires_on = now + ACCESS_TOKEN_TTL
+            self.refresh_token_expires_on = now + REFRESH_TOKEN_TTL
+            oauth_json = {
+                "access_token": access_token,
+                "access_token_expires_on": str(self.access_token_expires_on),
+                "refresh_token": refresh_token,
+                "refresh_token_expires_on": str(self.refresh_token_expires_on),
+            }
+            write_json_atomic(self.path, oauth_json)
+            stat = os.stat(self.path)
+            self._file_version = (stat.st_ino, stat.st_mtime_ns)
+
+    def seconds_to_refresh(self, margin: timedelta = REFRESH_MARGIN) -> float:
+        """Seconds until the access token should be refreshed, 0 if it is due"""
+        self.load()
+        if not self.access_token or self.access_token_expires_on is None:
+            return 0.0
+        due = self.access_token_expires_on - margin - datetime.today()
+        return max(due.total_seconds(), 0.0)
+
+    def is_fresh(self, margin: timedelta = REFRESH_MARGIN) -> bool:
+        """True if the access token is not about to expire"""
+        return self.seconds_to_refresh(margin) > 0
+
+    def schedule_refresh(self, oauth: OAuth2, margin: timedelta = REFRESH_MARGIN):
+        """
+        Refreshes the access token on a background timer shortly before it expires,
+        so requests never have to wait for a refresh.
+        A store runs a single timer, refreshing through the latest oauth object given,
+        and every client reading its tokens from the store picks up the new token.
+        """
+        with self._lock:
+            self._oauth = oauth
+            if self._timer is not None:
+                return
+        self._start_timer(margin, self.seconds_to_refresh(margin))
+
+    def cancel_refresh(self):
+        """Stops the background refresh"""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            self._oauth = None
+
+    def _start_timer(self, margin: timedelta, delay: float):
+        timer = threading.Timer(delay, self._refresh, args=(margin,))
+        timer.daemon = True
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+            self._timer = timer
+        timer.start()
+
+    def _refresh(self, margin: timedelta):
+        delay = REFRESH_RETRY_DELAY
+        oauth = self._oauth
+        try:
+            if oauth is not None and not self.is_fresh(margin):
+                oauth.refresh(oauth.access_token)
+            delay = max(self.seconds_to_refresh(margin), REFRESH_RETRY_DELAY)
+        except Exception as err:  # pylint: disable=broad-except
+            logging.warning("Background token refresh failed: %s", err)
+
+        with self._lock:
+            if self._timer is not threading.current_thread():
+                # cancelled or replaced while refreshing
+                return
+        self._start_timer(margin, delay)
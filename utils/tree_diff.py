@@ -0,0 +1,213 @@
+""" Folder tree diffs
+---
+Compares two versions of a folder tree, each being a tree snapshot, a walk of a
+Box folder or a local directory, and lists what was added, removed, modified or moved.
+Items are matched by id when both sides have ids, by path otherwise, then the
+files left over on both sides are matched by sha1 and size to detect moves.
+Every step is a dictionary pass, so a diff is linear in the number of items.
+"""
+import hashlib
+import os
+from enum import Enum
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from boxsdk.object.folder import Folder
+
+from utils.folder_walker import WALK_MAX_WORKERS, walk_folder
+from utils.tree_snapshot import SNAPSHOT_FIELDS, TreeSnapshot, parse_timestamp
+
+# bytes read at a time when hashing local files
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+class ChangeKind(str, Enum):
+    ADDED = "added"
+    REMOVED = "removed"
+    MODIFIED = "modified"
+    MOVED = "moved"
+
+
+class DiffEntry(NamedTuple):
+    """An item of one side of a diff, paths being relative to the compared folder, like /a/b"""
+
+    path: str
+    type: str
+    size: int = 0
+    sha1: Optional[str] = None
+    modified_at: int = 0
+    id: Optional[str] = None
+
+
+class Change(NamedTuple):
+    """A difference, old or new being None for added and removed items"""
+
+    kind: ChangeKind
+    old: Optional[DiffEntry]
+    new: Optional[DiffEntry]
+
+    @property
+    def path(self) -> str:
+        return (self.new or self.old).path
+
+
+def file_sha1(path: str) -> str:
+    """Returns the sha1 of a local file, as Box reports it"""
+    digest = hashlib.sha1()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+# sides
+
+
+def snapshot_entries(snapshot: TreeSnapshot) -> Iterator[DiffEntry]:
+    """Yields the items of a snapshot, the root excluded"""
+    paths = {0: ""}
+    for index in snapshot.walk():
+        path = f"{paths[snapshot.parents[index]]}/{snapshot.name(index)}"
+        item_type = snapshot.type(index)
+        if item_type == "folder":
+            paths[index] = path
+        yield DiffEntry(
+            path,
+            item_type,
+            snapshot.sizes[index],
+            snapshot.sha1(index),
+            snapshot.modified[index],
+            str(snapshot.ids[index]),
+        )
+
+
+def folder_entries(folder: Folder, max_workers: int = WALK_MAX_WORKERS) -> Iterator[DiffEntry]:
+    """Yields the items under a Box folder, walking it"""
+    for _, path, item in walk_folder(folder, max_workers=max_workers, fields=SNAPSHOT_FIELDS):
+        yield DiffEntry(
+            path,
+            item.type,
+            getattr(item, "size", 0) or 0,
+            getattr(item, "sha1", None),
+            parse_timestamp(getattr(item, "modified_at", None)),
+            item.id,
+        )
+
+
+def local_entries(directory: str, hasher: Optional[Callable[[str], str]] = file_sha1) -> Iterator[DiffEntry]:
+    """
+    Yields the folders and files under a local directory.
+    Files are hashed with hasher, get_sha1_index().sha1 reuses the sha1 index, hasher=None compares them by size
+    and mtime only.
+    """
+    for folder, folder_names, file_names in os.walk(directory):
+        relative = os.path.relpath(folder, directory)
+        prefix = "" if relative == "." else "/" + relative.replace(os.sep, "/")
+        folder_names.sort()
+        for name in folder_names:
+            yield DiffEntry(f"{prefix}/{name}", "folder")
+        for name in sorted(file_names):
+            local_path = os.path.join(folder, name)
+            stat = os.stat(local_path)
+            yield DiffEntry(
+                f"{prefix}/{name}",
+                "file",
+                stat.st_size,
+                hasher(local_path) if hasher else None,
+                int(stat.st_mtime),
+            )
+
+
+# diff
+
+
+def content_changed(old: DiffEntry, new: DiffEntry) -> bool:
+    """
+    Compares files by sha1 when both sides have it, by size and mtime otherwise.
+    A local mtime says nothing about Box's modified_at, so a local file (it has no id)
+    is compared with a Box file by size only.
+    """
+    if old.type != "file":
+        return False
+    if old.sha1 and new.sha1:
+        return old.sha1 != new.sha1
+    if old.size != new.size:
+        return True
+    if bool(old.id) != bool(new.id):
+        return False
+    return bool(old.modified_at and new.modified_at and old.modified_at != new.modified_at)
+
+
+def diff_trees(old: Iterable[DiffEntry], new: Iterable[DiffEntry], detect_moves: bool = True) -> List[Change]:
+    """
+    Returns the changes from old to new, matching items by id when both have one, by path otherwise.
+    new must list folders before their items, as walks do, so the items of a
+    moved folder are not reported as moved themselves.
+    """
+    changes: List[Change] = []
+    # old path to new path of the folders matched at another path
+    relocated: Dict[str, str] = {}
+    old_by_key: Dict[str, DiffEntry] = {}
+    old_keys_by_path: Dict[str, str] = {}
+    for entry in old:
+        old_by_key[entry.id or entry.path] = entry
+        old_keys_by_path[entry.path] = entry.id or entry.path
+
+    added: List[DiffEntry] = []
+    for entry in new:
+        previous = old_by_key.pop(entry.id, None) if entry.id else None
+        if previous is None:
+            key = old_keys_by_path.get(entry.path)
+            candidate = old_by_key.get(key)
+            if candidate is not None and not (candidate.id and entry.id):
+                previous = old_by_key.pop(key)
+        if previous is None or previous.type != entry.type:
+            if previous is not None:
+                changes.append(Change(ChangeKind.REMOVED, previous, None))
+            added.append(entry)
+            continue
+        if previous.path != entry.path:
+            old_parent, name = previous.path.rsplit("/", 1)
+            if f"{relocated.get(old_parent, old_parent)}/{name}" != entry.path:
+                changes.append(Change(ChangeKind.MOVED, previous, entry))
+            if entry.type == "folder":
+                relocated[previous.path] = entry.path
+        if content_changed(previous, entry):
+            changes.append(Change(ChangeKind.MODIFIED, previous, entry))
+
+    removed = list(old_by_key.values())
+    if detect_moves:
+        added, removed, moves = _match_moves(added, removed)
+        changes.extend(moves)
+    changes.extend(Change(ChangeKind.REMOVED, entry, None) for entry in removed)
+    changes.extend(Change(ChangeKind.ADDED, None, entry) for entry in added)
+    return changes
+
+
+def _match_moves(
+    added: List[DiffEntry], removed: List[DiffEntry]
+) -> Tuple[List[DiffEntry], List[DiffEntry], List[Change]]:
+    """Pairs removed and added files with the same sha1 and size as moves"""
+    by_content: Dict[Tuple[str, int], List[DiffEntry]] = {}
+    for entry in removed:
+        if entry.type == "file" and entry.sha1:
+            by_content.setdefault((entry.sha1, entry.size), []).append(entry)
+
+    moves, still_added = [], []
+    moved = set()
+    for entry in added:
+        candidates = by_content.get((entry.sha1, entry.size)) if entry.type == "file" and entry.sha1 else None
+        if candidates:
+            previous = candidates.pop()
+            moved.add(id(previous))
+            moves.append(Change(ChangeKind.MOVED, previous, entry))
+        else:
+            still_added.append(entry)
+    return still_added, [entry for entry in removed if id(entry) not in moved], moves
+
+
+def summarize(changes: Iterable[Change]) -> Dict[str, int]:
+    """Number of changes by kind"""
+    counts = {kind.value: 0 for kind in ChangeKind}
+    for change in changes:
+        counts[change.kind.value] += 1
+    return counts
@@ -0,0 +1,279 @@
+""" Event driven folder tree mirror
+---
+Keeps a local index of a Box folder tree up to date from the events stream.
+The tree is walked once, the stream position being read before the walk so
+no change is missed, then item events are applied as they come in.
+The index and stream position are checkpointed atomically, so a restart
+resumes from the events instead of walking the tree again.
+Listing a folder or finding a path is then a local dictionary lookup.
+"""
+import collections
+import json
+import logging
+import os
+import threading
+from typing import Deque, Dict, Iterator, List, Optional, Set
+
+from boxsdk import Client
+from boxsdk.object.folder import Folder
+from boxsdk.object.item import Item
+
+from utils.atomic_file import write_json_atomic
+from utils.folder_walker import WALK_MAX_WORKERS, walk_folder
+
+# events fetched per request while catching up
+EVENTS_PAGE_SIZE = 500
+
+# event ids remembered to skip the duplicates Box may deliver
+EVENTS_SEEN = 1000
+
+# events that add, move or rename an item
+UPSERT_EVENTS = (
+    "ITEM_CREATE",
+    "ITEM_UPLOAD",
+    "ITEM_MOVE",
+    "ITEM_RENAME",
+    "ITEM_COPY",
+    "ITEM_UNDELETE_VIA_TRASH",
+)
+
+# events that remove an item
+REMOVE_EVENTS = ("ITEM_TRASH",)
+
+ITEM_TYPES = ("file", "folder", "web_link")
+
+
+class MirrorItem:
+    """An item of the mirrored tree, folders having their children ids by name"""
+
+    __slots__ = ("id", "type", "name", "parent_id", "children")
+
+    def __init__(self, item_id: str, item_type: str, name: str, parent_id: Optional[str]) -> None:
+        self.id = item_id  # pylint: disable=invalid-name
+        self.type = item_type
+        self.name = name
+        self.parent_id = parent_id
+        self.children: Optional[Dict[str, str]] = {} if item_type == "folder" else None
+
+    def __repr__(self) -> str:
+        return f"<MirrorItem {self.type} {self.id} {self.name}>"
+
+
+class TreeMirror:
+    """
+    Local mirror of the tree under folder_id.
+    Call start() once, then sync() or follow() to apply the changes.
+    """
+
+    def __init__(
+        self,
+        box_client: Client,
+        folder_id: str = "0",
+        checkpoint_path: str = None,
+        max_workers: int = WALK_MAX_WORKERS,
+    ) -> None:
+        self.client = box_client
+        self.folder_id = folder_id
+        self.checkpoint_path = checkpoint_path
+        self.max_workers = max_workers
+        self.stream_position = None
+        self._items: Dict[str, MirrorItem] = {}
+        self._lock = threading.RLock()
+        self._seen: Deque[str] = collections.deque(maxlen=EVENTS_SEEN)
+        self._seen_ids: Set[str] = set()
+
+    def __len__(self) -> int:
+        return len(self._items)
+
+    def __contains__(self, item_id: str) -> bool:
+        return item_id in self._items
+
+    # building
+
+    def start(self) -> "TreeMirror":
+        """Loads the checkpoint if there is one, walks the tree otherwise"""
+        if not self.load():
+            self.build()
+        return self
+
+    def build(self):
+        """Walks the whole tree, then checkpoints it"""
+        events = self.client.events()
+        # read before the walk, changes made during the walk are replayed afterwards
+        position = events.get_latest_stream_position()
+        root = self.client.folder(self.folder_id).get(fields=["type", "id", "name"])
+        with self._lock:
+            self._items = {root.id: MirrorItem(root.id, "folder", root.name, None)}
+            self._add_tree(root)
+            self.stream_position = position
+        logging.info("Mirrored %s items under folder %s", len(self._items), self.folder_id)
+        self.save()
+
+    def _add_tree(self, folder: Folder):
+        ids = {"": folder.object_id}
+        for _, path, item in walk_folder(folder, max_workers=self.max_workers):
+            parent_path = path.rsplit("/", 1)[0]
+            ids[path] = item.id
+            self._attach(MirrorItem(item.id, item.type, item.name, ids[parent_path]))
+
+    def load(self) -> bool:
+        """Loads the checkpoint, returns False if there is none for this folder"""
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return False
+        with open(self.checkpoint_path, "r", encoding="UTF-8") as file:
+            checkpoint = json.load(file)
+        if checkpoint.get("folder_id") != self.folder_id:
+            return False
+        with self._lock:
+            self._items = {}
+            for item_id, item_type, name, parent_id in checkpoint["items"]:
+                self._items[item_id] = MirrorItem(item_id, item_type, name, parent_id)
+            for item in self._items.values():
+                if item.parent_id is not None:
+                    self._items[item.parent_id].children[item.name] = item.id
+            self.stream_position = checkpoint["stream_position"]
+        return True
+
+    def save(self):
+        """Checkpoints the index and the stream position, atomically"""
+        if not self.checkpoint_path:
+            return
+        with self._lock:
+            checkpoint = {
+                "folder_id": self.folder_id,
+                "stream_position": self.stream_position,
+                "items": [[item.id, item.type, item.name, item.parent_id] for item in self._items.values()],
+            }
+        write_json_atomic(self.checkpoint_path, checkpoint, indent=None)
+
+    # applying events
+
+    def sync(self) -> int:
+        """Applies the events since the last sync, returns how many changed the mirror"""
+        events = self.client.events()
+        applied = 0
+        start = self.stream_position
+        while True:
+            page = events.get_events(limit=EVENTS_PAGE_SIZE, stream_position=self.stream_position)
+            entries = page["entries"]
+            with self._lock:
+                for event in entries:
+                    applied += self.apply(event)
+                self.stream_position = page["next_stream_position"]
+            if not entries:
+                break
+        if applied or self.stream_position != start:
+            self.save()
+        return applied
+
+    def follow(self, stop: threading.Event):
+        """Syncs whenever the long polling connection reports a change, until stop is set"""
+        events = self.client.events()
+        options = events.get_long_poll_options()
+        while not stop.is_set():
+            message = events.long_poll(options, self.stream_position).json().get("message")
+            if message == "new_change":
+                self.sync()
+            elif message != "reconnect":
+                options = events.get_long_poll_options()
+
+    def apply(self, event) -> bool:
+        """Applies one event, returns True if it changed the mirror"""
+        event_id = getattr(event, "event_id", None)
+        source = getattr(event, "source", None)
+        if getattr(source, "type", None) not in ITEM_TYPES:
+            return False
+
+        with self._lock:
+            if event_id in self._seen_ids:
+                return False
+            if len(self._seen) == self._seen.maxlen:
+                self._seen_ids.discard(self._seen[0])
+            self._seen.append(event_id)
+            self._seen_ids.add(event_id)
+
+            if event.event_type in REMOVE_EVENTS or getattr(source, "item_status", "active") != "active":
+                return self._remove(source.id)
+            if event.event_type in UPSERT_EVENTS:
+                return self._upsert(source, event.event_type)
+        return False
+
+    def _upsert(self, source: Item, event_type: str) -> bool:
+        parent = getattr(source, "parent", None)
+        parent_item = self._items.get(parent.id) if parent is not None else None
+        if parent_item is None or parent_item.children is None:
+            # moved out of the mirrored tree, or somewhere else entirely
+            return self._remove(source.id)
+
+        item = self._items.get(source.id)
+        if item is not None:
+            self._detach(item)
+            item.name, item.parent_id = source.name, parent_item.id
+            self._attach(item)
+            return True
+
+        self._attach(MirrorItem(source.id, source.type, source.name, parent_item.id))
+        if source.type == "folder" and event_type != "ITEM_CREATE":
+            # copied or restored folders come with content, and no event for it
+            self._add_tree(source)
+        return True
+
+    def _remove(self, item_id: str) -> bool:
+        item = self._items.get(item_id)
+        if item is None or item.parent_id is None:
+            return False
+        self._detach(item)
+        stack = [item]
+        while stack:
+            current = stack.pop()
+            del self._items[current.id]
+            if current.children:
+                stack.extend(self._items[child_id] for child_id in current.children.values())
+        return True
+
+    def _attach(self, item: MirrorItem):
+        self._items[item.id] = item
+        self._items[item.parent_id].children[item.name] = item.id
+
+    def _detach(self, item: MirrorItem):
+        siblings = self._items[item.parent_id].children
+        if siblings.get(item.name) == item.id:
+            del siblings[item.name]
+
+    # local queries
+
+    def get(self, item_id: str) -> Optional[MirrorItem]:
+        return self._items.get(item_id)
+
+    def list_folder(self, folder_id: str = None) -> List[MirrorItem]:
+        """Returns a folder's items, the mirrored folder's by default"""
+        with self._lock:
+            folder = self._items[folder_id or self.folder_id]
+            return [self._items[child_id] for child_id in folder.children.values()]
+
+    def find(self, path: str) -> Optional[MirrorItem]:
+        """Returns the item at a path relative to the mirrored folder, like /a/b"""
+        with self._lock:
+            item = self._items[self.folder_id]
+            for name in (part for part in path.split("/") if part):
+                if item.children is None or name not in item.children:
+                    return None
+                item = self._items[item.children[name]]
+            return item
+
+    def path_of(self, item_id: str) -> str:
+        """Returns the path of an item relative to the mirrored folder"""
+        with self._lock:
+            names = []
+            item = self._items[item_id]
+            while item.parent_id is not None:
+                names.append(item.name)
+                item = self._items[item.parent_id]
+            return "/" + "/".join(reversed(names))
+
+    def walk(self, folder_id: str = None) -> Iterator[MirrorItem]:
+        """Yields the items under a folder, depth first"""
+        for item in self.list_folder(folder_id):
+            yield item
+            if item.children is not None:
+                yield from self.walk(item.id)
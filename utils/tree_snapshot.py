@@ -0,0 +1,290 @@
+""" Compact folder tree snapshots
+---
+A snapshot keeps a folder tree as parallel arrays, one entry per item:
+id, parent index, type, size, modified_at, sha1 and name, 57 bytes per item
+plus its name, against kilobytes for SDK Item objects.
+Snapshots save to a single file and load with mmap, the arrays being views
+on the mapped file, so loading is instant and pages are read on demand.
+"""
+import mmap
+import os
+import struct
+from array import array
+from datetime import datetime
+from typing import Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+from boxsdk import Client
+from boxsdk.object.folder import Folder
+from boxsdk.object.item import Item
+
+from utils.atomic_file import atomic_writer
+from utils.folder_walker import WALK_MAX_WORKERS, walk_folder
+
+SNAPSHOT_MAGIC = b"BOXSNAP2"
+
+# fields listed to build a snapshot
+SNAPSHOT_FIELDS = ("type", "id", "name", "size", "sha1", "modified_at")
+
+ITEM_TYPES = ("folder", "file", "web_link")
+
+SHA1_SIZE = 20
+NO_SHA1 = bytes(SHA1_SIZE)
+
+# header: magic, item count, name bytes
+_HEADER = struct.Struct("<8sQQ")
+
+# columns and their array typecodes, one value per item, name_offsets having one more
+_COLUMNS = (("ids", "Q"), ("parents", "i"), ("types", "B"), ("sizes", "q"), ("modified", "q"), ("name_offsets", "Q"))
+
+
+class SnapshotRecord(NamedTuple):
+    """An item of a snapshot"""
+
+    index: int
+    id: str
+    parent: int
+    type: str
+    name: str
+    size: int
+    sha1: Optional[str]
+    modified_at: int
+
+
+def parse_timestamp(value: Optional[str]) -> int:
+    """Returns an ISO 8601 time as epoch seconds, 0 if there is none"""
+    return int(datetime.fromisoformat(value).timestamp()) if value else 0
+
+
+def _align(offset: int) -> int:
+    return (offset + 7) & ~7
+
+
+def _snapshot_size(count: int, names_size: int) -> int:
+    """Bytes of a snapshot file of count items"""
+    offset = _HEADER.size
+    for name, typecode in _COLUMNS:
+        length = count + 1 if name == "name_offsets" else count
+        offset = _align(offset) + length * array(typecode).itemsize
+    return offset + count * SHA1_SIZE + names_size
+
+
+class TreeSnapshot:
+    """Folder tree held in parallel arrays, index 0 being the snapshot's root folder"""
+
+    def __init__(self) -> None:
+        self.ids = array("Q")
+        self.parents = array("i")
+        self.types = array("B")
+        self.sizes = array("q")
+        self.modified = array("q")
+        self.name_offsets = array("Q", [0])
+        self.names = bytearray()
+        self.sha1s = bytearray()
+        self._children: Optional[Tuple[array, array]] = None
+        self._mmap: Optional[mmap.mmap] = None
+        self._view: Optional[memoryview] = None
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    # building
+
+    def append(
+        self,
+        item_id: str,
+        parent: int,
+        item_type: str,
+        name: str,
+        size: int = 0,
+        sha1: Optional[str] = None,
+        modified_at: Optional[str] = None,
+    ) -> int:
+        """Adds an item, returning its index"""
+        self.ids.append(int(item_id))
+        self.parents.append(parent)
+        self.types.append(ITEM_TYPES.index(item_type))
+        self.sizes.append(size or 0)
+        self.modified.append(parse_timestamp(modified_at))
+        self.names += name.encode("utf-8")
+        self.name_offsets.append(len(self.names))
+        self.sha1s += bytes.fromhex(sha1) if sha1 else NO_SHA1
+        self._children = None
+        return len(self.ids) - 1
+
+    def add_item(self, item: Item, parent: int) -> int:
+        """Adds an item listed with SNAPSHOT_FIELDS"""
+        return self.append(
+            item.id,
+            parent,
+            item.type,
+            item.name,
+            getattr(item, "size", 0),
+            getattr(item, "sha1", None),
+            getattr(item, "modified_at", None),
+        )
+
+    @classmethod
+    def from_folder(cls, folder: Folder, max_workers: int = WALK_MAX_WORKERS) -> "TreeSnapshot":
+        """Walks a folder into a snapshot, no Item is kept past its walk entry"""
+        snapshot = cls()
+        root = folder.get(fields=list(SNAPSHOT_FIELDS))
+        indexes = {"": snapshot.add_item(root, -1)}
+        for _, path, item in walk_folder(folder, max_workers=max_workers, fields=SNAPSHOT_FIELDS):
+            indexes[path] = snapshot.add_item(item, indexes[path.rsplit("/", 1)[0]])
+            if item.type != "folder":
+                # only folders are parents
+                del indexes[path]
+        return snapshot
+
+    # saving and loading
+
+    def save(self, path: str):
+        """Writes the snapshot to a file, atomically"""
+        with atomic_writer(path) as file:
+            file.write(_HEADER.pack(SNAPSHOT_MAGIC, len(self), len(self.names)))
+            for name, _ in _COLUMNS:
+                file.write(bytes(_align(file.tell()) - file.tell()))
+                getattr(self, name).tofile(file)
+            file.write(bytes(self.sha1s))
+            file.write(bytes(self.names))
+
+    @classmethod
+    def load(cls, path: str) -> "TreeSnapshot":
+        """
+        Maps a snapshot file, the columns being read-only views of the mapping.
+        Raises ValueError if the file is not a whole snapshot.
+        """
+        snapshot = cls()
+        with open(path, "rb") as file:
+            if os.fstat(file.fileno()).st_size < _HEADER.size:
+                raise ValueError(f"{path} is not a tree snapshot, or is truncated")
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count, names_size = _HEADER.unpack_from(mapped)
+        if magic != SNAPSHOT_MAGIC or len(mapped) < _snapshot_size(count, names_size):
+            mapped.close()
+            raise ValueError(f"{path} is not a tree snapshot, or is truncated")
+
+        view = memoryview(mapped)
+        offset = _HEADER.size
+        for name, typecode in _COLUMNS:
+            offset = _align(offset)
+            length = count + 1 if name == "name_offsets" else count
+            size = length * array(typecode).itemsize
+            setattr(snapshot, name, view[offset : offset + size].cast(typecode))
+            offset += size
+        snapshot.sha1s = view[offset : offset + count * SHA1_SIZE]
+        offset += count * SHA1_SIZE
+        snapshot.names = view[offset : offset + names_size]
+        snapshot._mmap, snapshot._view = mapped, view
+        return snapshot
+
+    def close(self):
+        """Releases the mapping of a loaded snapshot"""
+        if self._mmap is not None:
+            for name, _ in _COLUMNS:
+                getattr(self, name).release()
+            self.sha1s.release()
+            self.names.release()
+            self._view.release()
+            self._mmap.close()
+            self._mmap = self._view = None
+
+    def __enter__(self) -> "TreeSnapshot":
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    # queries
+
+    def name(self, index: int) -> str:
+        return bytes(self.names[self.name_offsets[index] : self.name_offsets[index + 1]]).decode("utf-8")
+
+    def sha1(self, index: int) -> Optional[str]:
+        digest = bytes(self.sha1s[index * SHA1_SIZE : (index + 1) * SHA1_SIZE])
+        return digest.hex() if digest != NO_SHA1 else None
+
+    def type(self, index: int) -> str:
+        return ITEM_TYPES[self.types[index]]
+
+    def record(self, index: int) -> SnapshotRecord:
+        return SnapshotRecord(
+            index,
+            str(self.ids[index]),
+            self.parents[index],
+            self.type(index),
+            self.name(index),
+            self.sizes[index],
+            self.sha1(index),
+            self.modified[index],
+        )
+
+    def __iter__(self) -> Iterator[SnapshotRecord]:
+        return (self.record(index) for index in range(len(self)))
+
+    def _child_index(self) -> Tuple[array, array]:
+        """Returns the item indexes grouped by parent and where each parent's group starts"""
+        if self._children is None:
+            count = len(self)
+            starts = array("i", bytes(4 * (count + 1)))
+            for parent in self.parents:
+                if parent >= 0:
+                    starts[parent + 1] += 1
+            for index in range(count):
+                starts[index + 1] += starts[index]
+            order = array("i", bytes(4 * count))
+            filled = array("i", starts)
+            for index, parent in enumerate(self.parents):
+                if parent >= 0:
+                    order[filled[parent]] = index
+                    filled[parent] += 1
+            self._children = (order, starts)
+        return self._children
+
+    def children(self, index: int = 0) -> List[int]:
+        """Returns the indexes of a folder's items"""
+        order, starts = self._child_index()
+        return list(order[starts[index] : starts[index + 1]])
+
+    def find(self, path: str) -> Optional[int]:
+        """Returns the index of the item at a path relative to the root, like /a/b"""
+        index = 0
+        for part in (part for part in path.split("/") if part):
+            for child in self.children(index):
+                if self.name(child) == part:
+                    index = child
+                    break
+            else:
+                return None
+        return index
+
+    def path_of(self, index: int) -> str:
+        names = []
+        while self.parents[index] >= 0:
+            names.append(self.name(index))
+            index = self.parents[index]
+        return "/" + "/".join(reversed(names))
+
+    def walk(self, index: int = 0) -> Iterator[int]:
+        """Yields the indexes under a folder, depth first"""
+        stack = list(reversed(self.children(index)))
+        while stack:
+            current = stack.pop()
+            yield current
+            if self.types[current] == 0:
+                stack.extend(reversed(self.children(current)))
+
+    def box_items(self, box_client: Client, indexes: Iterable[int]) -> Iterator[Item]:
+        """
+        Yields id only SDK objects for the items, enough for calls like
+        Client.download_zip, without keeping full Item objects around
+        """
+        for index in indexes:
+            item_type = self.type(index)
+            item_id = str(self.ids[index])
+            if item_type == "folder":
+                yield box_client.folder(item_id)
+            elif item_type == "file":
+                yield box_client.file(item_id)
+            else:
+                yield box_client.web_link(item_id)
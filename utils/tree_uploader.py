@@ -0,0 +1,308 @@
+""" Directory tree uploads
+---
+Uploads a local directory tree to a Box folder in two phases: the folder
+skeleton is created first with ensure_paths, then the files go up on a bounded
+thread pool. Files are uploaded without a preflight check, a file already in
+Box answers with a name conflict and gets a new version instead.
+Each file is retried on its own, a rate limit pauses every worker, and the
+files that still fail are listed in a manifest a later run can retry.
+Files whose sha1 matches the file already in Box are skipped. Local sha1s come
+from the sha1 index, hashed while the skeleton is created, and remote ones
+from a listing of each folder, skipped for folders known to hold no file.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from enum import Enum
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from boxsdk import BoxAPIException, Client
+from boxsdk.object.file import File
+from boxsdk.object.folder import Folder
+from boxsdk.object.item import Item
+from requests.exceptions import RequestException
+
+from utils.atomic_file import write_json_atomic
+from utils.bulk_ops import RateLimitGate, retry_after
+from utils.chunked_upload import CHUNKED_UPLOAD_THRESHOLD, retryable_error, update_contents, upload_to_folder
+from utils.folder_listing import get_items
+from utils.folder_paths import ENSURE_MAX_WORKERS, ensure_paths, name_conflict
+from utils.path_resolver import get_path_resolver
+from utils.sha1_index import Sha1Index, get_sha1_index
+
+# files uploaded concurrently by default
+TREE_MAX_WORKERS = 8
+
+# attempts of a file before it is reported as failed
+FILE_MAX_ATTEMPTS = 3
+
+# first pause before retrying a file, doubling at every attempt, in seconds
+FILE_RETRY_DELAY = 1.0
+
+# fields listed to compare the files already in Box
+REMOTE_FILE_FIELDS = ("type", "id", "name", "sha1")
+
+
+class FileStatus(str, Enum):
+    UPLOADED = "uploaded"
+    UPDATED = "updated"
+    UNCHANGED = "unchanged"
+    FAILED = "failed"
+
+
+class LocalFile(NamedTuple):
+    """A file of the local tree, remote_path being relative to the Box folder, like /a/b.txt"""
+
+    path: str
+    remote_path: str
+    size: int
+
+
+class FileResult(NamedTuple):
+    """Outcome of a file upload"""
+
+    local: LocalFile
+    status: FileStatus
+    file: Optional[File] = None
+    error: Optional[Exception] = None
+    attempts: int = 1
+    seconds: float = 0.0
+
+
+class TreeUploadReport(NamedTuple):
+    """Results of a tree upload, in file order"""
+
+    results: List[FileResult]
+    folders: int
+    seconds: float
+
+    @property
+    def failed(self) -> List[FileResult]:
+        return [result for result in self.results if result.status == FileStatus.FAILED]
+
+    @property
+    def uploaded(self) -> List[FileResult]:
+        """The files sent to Box, new or as new versions, unchanged files left out"""
+        sent = (FileStatus.UPLOADED, FileStatus.UPDATED)
+        return [result for result in self.results if result.status in sent]
+
+    @property
+    def bytes(self) -> int:
+        """Bytes of the files uploaded"""
+        return sum(result.local.size for result in self.uploaded)
+
+    @property
+    def files_per_second(self) -> float:
+        """Files uploaded per second, unchanged files left out"""
+        return len(self.uploaded) / self.seconds if self.seconds else 0.0
+
+    @property
+    def bytes_per_second(self) -> float:
+        return self.bytes / self.seconds if self.seconds else 0.0
+
+    def counts(self) -> dict:
+        """Number of files by status"""
+        counts = {status.value: 0 for status in FileStatus}
+        for result in self.results:
+            counts[result.status.value] += 1
+        return counts
+
+    def manifest(self) -> List[dict]:
+        """The failed files, as json ready records"""
+        return [
+            {
+                "path": result.local.path,
+                "remote_path": result.local.remote_path,
+                "size": result.local.size,
+                "error": str(result.error),
+                "attempts": result.attempts,
+            }
+            for result in self.failed
+        ]
+
+    def write_manifest(self, path: str):
+        """Writes the failure manifest, atomically"""
+        write_json_atomic(path, {"failed": self.manifest(), "counts": self.counts()})
+
+
+def scan_directory(directory: str) -> Tuple[List[str], List[LocalFile]]:
+    """Returns the folder paths and the files under a local directory, relative to it"""
+    folders, files = [], []
+    for folder, folder_names, file_names in os.walk(directory):
+        relative = os.path.relpath(folder, directory)
+        prefix = "" if relative == "." else "/" + relative.replace(os.sep, "/")
+        folder_names.sort()
+        folders.extend(f"{prefix}/{name}" for name in folder_names)
+        for name in sorted(file_names):
+            local_path = os.path.join(folder, name)
+            files.append(LocalFile(local_path, f"{prefix}/{name}", os.path.getsize(local_path)))
+    return folders, files
+
+
+def failed_paths(manifest_path: str) -> List[str]:
+    """Returns the remote paths listed in a failure manifest"""
+    with open(manifest_path, "r", encoding="UTF-8") as file:
+        return [record["remote_path"] for record in json.load(file)["failed"]]
+
+
+def remote_files(folder: Folder) -> Dict[str, Item]:
+    """
+    Returns the files of a folder by name, with their sha1.
+    A folder whose name index is complete and holds only folders, e.g. one just
+    created, is not listed.
+    """
+    index = get_path_resolver().index(folder)
+    if index.complete and all(item.type == "folder" for item in list(index.items.values())):
+        return {}
+    return {item.name: item for item in get_items(folder, REMOTE_FILE_FIELDS) if item.type == "file"}
+
+
+def _send(
+    local: LocalFile, folder: Folder, threshold: int, sha1: Optional[str], existing: Optional[File]
+) -> Tuple[File, FileStatus]:
+    if existing is None:
+        name = local.remote_path.rsplit("/", 1)[-1]
+        try:
+            return upload_to_folder(folder, local.path, name, threshold), FileStatus.UPLOADED
+        except BoxAPIException as box_err:
+            conflict = name_conflict(box_err) if box_err.code == "item_name_in_use" else None
+            if conflict is None or conflict.get("type") != "file":
+                raise
+        existing = folder.translator.translate(folder.session, conflict)
+    if sha1 is not None and getattr(existing, "sha1", None) == sha1:
+        return existing, FileStatus.UNCHANGED
+    return update_contents(existing, local.path, threshold), FileStatus.UPDATED
+
+
+def upload_one(
+    local: LocalFile,
+    folder: Folder,
+    gate: RateLimitGate = None,
+    threshold: int = CHUNKED_UPLOAD_THRESHOLD,
+    after_upload: Callable[[File, LocalFile], None] = None,
+    sha1: str = None,
+    existing: File = None,
+) -> FileResult:
+    """
+    Uploads a file to its folder, or a new version of it, retrying it on transient errors.
+    Given the local sha1, a file identical to the existing one, or to the one
+    found in conflict, is left as it is.
+    """
+    gate = RateLimitGate() if gate is None else gate
+    started = time.monotonic()
+    attempts = 0
+    while True:
+        gate.wait()
+        attempts += 1
+        try:
+            file, status = _send(local, folder, threshold, sha1, existing)
+            break
+        except (BoxAPIException, RequestException) as err:
+            error = err
+            if attempts < FILE_MAX_ATTEMPTS and retryable_error(err):
+                if getattr(err, "status", None) == 429:
+                    gate.pause(retry_after(err))
+                else:
+                    time.sleep(FILE_RETRY_DELAY * 2 ** (attempts - 1))
+                continue
+        except OSError as err:
+            error = err
+        logging.warning("Upload of %s failed: %s", local.path, error)
+        return FileResult(local, FileStatus.FAILED, None, error, attempts, time.monotonic() - started)
+
+    if after_upload is not None:
+        try:
+            after_upload(file, local)
+        except Exception as err:  # pylint: disable=broad-except
+            logging.warning("Uploaded %s, but not its follow up: %s", local.path, err)
+            return FileResult(local, FileStatus.FAILED, file, err, attempts, time.monotonic() - started)
+    return FileResult(local, status, file, None, attempts, time.monotonic() - started)
+
+
+def upload_tree(
+    box_client: Client,
+    directory: str,
+    root: Folder = None,
+    max_workers: int = TREE_MAX_WORKERS,
+    after_upload: Callable[[File, LocalFile], None] = None,
+    progress: Callable[[int, int, FileResult], None] = None,
+    only: Iterable[str] = None,
+    threshold: int = CHUNKED_UPLOAD_THRESHOLD,
+    skip_unchanged: bool = True,
+    sha1_index: Sha1Index = None,
+) -> TreeUploadReport:
+    """
+    Uploads the tree under a local directory into root, All Files by default.
+    With skip_unchanged, files identical to the ones in Box are not uploaded again.
+    after_upload is called with every file uploaded or unchanged, e.g. to set its description.
+    only restricts the upload to some remote paths, e.g. those of a failure manifest.
+    progress is called with (completed, total, result) after every file.
+    """
+    started = time.monotonic()
+    root = box_client.folder(folder_id="0") if root is None else root
+    folder_paths, files = scan_directory(directory)
+    if only is not None:
+        wanted = set(only)
+        files = [local for local in files if local.remote_path in wanted]
+        folder_paths = sorted({local.remote_path.rsplit("/", 1)[0] for local in files} - {""})
+
+    sha1s: Dict[str, str] = {}
+    with ThreadPoolExecutor(max_workers=1, thread_name_prefix="tree-hash") as hasher:
+        if skip_unchanged:
+            sha1_index = get_sha1_index() if sha1_index is None else sha1_index
+            hashing = hasher.submit(sha1_index.hash_files, [local.path for local in files])
+        folders: Dict[str, Folder] = {"": root}
+        folders.update(
+            ensure_paths(box_client, folder_paths, root, max_workers=min(max_workers, ENSURE_MAX_WORKERS))
+        )
+        logging.info("Created the skeleton of %s, %s folders", directory, len(folders) - 1)
+        if skip_unchanged:
+            sha1s = hashing.result()
+
+    gate = RateLimitGate()
+    lock = threading.Lock()
+    completed = 0
+    listed: Dict[str, Dict[str, Item]] = {}
+    listing_locks: Dict[str, threading.Lock] = {}
+
+    def existing_file(folder: Folder, name: str) -> Optional[Item]:
+        with lock:
+            listing_lock = listing_locks.setdefault(folder.object_id, threading.Lock())
+        with listing_lock:
+            if folder.object_id not in listed:
+                listed[folder.object_id] = remote_files(folder)
+        return listed[folder.object_id].get(name)
+
+    def run(local: LocalFile) -> FileResult:
+        nonlocal completed
+        folder = folders[local.remote_path.rsplit("/", 1)[0]]
+        existing = None
+        if skip_unchanged:
+            try:
+                existing = existing_file(folder, local.remote_path.rsplit("/", 1)[-1])
+            except BoxAPIException as box_err:
+                logging.warning("Could not list folder %s, uploading blindly: %s", folder.object_id, box_err)
+        result = upload_one(local, folder, gate, threshold, after_upload, sha1s.get(local.path), existing)
+        if progress is not None:
+            with lock:
+                completed += 1
+                progress(completed, len(files), result)
+        return result
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tree-upload") as executor:
+        results = list(executor.map(run, files))
+
+    report = TreeUploadReport(results, len(folders) - 1, time.monotonic() - started)
+    logging.info(
+        "Uploaded %s files of %s, %s unchanged, %.1f files/s, %.1f MB/s, %s failed",
+        len(report.uploaded),
+        directory,
+        report.counts()[FileStatus.UNCHANGED.value],
+        report.files_per_second,
+        report.bytes_per_second / (1024 * 1024),
+        len(report.failed),
+    )
+    return report
@@ -0,0 +1,160 @@
+""" Upload journal
+---
+Keeps the state of every unfinished chunked upload in a local directory, one
+json lines file per upload: a header naming the upload session and the local
+file, then a line per part Box acknowledged. Lines are appended and synced as
+parts complete, so a crash loses at most the parts in flight, and a torn last
+line is ignored when the journal is read back.
+"""
+import hashlib
+import json
+import logging
+import os
+import threading
+from typing import Dict, Iterator, NamedTuple, Optional
+
+# journal directory used by default
+UPLOAD_JOURNAL_DIR = ".upload_journal"
+
+
+class JournalEntry(NamedTuple):
+    """An unfinished upload and the parts already uploaded, by offset"""
+
+    key: str
+    session_id: str
+    path: str
+    size: int
+    mtime_ns: int
+    folder_id: Optional[str]
+    file_id: Optional[str]
+    file_name: Optional[str]
+    part_size: int
+    parts: Dict[int, dict]
+
+
+def journal_key(path: str, folder_id: str = None, file_id: str = None, file_name: str = None) -> str:
+    """Identifies an upload of a local file to a folder, or as a new version of a file"""
+    target = json.dumps([os.path.abspath(path), folder_id, file_id, file_name])
+    return hashlib.sha1(target.encode("utf-8")).hexdigest()
+
+
+class UploadJournal:
+    """Directory of upload journals, safe to use from many threads"""
+
+    def __init__(self, directory: str = UPLOAD_JOURNAL_DIR) -> None:
+        self.directory = directory
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.jsonl")
+
+    def _append(self, key: str, record: dict, mode: str = "r+") -> bool:
+        """Appends a line to the journal, which must already exist unless mode is w"""
+        with self._lock:
+            try:
+                file = open(self._path(key), mode, encoding="UTF-8")
+            except FileNotFoundError:
+                return False
+            with file:
+                file.seek(0, os.SEEK_END)
+                file.write(json.dumps(record) + "\n")
+                file.flush()
+                os.fsync(file.fileno())
+            return True
+
+    def start(
+        self,
+        key: str,
+        session_id: str,
+        path: str,
+        part_size: int,
+        folder_id: str = None,
+        file_id: str = None,
+        file_name: str = None,
+    ):
+        """Starts the journal of an upload, replacing any previous one"""
+        os.makedirs(self.directory, exist_ok=True)
+        stat = os.stat(path)
+        header = {
+            "session_id": session_id,
+            "path": os.path.abspath(path),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "folder_id": folder_id,
+            "file_id": file_id,
+            "file_name": file_name,
+            "part_size": part_size,
+        }
+        self._append(key, header, mode="w")
+
+    def record_part(self, key: str, part: dict):
+        """Records a part Box acknowledged, unless the upload was discarded meanwhile"""
+        if not self._append(key, {"part": part}):
+            logging.debug("Upload journal %s was discarded, not recording part %s", key, part.get("offset"))
+
+    def load(self, key: str) -> Optional[JournalEntry]:
+        """Returns the journal of an upload, None if there is none"""
+        try:
+            with open(self._path(key), "r", encoding="UTF-8") as file:
+                lines = file.read().splitlines()
+        except FileNotFoundError:
+            return None
+        records = []
+        for line in lines:
+            try:
+                records.append(json.loads(line))
+            except ValueError:
+                logging.warning("Ignoring a torn line in upload journal %s", key)
+                break
+        if not records or "session_id" not in records[0]:
+            return None
+        header = records[0]
+        parts = {record["part"]["offset"]: record["part"] for record in records[1:] if "part" in record}
+        return JournalEntry(
+            key,
+            header["session_id"],
+            header["path"],
+            header["size"],
+            header["mtime_ns"],
+            header["folder_id"],
+            header["file_id"],
+            header["file_name"],
+            header["part_size"],
+            parts,
+        )
+
+    def entries(self) -> Iterator[JournalEntry]:
+        """Yields every unfinished upload"""
+        if not os.path.isdir(self.directory):
+            return
+        for name in sorted(os.listdir(self.directory)):
+            if name.endswith(".jsonl"):
+                entry = self.load(name[: -len(".jsonl")])
+                if entry is not None:
+                    yield entry
+
+    def discard(self, key: str):
+        """Forgets an upload, once it is committed or abandoned"""
+        with self._lock:
+            try:
+                os.remove(self._path(key))
+            except FileNotFoundError:
+                pass
+
+
+_lock = threading.Lock()
+_journal = UploadJournal()
+
+
+def get_upload_journal() -> UploadJournal:
+    """Returns the process wide upload journal, in .upload_journal unless replaced"""
+    return _journal
+
+
+def set_upload_journal(journal: UploadJournal) -> UploadJournal:
+    """Replaces the process wide upload journal"""
+    global _journal  # pylint: disable=global-statement
+
+    with _lock:
+        previous, _journal = _journal, journal
+    return previous
@@ -0,0 +1,198 @@
+""" Asyncio facade over the workshop operations
+---
+Each coroutine mirrors a synchronous workshop helper and runs it on a shared,
+bounded thread pool, so an asyncio service can overlap hundreds of Box calls
+without blocking its event loop.
+The pool size is the global concurrency limit (ASYNC_MAX_CONCURRENCY).
+Lazy SDK iterators are consumed on the pool and returned as lists.
+"""
+import asyncio
+import functools
+import itertools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Iterable, List, Optional, TypeVar
+
+from boxsdk import Client
+from boxsdk.object.comment import Comment
+from boxsdk.object.file import File
+from boxsdk.object.folder import Folder
+from boxsdk.object.item import Item
+
+from utils.config import get_config
+from workshops.comments import comments_sln
+from workshops.file_representations import file_representations_sln
+from workshops.files import files_sln
+from workshops.folders import folders_sln
+from workshops.search import search_sln
+from workshops.shared_links import shared_links_sln
+from workshops.shared_links.shared_links_sln import SharedLinkAccess
+
+T = TypeVar("T")
+
+_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Returns the shared executor, sized by ASYNC_MAX_CONCURRENCY"""
+    global _executor  # pylint: disable=global-statement
+
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(
+                max_workers=get_config().async_max_concurrency,
+                thread_name_prefix="box-async",
+            )
+        return _executor
+
+
+def set_max_concurrency(max_concurrency: int):
+    """Replaces the shared executor, letting running calls finish"""
+    global _executor  # pylint: disable=global-statement
+
+    with _lock:
+        previous, _executor = _executor, ThreadPoolExecutor(
+            max_workers=max_concurrency, thread_name_prefix="box-async"
+        )
+    if previous is not None:
+        previous.shutdown(wait=False)
+
+
+async def run_sync(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Runs a blocking SDK call on the shared executor"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_executor(), functools.partial(func, *args, **kwargs))
+
+
+def _as_list(func: Callable[..., Iterable[T]], *args: Any, **kwargs: Any) -> List[T]:
+    return list(func(*args, **kwargs))
+
+
+# folders
+
+
+async def get_folder_items(box_client: Client, box_folder_id: str = "0", **kwargs: Any) -> List[Item]:
+    """Get folder items, taking the same fields and page_size options"""
+    return await run_sync(_as_list, folders_sln.get_folder_items, box_client, box_folder_id, **kwargs)
+
+
+async def create_box_folder(box_client: Client, folder_name: str, parent_folder: Folder) -> Folder:
+    """create a folder in box"""
+    return await run_sync(folders_sln.create_box_folder, box_client, folder_name, parent_folder)
+
+
+# files
+
+
+async def upload_file(box_client: Client, box_folder: Folder, path_to_file: str) -> File:
+    """Upload a file to a Box folder"""
+    return await run_sync(files_sln.upload_file, box_client, box_folder, path_to_file)
+
+
+async def download_file(box_file: File, local_path_to_file: str):
+    """Download a file from Box"""
+    return await run_sync(files_sln.download_file, box_file, local_path_to_file)
+
+
+async def download_zip(box_client: Client, local_path_to_zip: str, box_items: Iterable[Item]):
+    """Download a zip file from Box"""
+    return await run_sync(files_sln.download_zip, box_client, local_path_to_zip, box_items)
+
+
+async def file_update_description(file: File, description: str) -> File:
+    """Update a file description"""
+    return await run_sync(files_sln.file_update_description, file, description)
+
+
+# search
+
+
+def _search(
+    box_client: Client,
+    query: str,
+    content_types: Iterable[str],
+    result_type: str,
+    ancestor_folders: Iterable[Folder],
+    max_results: Optional[int],
+) -> List[Item]:
+    results = search_sln.simple_search(query, content_types, result_type, ancestor_folders, box_client=box_client)
+    return list(itertools.islice(results, max_results))
+
+
+async def simple_search(
+    box_client: Client,
+    query: str,
+    content_types: Iterable[str] = None,
+    result_type: str = None,
+    ancestor_folders: Iterable[Folder] = None,
+    max_results: int = None,
+) -> List[Item]:
+    """Search by query in any Box content, up to max_results items"""
+    return await run_sync(
+        _search, box_client, query, content_types, result_type, ancestor_folders, max_results
+    )
+
+
+# comments
+
+
+async def file_comment_add(box_client: Client, file: File, message: str) -> Comment:
+    """Add a comment to a file"""
+    return await run_sync(comments_sln.file_comment_add, box_client, file, message)
+
+
+async def file_comment_reply(box_client: Client, comment: Comment, message: str) -> Comment:
+    """Reply to a comment"""
+    return await run_sync(comments_sln.file_comment_reply, box_client, comment, message)
+
+
+async def file_comment_delete(box_client: Client, comment: Comment):
+    """Delete a comment"""
+    return await run_sync(comments_sln.file_comment_delete, box_client, comment)
+
+
+async def file_comments(file: File) -> List[Comment]:
+    """Get all comments for a file"""
+    return await run_sync(_as_list, file.get_comments)
+
+
+# shared links
+
+
+async def file_shared_link(
+    file: File,
+    access: SharedLinkAccess,
+    allow_download: bool = None,
+    allow_preview: bool = None,
+    allow_edit: bool = None,
+) -> str:
+    """Create a shared link for a file"""
+    return await run_sync(
+        shared_links_sln.file_shared_link, file, access, allow_download, allow_preview, allow_edit
+    )
+
+
+async def folder_shared_link(
+    folder: Folder,
+    access: SharedLinkAccess,
+    allow_download: bool = None,
+    allow_preview: bool = None,
+) -> str:
+    """Create a shared link for a folder"""
+    return await run_sync(
+        shared_links_sln.folder_shared_link, folder, access, allow_download, allow_preview
+    )
+
+
+async def item_from_shared_link(box_client: Client, url: str, password: str = None) -> Item:
+    """Get the item behind a shared link"""
+    return await run_sync(shared_links_sln.item_from_shared_link, box_client, url, password)
+
+
+# representations
+
+
+async def file_representations(file: File, rep_hints: str = None) -> List[dict]:
+    """Get the representations of a file"""
+    return await run_sync(file_representations_sln.file_representations, file, rep_hints)
@@ -4,14 +4,13 @@ from utils.config import AppConfig
 
 from utils.box_client import get_client
 
-from workshops.comments.create_samples import create_samples
-
-logging.basicConfig(level=logging.INFO)
-logging.getLogger("boxsdk").setLevel(logging.CRITICAL)
-
-conf = AppConfig()
+from utils.seeding import seed_samples
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    logging.getLogger("boxsdk").setLevel(logging.CRITICAL)
+
+    conf = AppConfig()
     client = get_client(conf)
-    create_samples(client)
+    seed_samples(client, ["comments"])
@@ -9,10 +9,6 @@ from boxsdk.object.comment import Comment
 from utils.config import AppConfig
 from utils.box_client import get_client
 
-logging.basicConfig(level=logging.INFO)
-logging.getLogger("boxsdk").setLevel(logging.CRITICAL)
-
-conf = AppConfig()
 
 COMMENTS_ROOT = "223269791429"
 SAMPLE_FILE = "1290064263703"
@@ -49,6 +45,10 @@ def file_comment_delete(client: Client, comment: Comment):
 
 def main():
     """Simple script to demonstrate how to use the Box SDK"""
+    logging.basicConfig(level=logging.INFO)
+    logging.getLogger("boxsdk").setLevel(logging.CRITICAL)
+
+    conf = AppConfig()
     client = get_client(conf)
 
     user = client.user().get()
@@ -11,11 +11,8 @@ from boxsdk.object.folder import Folder
 
 from utils.config import AppConfig
 from utils.box_client import get_client
+from utils.folder_listing import get_items
 
-logging.basicConfig(level=logging.INFO)
-logging.getLogger("boxsdk").setLevel(logging.CRITICAL)
-
-conf = AppConfig()
 DEMO_FOLDER = 223939315135
 FILE_DOCX = 1294096878155
 FILE_JS = 1294098434302
@@ -69,7 +66,7 @@ def file_thubmnail(file: File, dimensions: str, representation: str) -> bytes:
 
 
 def folder_list_representation_status(folder: Folder, representation: str):
-    items = folder.get_items()
+    items = get_items(folder)
     print(f"\nChecking for {representation} status in folder [{folder.name}] ({folder.id})")
     for item in items:
         if isinstance(item, File):
@@ -83,6 +80,10 @@ def folder_list_representation_status(folder: Folder, representation: str):
 
 def main():
     """Simple script to demonstrate how to use the Box SDK"""
+    logging.basicConfig(level=logging.INFO)
+    logging.getLogger("boxsdk").setLevel(logging.CRITICAL)
+
+    conf = AppConfig()
     client = get_client(conf)
 
     user = client.user().get()
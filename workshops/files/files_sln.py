@@ -1,7 +1,7 @@
 """Box Files workshop"""
 import logging
 import os
-from typing import Iterable
+from typing import Iterable, Optional
 
 from boxsdk import Client, BoxAPIException
 from boxsdk.object.item import Item
@@ -10,33 +10,45 @@ from boxsdk.object.file import File
 
 from utils.config import AppConfig
 from utils.box_client import get_client
+from utils.chunked_upload import CHUNKED_UPLOAD_THRESHOLD, update_contents, upload_to_folder
+from utils.folder_listing import DEFAULT_ITEM_FIELDS, DEFAULT_PAGE_SIZE, get_items
+from utils.folder_paths import name_conflict
+from utils.ranged_download import RANGED_DOWNLOAD_THRESHOLD, download_to_path
+from utils.sha1_index import get_sha1_index
 
-logging.basicConfig(level=logging.INFO)
-logging.getLogger("boxsdk").setLevel(logging.CRITICAL)
-
-conf = AppConfig()
 # FILES_ROOT = "209588945595"
 
 FILES_ROOT = "223097997181"
 SAMPLE_FILE = "1289038683607"
 
 
-def upload_file(box_client: Client, box_folder: Folder, path_to_file: str) -> File:
-    """Upload a file to a Box folder"""
+def upload_file(
+    box_client: Client,
+    box_folder: Folder,
+    path_to_file: str,
+    chunked_threshold: int = CHUNKED_UPLOAD_THRESHOLD,
+) -> File:
+    """
+    Upload a file to a Box folder, in concurrent parts from chunked_threshold bytes up.
+    A file already in Box with the same sha1 is left as it is.
+    """
 
     file_size = os.path.getsize(path_to_file)
     file_name = os.path.basename(path_to_file)
 
     try:
         box_folder.preflight_check(file_size, file_name)
-        box_file = box_folder.upload(path_to_file)
+        box_file = upload_to_folder(box_folder, path_to_file, threshold=chunked_threshold)
     except BoxAPIException as err:
         if err.code == "item_name_in_use":
             logging.warning("File already exists, updating contents")
-            box_file_id = err.context_info["conflicts"]["id"]
+            box_file_id = name_conflict(err)["id"]
             box_file = box_client.file(file_id=box_file_id).get()
+            if box_file.sha1 == get_sha1_index().sha1(path_to_file):
+                logging.info("File %s is unchanged, skipping the upload", box_file.name)
+                return box_file
             try:
-                box_file.update_contents(path_to_file)
+                box_file = update_contents(box_file, path_to_file, threshold=chunked_threshold)
             except BoxAPIException as err2:
                 logging.error("Failed to update %s: %s", box_file.name, err2)
                 raise err2
@@ -46,11 +58,10 @@ def upload_file(box_client: Client, box_folder: Folder, path_to_file: str) -> Fi
     return box_file
 
 
-def download_file(box_file: File, local_path_to_file: str):
-    """Download a file from Box"""
+def download_file(box_file: File, local_path_to_file: str, ranged_threshold: int = RANGED_DOWNLOAD_THRESHOLD):
+    """Download a file from Box, in concurrent byte ranges from ranged_threshold bytes up"""
 
-    with open(local_path_to_file, "wb") as file_stream:
-        box_file.download_to(file_stream)
+    download_to_path(box_file, local_path_to_file, threshold=ranged_threshold)
 
 
 def download_zip(box_client: Client, local_path_to_zip: str, box_items: Iterable["Item"]):
@@ -82,14 +93,22 @@ def file_update_description(file: File, description: str) -> File:
     return file.update_info(data={"description": description})
 
 
-def folder_list_contents(folder: Folder):
-    items = folder.get_items()
+def folder_list_contents(
+    folder: Folder,
+    fields: Optional[Iterable[str]] = DEFAULT_ITEM_FIELDS,
+    page_size: int = DEFAULT_PAGE_SIZE,
+):
+    items = get_items(folder, fields, page_size)
     print(f"\nFolder [{folder.name}] content:")
     for item in items:
         print(f"   {item.type} {item.id} {item.name}")
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    logging.getLogger("boxsdk").setLevel(logging.CRITICAL)
+
+    conf = AppConfig()
     client = get_client(conf)
 
     files_root = client.folder(folder_id=FILES_ROOT).get()
@@ -132,7 +151,7 @@ if __name__ == "__main__":
     except BoxAPIException as err:
         if err.code == "item_name_in_use":
             logging.warning("File already exists, we'll use it")
-            file_copied_id = err.context_info["conflicts"]["id"]
+            file_copied_id = name_conflict(err)["id"]
             file_copied = get_file_by_id(file_copied_id)
         else:
             raise err
@@ -144,7 +163,7 @@ if __name__ == "__main__":
     except BoxAPIException as err:
         if err.code == "item_name_in_use":
             logging.warning("File already exists, we'll use it")
-            file_moved_id = err.context_info["conflicts"]["id"]
+            file_moved_id = name_conflict(err)["id"]
             file_moved = get_file_by_id(file_moved_id)
         else:
             raise err
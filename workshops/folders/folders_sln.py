@@ -1,6 +1,6 @@
 """Box Folder workshop"""
 import logging
-from typing import Iterable
+from typing import Iterable, Optional
 
 from boxsdk import Client, BoxAPIException
 from boxsdk.object.item import Item
@@ -8,11 +8,13 @@ from boxsdk.object.folder import Folder
 
 from utils.config import AppConfig
 from utils.box_client import get_client
+from utils.folder_cache import cached_get_items, copy_item, delete_item, rename_item
+from utils.folder_listing import DEFAULT_ITEM_FIELDS, DEFAULT_PAGE_SIZE, get_items
+from utils.folder_paths import ensure_folder, name_conflict
+from utils.folder_walker import walk_folder
+from utils.path_resolver import resolve_folder
 
-logging.basicConfig(level=logging.INFO)
-logging.getLogger("boxsdk").setLevel(logging.CRITICAL)
-
-conf = AppConfig()
+WORKSHOP_FOLDER = "/workshops/folders"
 
 
 def print_box_item(box_item: Item, level: int = 0):
@@ -30,66 +32,46 @@ def print_box_items(box_items: Iterable["Item"]):
     print("-------------")
 
 
-def get_folder_items(box_client: Client, box_folder_id: str = "0") -> Iterable["Item"]:
-    """Get folder items"""
-    folder = box_client.folder(folder_id=box_folder_id).get()
-    return folder.get_items()
+def get_folder_items(
+    box_client: Client,
+    box_folder_id: str = "0",
+    fields: Optional[Iterable[str]] = DEFAULT_ITEM_FIELDS,
+    page_size: int = DEFAULT_PAGE_SIZE,
+) -> Iterable["Item"]:
+    """Get folder items, with only the given fields"""
+    return get_items(box_client.folder(folder_id=box_folder_id), fields, page_size)
 
 
 def print_folder_items_recursive(
     box_client: Client, folder: Folder, level: int = 0
 ) -> Iterable["Item"]:
-    """Get folder items recursively"""
+    """Get folder items recursively, unchanged folders come from the listing cache"""
     print_box_item(folder, level)
-    box_items = folder.get_items()
-    for box_item in box_items:
-        if box_item.type == "folder":
-            print_folder_items_recursive(box_client, box_item, level + 1)
-        else:
-            print_box_item(box_item, level + 1)
+    for depth, _, box_item in walk_folder(folder, list_items=cached_get_items):
+        print_box_item(box_item, level + depth)
 
 
 def get_workshop_folder(box_client: Client) -> Folder:
-    """Get workshop folder"""
-    root = box_client.folder(folder_id="0").get()
-    workshops_folder_list = [
-        box_item
-        for box_item in root.get_items()
-        if box_item.name == "workshops" and box_item.type == "folder"
-    ]
-    if workshops_folder_list == []:
-        raise ValueError("'Workshop' folder not found")
-
-    folders_folder_list = [
-        box_item
-        for box_item in workshops_folder_list[0].get_items()
-        if box_item.name == "folders" and box_item.type == "folder"
-    ]
-    if folders_folder_list == []:
-        raise ValueError("'Folders' folder not found")
-
-    return folders_folder_list[0]
+    """Get workshop folder, repeated calls do not hit the API"""
+    return resolve_folder(box_client, WORKSHOP_FOLDER)
 
 
 def create_box_folder(
     box_client: Client, folder_name: str, parent_folder: Folder
 ) -> Folder:
-    """create a folder in box"""
+    """create a folder in box, or return the existing one, which may only have its type, id and name"""
 
-    try:
-        folder = parent_folder.create_subfolder(folder_name)
-    except BoxAPIException as box_err:
-        if box_err.code == "item_name_in_use":
-            box_folder_id = box_err.context_info["conflicts"][0]["id"]
-            folder = box_client.folder(box_folder_id).get()
-        else:
-            raise box_err
+    folder = ensure_folder(parent_folder, folder_name)
 
     # logging.info("Folder %s with id: %s", folder.name, folder.id)
     return folder
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    logging.getLogger("boxsdk").setLevel(logging.CRITICAL)
+
+    conf = AppConfig()
     client = get_client(conf)
 
     # items = get_folder_items(client)
@@ -107,15 +89,15 @@ if __name__ == "__main__":
     personal = create_box_folder(client, "personal", downloads)
 
     try:
-        my_docs_personal = personal.copy(parent_folder=my_documents)
+        my_docs_personal = copy_item(personal, my_documents)
     except BoxAPIException as err:
         if err.code == "item_name_in_use":
-            folder_id = err.context_info["conflicts"]["id"]
+            folder_id = name_conflict(err)["id"]
             my_docs_personal = client.folder(folder_id).get()
         else:
             raise err
 
-    downloads.update_info(
+    downloads = downloads.update_info(
         data={
             "description": "This is where my donwloads go, remember to clean it once in a while"
         }
@@ -131,12 +113,12 @@ if __name__ == "__main__":
     print("---")
 
     try:
-        tmp.delete(recursive=False)
+        delete_item(tmp, recursive=False)
     except BoxAPIException as err:
         if err.code == "folder_not_empty":
             print(f"Folder {tmp.name} is not empty, deleting recursively")
             try:
-                tmp.delete()
+                delete_item(tmp)
             except BoxAPIException as err_l2:
                 raise err_l2
         else:
@@ -147,12 +129,12 @@ if __name__ == "__main__":
     print("---")
 
     print("Renaming personal download to games")
-    games = personal.rename("games")
+    games = rename_item(personal, "games")
     print_folder_items_recursive(client, downloads)
     print("---")
 
     print("Deleting games")
-    games.delete()
+    delete_item(games)
     print_folder_items_recursive(client, downloads)
     print("---")
 
@@ -0,0 +1,16 @@
+"""create the sample content of every workshop in box"""
+import logging
+from utils.config import AppConfig
+
+from utils.box_client import get_client
+
+from utils.seeding import seed_samples
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    logging.getLogger("boxsdk").setLevel(logging.CRITICAL)
+
+    conf = AppConfig()
+    client = get_client(conf)
+    seed_samples(client)
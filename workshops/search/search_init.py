@@ -4,14 +4,13 @@ from utils.config import AppConfig
 
 from utils.box_client import get_client
 
-from workshops.search.upload_samples import upload_content_sample
-
-logging.basicConfig(level=logging.INFO)
-logging.getLogger("boxsdk").setLevel(logging.CRITICAL)
-
-conf = AppConfig()
+from utils.seeding import seed_samples
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    logging.getLogger("boxsdk").setLevel(logging.CRITICAL)
+
+    conf = AppConfig()
     client = get_client(conf)
-    upload_content_sample(client)
+    seed_samples(client, ["search"])
@@ -2,17 +2,13 @@
 import logging
 from typing import Iterable
 
+from boxsdk import Client
 from boxsdk.object.item import Item
 from boxsdk.object.folder import Folder
 
 from utils.config import AppConfig
 from utils.box_client import get_client
 
-logging.basicConfig(level=logging.INFO)
-logging.getLogger("boxsdk").setLevel(logging.CRITICAL)
-
-conf = AppConfig()
-
 
 def print_box_item(box_item: Item):
     """Basic print of a Box Item attributes"""
@@ -32,10 +28,12 @@ def simple_search(
     content_types: Iterable[str] = None,
     result_type: str = None,
     ancestor_folders: Iterable["Folder"] = None,
+    box_client: Client = None,
 ) -> Iterable["Item"]:
-    """Search by query in any Box content"""
+    """Search by query in any Box content, with the workshop's client unless box_client is given"""
 
-    return client.search().query(
+    box_client = box_client or client
+    return box_client.search().query(
         query=query,
         content_types=content_types,
         result_type=result_type,
@@ -44,6 +42,10 @@ def simple_search(
 
 
 if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    logging.getLogger("boxsdk").setLevel(logging.CRITICAL)
+
+    conf = AppConfig()
     client = get_client(conf)
 
     # # Simple Search
@@ -11,10 +11,6 @@ from boxsdk.object.item import Item
 from utils.config import AppConfig
 from utils.box_client import get_client
 
-logging.basicConfig(level=logging.INFO)
-logging.getLogger("boxsdk").setLevel(logging.CRITICAL)
-
-conf = AppConfig()
 
 SHARED_LINKS_ROOT = "223783108378"
 SAMPLE_FILE = "1293174201535"
@@ -53,6 +49,10 @@ def item_from_shared_link(client: Client, url: str, password: str = None) -> Ite
 
 def main():
     """Simple script to demonstrate how to use the Box SDK"""
+    logging.basicConfig(level=logging.INFO)
+    logging.getLogger("boxsdk").setLevel(logging.CRITICAL)
+
+    conf = AppConfig()
     client = get_client(conf)
 
     user = client.user().get()